@@ -0,0 +1 @@
+python bench/run.py "$@"
@@ -0,0 +1,130 @@
+# Compares blocks/sec of the first-character block classifier, and of
+# classifying plus building each block's node tree from pre-split lines,
+# against the predicate chain and per-call dispatch dict they replaced.
+# Run from the repository root: python bench/bench_blocks.py [corpus] [scale]
+import random
+import sys
+from os import path
+from timeit import repeat
+
+BENCH_DIR = path.dirname(path.abspath(__file__))
+sys.path.insert(0, path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import corpora
+from blocks import (
+    classify_block,
+    markdown_to_blocks,
+    is_heading_block,
+    is_code_block,
+    is_quote_block,
+    is_unordered_list_block,
+    block_type_paragraph,
+    block_type_heading,
+    block_type_code,
+    block_type_quote,
+    block_type_unordered_list,
+    block_type_ordered_list,
+)
+from markdown import get_html_node_func
+from htmlnode import (
+    code_block_to_html_node,
+    quote_block_to_html_node,
+    paragraph_block_to_html_node,
+    unordered_list_block_to_html_node,
+    ordered_list_block_to_html_node,
+    heading_block_to_html_node,
+)
+
+
+def chained_is_ordered_list_block(block: str):
+    numbers = [line.split(". ").pop(0) for line in block.split("\n")]
+    return (
+        numbers[0] == "1"
+        and all(num.isdigit() for num in numbers)
+        and sorted(numbers) == numbers
+    )
+
+
+def chained_block_to_block_type(block: str):
+    if is_heading_block(block):
+        return block_type_heading
+    if is_code_block(block):
+        return block_type_code
+    if is_quote_block(block):
+        return block_type_quote
+    if is_unordered_list_block(block):
+        return block_type_unordered_list
+    if chained_is_ordered_list_block(block):
+        return block_type_ordered_list
+    return block_type_paragraph
+
+
+def chained_get_html_node_func(block_type: str):
+    block_type_to_html_node_func = {
+        f"{block_type_heading}": heading_block_to_html_node,
+        f"{block_type_code}": code_block_to_html_node,
+        f"{block_type_quote}": quote_block_to_html_node,
+        f"{block_type_ordered_list}": ordered_list_block_to_html_node,
+        f"{block_type_unordered_list}": unordered_list_block_to_html_node,
+        f"{block_type_paragraph}": paragraph_block_to_html_node,
+    }
+    return block_type_to_html_node_func[f"{block_type}"]
+
+
+def chained_classify(blocks: list):
+    for block in blocks:
+        chained_block_to_block_type(block)
+
+
+def dispatch_classify(blocks: list):
+    for block in blocks:
+        classify_block(block)
+
+
+# Without lines the node functions split markers out of the whole block, as
+# they did before
+def chained_build(blocks: list):
+    for block in blocks:
+        chained_get_html_node_func(chained_block_to_block_type(block))(block)
+
+
+def dispatch_build(blocks: list):
+    for block in blocks:
+        block_type, lines = classify_block(block)
+        get_html_node_func(block_type)(block, lines)
+
+
+def collect_blocks(name: str, scale: float):
+    blocks = []
+    for _, markdown in corpora[name](random.Random(f"{name}:0"), scale):
+        blocks.extend(markdown_to_blocks(markdown))
+    return blocks
+
+
+def blocks_per_second(func, blocks: list):
+    best = min(repeat(lambda: func(blocks), number=1, repeat=5))
+    return len(blocks) / best
+
+
+def compare(label: str, before, after, blocks: list):
+    old = blocks_per_second(before, blocks)
+    new = blocks_per_second(after, blocks)
+    print(f"  {label:<9} {old:>12,.0f} -> {new:>12,.0f} blocks/s ({new / old:.2f}x)")
+
+
+def main():
+    names = [sys.argv[1]] if len(sys.argv) > 1 else ["list_dense", "small_pages"]
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    for name in names:
+        blocks = collect_blocks(name, scale)
+        assert [chained_block_to_block_type(block) for block in blocks] == [
+            classify_block(block)[0] for block in blocks
+        ]
+        print(f"{name}: {len(blocks)} blocks")
+        compare("classify", chained_classify, dispatch_classify, blocks)
+        compare("build", chained_build, dispatch_build, blocks)
+
+
+if __name__ == "__main__":
+    main()
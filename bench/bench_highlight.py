@@ -0,0 +1,133 @@
+# Measures highlighted KB/s of fenced code blocks per language: the old
+# inline parsed rendering, highlighting unique blocks, and highlighting
+# snippets repeated across pages, which the (language, code hash) cache
+# serves after their first use.
+# Run from the repository root: python bench/bench_highlight.py [KB per language]
+import random
+import sys
+from os import path
+from time import perf_counter
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
+
+import highlight
+from highlight import HighlightCache
+from htmlnode import ParentNode, code_block_to_html_node, text_node_to_html_node
+from inline import text_to_textnodes
+
+REPEAT = 3
+SNIPPET_LINES = 12
+# Distinct snippets the repeated blocks are drawn from
+REPEATED_SNIPPETS = 64
+
+SAMPLES = {
+    "python": [
+        "def render(page, template=None):",
+        "    # Render the page through its template",
+        '    title = page.get("title", "Untitled")',
+        "    for index, block in enumerate(page.blocks):",
+        "        if block is None or index > 0x10:",
+        "            raise ValueError(f'bad block {index}')",
+        "    return template.render(title=title, count=3.5e2)",
+        "@cached",
+        "class Page(object):",
+        '    """A page and its blocks."""',
+    ],
+    "javascript": [
+        "const pages = await fetch(`/api/pages?limit=${limit}`);",
+        "// Render every page that is not a draft",
+        "for (let index = 0; index < pages.length; index++) {",
+        "  if (pages[index].draft === true) continue;",
+        '  document.title = pages[index].title || "Untitled";',
+        "}",
+        "export function render(page) { return page.html; }",
+        "console.log(null, undefined, 42, 'done');",
+    ],
+    "json": [
+        '{"title": "Page", "draft": false, "weight": 10,',
+        ' "tags": ["one", "two"], "parent": null, "ratio": 0.5}',
+    ],
+    "bash": [
+        "# Build and serve the site",
+        'for page in content/*.md; do echo "$page"; done',
+        "if [ -z \"${SITE_URL}\" ]; then export SITE_URL=http://localhost; fi",
+        "python src/main.py --jobs 4 --compress && cd public",
+    ],
+    "go": [
+        "func render(page *Page) (string, error) {",
+        "\t// Render the page",
+        '\tif page == nil { return "", errors.New("no page") }',
+        "\tfor i := 0; i < len(page.Blocks); i++ { fmt.Println(i) }",
+        "\treturn page.HTML, nil",
+        "}",
+    ],
+}
+
+
+# Blocks of random lines of the language's sample adding up to size, each
+# unique, or drawn from REPEATED_SNIPPETS distinct ones when repeated
+def code_blocks(language: str, size: int, rng: random.Random, repeated=False):
+    lines = SAMPLES[language]
+    blocks = []
+    total = 0
+    while total < size:
+        if repeated and len(blocks) >= REPEATED_SNIPPETS:
+            block = rng.choice(blocks[:REPEATED_SNIPPETS])
+        else:
+            code = "\n".join(rng.choice(lines) for _ in range(SNIPPET_LINES))
+            # A distinct line keeps every block unique
+            block = f"```{language}\n{code}\nvalue = {len(blocks)}\n```"
+        blocks.append(block)
+        total += len(block)
+    return blocks
+
+
+# The rendering before the highlighter: the code, language tag and all,
+# inline parsed as though it were text
+def inline_parsed_block_to_html(block: str):
+    text = block.lstrip("```\n").rstrip("```")
+    children = [text_node_to_html_node(node) for node in text_to_textnodes(text)]
+    return ParentNode("pre", [ParentNode("code", children)]).to_html()
+
+
+def highlighted_block_to_html(block: str):
+    return code_block_to_html_node(block).to_html()
+
+
+def kb_per_second(render, blocks: list, reset_cache: bool):
+    size = sum(len(block) for block in blocks)
+    best = float("inf")
+    for _ in range(REPEAT):
+        if reset_cache:
+            highlight.highlight_cache = HighlightCache()
+        start = perf_counter()
+        for block in blocks:
+            render(block)
+        best = min(best, perf_counter() - start)
+    return size / 1024 / best
+
+
+def main():
+    size = int(float(sys.argv[1]) * 1024) if len(sys.argv) > 1 else 512 * 1024
+    rng = random.Random(25)
+    print(
+        f"{'language':>10} {'inline KB/s':>12} {'cold KB/s':>10} "
+        f"{'cached KB/s':>12} {'hit rate':>9}"
+    )
+    for language in SAMPLES:
+        blocks = code_blocks(language, size, rng)
+        inline = kb_per_second(inline_parsed_block_to_html, blocks, False)
+        cold = kb_per_second(highlighted_block_to_html, blocks, True)
+        # Snippets repeated across pages, highlighted once per run
+        repeated = code_blocks(language, size, rng, repeated=True)
+        cached = kb_per_second(highlighted_block_to_html, repeated, True)
+        cache = highlight.highlight_cache
+        rate = cache.hits / (cache.hits + cache.misses) * 100
+        print(
+            f"{language:>10} {inline:>12.0f} {cold:>10.0f} {cached:>12.0f} "
+            f"{rate:>8.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# Compares text_to_textnodes against the chained split_nodes_* passes it
+# replaced on paragraphs with a growing number of links and emphasis spans.
+# Run from the repository root: python bench/bench_inline.py
+import sys
+from os import path
+from timeit import repeat
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
+
+from textnode import TextNode, text_type_text, text_type_code, text_type_bold
+from textnode import text_type_italic
+from inline import (
+    split_nodes_delimiter,
+    split_nodes_image,
+    split_nodes_link,
+    text_to_textnodes,
+)
+
+SIZES = [100, 400, 1600, 6400, 25600]
+
+
+def chained_text_to_textnodes(text: str):
+    nodes = split_nodes_link(split_nodes_image([TextNode(text, text_type_text)]))
+    nodes = split_nodes_delimiter(nodes, "`", text_type_code)
+    nodes = split_nodes_delimiter(nodes, "**", text_type_bold)
+    nodes = split_nodes_delimiter(nodes, "_", text_type_italic)
+    return [node for node in nodes if len(node.text)]
+
+
+def make_paragraph(spans: int):
+    parts = []
+    for index in range(spans):
+        kind = index % 4
+        if kind == 0:
+            parts.append(f"see [link {index}](/page/{index})")
+        elif kind == 1:
+            parts.append(f"an ![image {index}](/images/{index}.png)")
+        elif kind == 2:
+            parts.append(f"some **bold {index}** and _italic_")
+        else:
+            parts.append(f"a `code {index}` span")
+    return " ".join(parts)
+
+
+def best_time(func, text: str):
+    number = 3
+    return min(repeat(lambda: func(text), number=number, repeat=3)) / number
+
+
+def main():
+    print(f"{'spans':>8} {'chars':>9} {'chained ms':>12} {'single ms':>11} {'speedup':>8}")
+    for spans in SIZES:
+        text = make_paragraph(spans)
+        assert chained_text_to_textnodes(text) == text_to_textnodes(text)
+        chained = best_time(chained_text_to_textnodes, text)
+        single = best_time(text_to_textnodes, text)
+        print(
+            f"{spans:>8} {len(text):>9} {chained * 1000:>12.2f} "
+            f"{single * 1000:>11.2f} {chained / single:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
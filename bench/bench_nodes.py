@@ -0,0 +1,93 @@
+# Measures per-node memory and construction time of the slotted TextNode and
+# HTMLNode classes against dict-backed equivalents, using the nodes produced
+# by rendering a synthetic corpus.
+# Run from the repository root: python bench/bench_nodes.py [corpus] [scale]
+import random
+import sys
+import tracemalloc
+from os import path
+from timeit import timeit
+
+BENCH_DIR = path.dirname(path.abspath(__file__))
+sys.path.insert(0, path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import corpora
+from blocks import markdown_to_blocks
+from inline import text_to_textnodes
+from textnode import TextNode
+from htmlnode import LeafNode, ParentNode, text_node_to_html_node
+
+
+# Subclasses without __slots__ get a __dict__ again, which is how these
+# classes were laid out before
+class DictTextNode(TextNode):
+    pass
+
+
+class DictLeafNode(LeafNode):
+    pass
+
+
+class DictParentNode(ParentNode):
+    pass
+
+
+def collect_nodes(name: str, scale: float):
+    text_nodes = []
+    for _, markdown in corpora[name](random.Random(f"{name}:0"), scale):
+        for block in markdown_to_blocks(markdown):
+            if not block.startswith("```"):
+                text_nodes.extend(text_to_textnodes(block))
+    return text_nodes
+
+
+def measure_memory(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    nodes = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before) / len(nodes)
+
+
+def compare(label: str, slotted, dict_backed, number=3):
+    slotted_bytes = measure_memory(slotted)
+    dict_bytes = measure_memory(dict_backed)
+    slotted_time = timeit(slotted, number=number) / number
+    dict_time = timeit(dict_backed, number=number) / number
+    print(
+        f"{label:<11} {dict_bytes:>8.1f} -> {slotted_bytes:>6.1f} bytes/node "
+        f"({(1 - slotted_bytes / dict_bytes) * 100:4.1f}% smaller)  "
+        f"{dict_time * 1000:>8.1f} -> {slotted_time * 1000:>7.1f} ms "
+        f"({dict_time / slotted_time:.2f}x)"
+    )
+
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else "link_dense"
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    sources = collect_nodes(name, scale)
+    fields = [(node.text, node.text_type, node.url) for node in sources]
+    leaves = [text_node_to_html_node(node) for node in sources]
+    print(f"{name}: {len(fields)} text nodes")
+
+    compare(
+        "TextNode",
+        lambda: [TextNode(*field) for field in fields],
+        lambda: [DictTextNode(*field) for field in fields],
+    )
+    compare(
+        "LeafNode",
+        lambda: [LeafNode(leaf.tag, leaf.value, leaf.props) for leaf in leaves],
+        lambda: [DictLeafNode(leaf.tag, leaf.value, leaf.props) for leaf in leaves],
+    )
+    compare(
+        "ParentNode",
+        lambda: [ParentNode("li", [leaf]) for leaf in leaves],
+        lambda: [DictParentNode("li", [leaf]) for leaf in leaves],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# Measures the per-block cost of passing pattern strings to re on every call,
+# as the inline extractors and block node functions used to, against the
+# patterns compiled once in the registry. Runs over the blocks of a 10k page
+# corpus, once with re's cache warm and once with extension patterns cycling
+# through it so that it evicts the grammar.
+# Run from the repository root: python bench/bench_patterns.py [corpus] [scale]
+import random
+import re
+import sys
+from os import path
+from time import perf_counter
+
+BENCH_DIR = path.dirname(path.abspath(__file__))
+sys.path.insert(0, path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import corpora
+from blocks import markdown_to_blocks
+from patterns import (
+    image_regex,
+    link_regex,
+    quote_marker_regex,
+    unordered_list_marker_regex,
+    ordered_list_marker_regex,
+)
+
+# More distinct patterns than re keeps compiled, a few of them tried per block
+EXTENSION_PATTERNS = [f"@ext{index}:(\\w+)" for index in range(1024)]
+EXTENSIONS_PER_BLOCK = 4
+
+
+def uncompiled_block(block: str):
+    re.findall(r"!\[(.*?)\]\((.*?)\)", block)
+    re.findall(r"\[(.*?)\]\((.*?)\)", block)
+    re.split("\n?> ", block)
+    re.split("\n?[*-] ", block)
+    re.split("\n?\\d+\\. ", block)
+
+
+def registered_block(block: str):
+    image_regex.findall(block)
+    link_regex.findall(block)
+    quote_marker_regex.split(block)
+    unordered_list_marker_regex.split(block)
+    ordered_list_marker_regex.split(block)
+
+
+# Only the calls to func are timed. The extension searches, and compiling
+# the patterns they evicted, cost the same either way and would drown them.
+def run(func, blocks: list, extensions: list):
+    elapsed = 0.0
+    for index, block in enumerate(blocks):
+        for offset in range(EXTENSIONS_PER_BLOCK if extensions else 0):
+            pattern = index * EXTENSIONS_PER_BLOCK + offset
+            re.search(extensions[pattern % len(extensions)], block)
+        start = perf_counter()
+        func(block)
+        elapsed += perf_counter() - start
+    return elapsed
+
+
+def best_run(func, blocks: list, extensions: list, repeat=3):
+    return min(run(func, blocks, extensions) for _ in range(repeat))
+
+
+def main():
+    name = sys.argv[1] if len(sys.argv) > 1 else "small_pages"
+    scale = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    blocks = []
+    pages = 0
+    for _, markdown in corpora[name](random.Random(f"{name}:0"), scale):
+        blocks.extend(markdown_to_blocks(markdown))
+        pages += 1
+    print(f"{name}: {pages} pages, {len(blocks)} blocks")
+    for label, extensions in [("warm re cache", []), ("thrashed", EXTENSION_PATTERNS)]:
+        re.purge()
+        uncompiled = best_run(uncompiled_block, blocks, extensions)
+        registered = best_run(registered_block, blocks, extensions)
+        saved = (uncompiled - registered) / len(blocks) * 1e9
+        print(
+            f"  {label:<14} {uncompiled * 1000:>8.1f} -> {registered * 1000:>8.1f} ms "
+            f"({saved:>7.0f} ns/block saved, {uncompiled / registered:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
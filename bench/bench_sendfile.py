@@ -0,0 +1,106 @@
+# Compares the caching server's sendfile bodies and mapped hot files against
+# the handler it replaced, which copied uncached files through Python in
+# 64 KB reads and held cached files as bytes. Each handler serves a directory
+# of multi-megabyte files (sent with sendfile) and one of small hot files
+# (served from the cache) to concurrent keep-alive clients.
+#
+#   python bench/bench_sendfile.py [--concurrency 8] [--duration 5]
+#       [--file-size-mb 2 8 32]
+import argparse
+import random
+import sys
+import tempfile
+from os import path
+
+BENCH_DIR = path.dirname(path.abspath(__file__))
+sys.path.insert(0, path.join(BENCH_DIR, ".."))
+sys.path.insert(0, BENCH_DIR)
+
+import server
+from load_test import free_port, start_server, site_paths, load, summary
+
+COPY_CHUNK_SIZE = 1 << 16
+HOT_FILES = 64
+HOT_FILE_SIZE = 256 * 1024
+MODES = ["copy", "sendfile"]
+
+
+class CopyingHTTPRequestHandler(server.CachingHTTPRequestHandler):
+    def send_body(self, entry, start: int, end: int):
+        if entry.data is not None:
+            self.wfile.write(memoryview(entry.data)[start:end])
+            return
+        with open(entry.path, "rb") as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(COPY_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+
+def serve(args):
+    handler_class = server.CachingHTTPRequestHandler
+    if args.serve == "copy":
+        handler_class = CopyingHTTPRequestHandler
+    # The benchmark's files are never rewritten while served
+    handler_class.file_cache = server.FileCache(map_files=args.serve == "sendfile")
+    server.run(handler_class=handler_class, port=args.port, directory=args.dir)
+
+
+def write_files(dir: str, sizes: list, rng: random.Random):
+    for index, size in enumerate(sizes):
+        with open(path.join(dir, f"file{index}.bin"), "wb") as f:
+            f.write(rng.randbytes(size))
+
+
+def bench(label: str, dir: str, args):
+    paths = site_paths(dir)
+    print(f"{label}: {len(paths)} files, {args.concurrency} connections")
+    for mode in MODES:
+        port = free_port()
+        process = start_server(
+            dir, port, ["--serve", mode], script=path.abspath(__file__)
+        )
+        try:
+            latencies, errors, received, elapsed = load(port, paths, args)
+        finally:
+            process.terminate()
+            process.wait()
+        if not latencies:
+            print(f"  {mode:<9} no successful requests, {errors} errors")
+            continue
+        print(f"  {mode:<9} {summary(latencies, received, elapsed)}  {errors} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sendfile serving")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument(
+        "--file-size-mb", type=float, nargs="+", default=[2.0, 8.0, 32.0]
+    )
+    parser.add_argument("--serve", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--dir", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        return serve(args)
+    # load_test's workers read these
+    args.conditional = False
+    args.range = False
+
+    rng = random.Random(0)
+    sizes = [int(size * 1024 * 1024) for size in args.file_size_mb]
+    with tempfile.TemporaryDirectory() as dir:
+        write_files(dir, sizes, rng)
+        bench("multi-megabyte files", dir, args)
+    with tempfile.TemporaryDirectory() as dir:
+        write_files(dir, [HOT_FILE_SIZE] * HOT_FILES, rng)
+        bench("hot cached files", dir, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Compares peak traced memory of rendering a large page as one string against
+# streaming it through page_chunks into a file, and against streaming it from
+# the markdown file block by block.
+# Run from the repository root: python bench/bench_streaming.py [size in MB]
+import sys
+import tracemalloc
+from os import path, devnull, remove
+from tempfile import mkstemp
+from time import perf_counter
+
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), "..", "src"))
+
+from generate_page import extract_title, page_chunks, open_page
+from markdown import markdown_to_html_node
+from template import Template
+
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+
+def make_markdown(size: int):
+    blocks = ["# Large page"]
+    total = 0
+    index = 0
+    while total < size:
+        block = (
+            f"Paragraph {index} with **bold**, _italic_, `code` and a "
+            f"[link](/pages/{index}) to keep the inline parser busy."
+        )
+        if index % 10 == 0:
+            block = f"* item {index}\n* item {index + 1}\n* item {index + 2}"
+        blocks.append(block)
+        total += len(block) + 2
+        index += 1
+    return "\n\n".join(blocks)
+
+
+def render_joined(markdown: str):
+    title = extract_title(markdown)
+    html = markdown_to_html_node(markdown).to_html()
+    page = TEMPLATE.replace("{{ Title }}", title).replace("{{ Content }}", html)
+    with open(devnull, "w", encoding="utf-8") as f:
+        f.write(page)
+
+
+def render_streamed(markdown: str):
+    with open(devnull, "w", encoding="utf-8") as f:
+        f.writelines(page_chunks(markdown, Template(TEMPLATE)))
+
+
+def render_from_file(markdown_path: str):
+    with open(devnull, "w", encoding="utf-8") as f:
+        with open_page(markdown_path) as (slots, _):
+            f.writelines(Template(TEMPLATE).iter_render(slots))
+
+
+def measure(func, markdown: str):
+    tracemalloc.start()
+    start = perf_counter()
+    func(markdown)
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    size_mb = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    markdown = make_markdown(int(size_mb * 1024 * 1024))
+    input_mb = len(markdown) / 1024 / 1024
+    print(f"input: {input_mb:.1f} MB")
+    fd, markdown_path = mkstemp(suffix=".md")
+    with open(fd, "w") as f:
+        f.write(markdown)
+    runs = [
+        ("joined", render_joined, markdown),
+        ("streamed", render_streamed, markdown),
+        ("from file", render_from_file, markdown_path),
+    ]
+    del markdown
+    try:
+        for name, func, source in runs:
+            elapsed, peak = measure(func, source)
+            peak_mb = peak / 1024 / 1024
+            print(
+                f"{name:>9}: {elapsed:6.2f}s  peak {peak_mb:8.3f} MB "
+                f"({peak_mb / input_mb:.3f}x input)"
+            )
+    finally:
+        remove(markdown_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+# Deterministic synthetic markdown corpora for the benchmarks. The same name,
+# scale and seed always produce byte-identical content trees.
+import random
+from os import path, makedirs
+
+WORDS = (
+    "the of and to in is was he for it with as his on be at by had are but from "
+    "or have an they which one you were her all she there would their we him "
+    "been has when who will more no if out so said what up its about into than "
+    "them can only other new some could time these two may then do first any my "
+    "now such like our over man me even most made after also did many before "
+    "must through back years where much your way well down should because each "
+    "just those people how too little state good very make world still own see "
+    "men work long get here between both life being under never day same another"
+).split()
+
+CODE_LINES = [
+    "def render(page):",
+    "    return page.render()",
+    "for index in range(10):",
+    "    print(index)",
+    "while queue:",
+    "    node = queue.pop()",
+    "if value is None:",
+    "    raise ValueError(value)",
+    "result = compute(left, right)",
+    "return result",
+]
+
+
+def words(rng: random.Random, count: int):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def paragraph(rng: random.Random, sentences=4, links=0, emphasis=1):
+    parts = []
+    for index in range(sentences):
+        parts.append(words(rng, rng.randint(6, 16)).capitalize() + ".")
+    for index in range(links):
+        target = rng.randint(0, 999)
+        parts.insert(
+            rng.randint(0, len(parts)), f"[{words(rng, 2)}](/page{target})"
+        )
+    for index in range(emphasis):
+        style = rng.choice(["**", "_", "`"])
+        parts.insert(rng.randint(0, len(parts)), f"{style}{words(rng, 2)}{style}")
+    return " ".join(parts)
+
+
+def unordered_list(rng: random.Random, items: int):
+    return "\n".join(f"* {words(rng, rng.randint(3, 9))}" for _ in range(items))
+
+
+def ordered_list(rng: random.Random, items: int):
+    return "\n".join(
+        f"{index + 1}. {words(rng, rng.randint(3, 9))}" for index in range(items)
+    )
+
+
+def code_block(rng: random.Random, lines: int):
+    body = "\n".join(rng.choice(CODE_LINES) for _ in range(lines))
+    return f"```\n{body}\n```"
+
+
+def quote(rng: random.Random, lines: int):
+    return "\n".join(f"> {words(rng, rng.randint(5, 12))}" for _ in range(lines))
+
+
+def page(rng: random.Random, blocks: list):
+    return "\n\n".join([f"# {words(rng, 4).title()}"] + blocks) + "\n"
+
+
+def small_page(rng: random.Random):
+    return page(rng, [paragraph(rng, 3, links=1), unordered_list(rng, 3)])
+
+
+def huge_page(rng: random.Random, size: int):
+    blocks = []
+    total = 0
+    while total < size:
+        kind = rng.randint(0, 5)
+        if kind == 0:
+            block = f"## {words(rng, 4).title()}"
+        elif kind == 1:
+            block = unordered_list(rng, rng.randint(3, 8))
+        elif kind == 2:
+            block = code_block(rng, rng.randint(3, 12))
+        elif kind == 3:
+            block = quote(rng, rng.randint(1, 4))
+        else:
+            block = paragraph(rng, rng.randint(3, 8), links=2, emphasis=2)
+        blocks.append(block)
+        total += len(block) + 2
+    return page(rng, blocks)
+
+
+def link_dense_page(rng: random.Random):
+    return page(rng, [paragraph(rng, 10, links=40, emphasis=5) for _ in range(5)])
+
+
+def list_dense_page(rng: random.Random):
+    blocks = []
+    for index in range(20):
+        if index % 2:
+            blocks.append(ordered_list(rng, rng.randint(5, 9)))
+        else:
+            blocks.append(unordered_list(rng, rng.randint(5, 30)))
+    return page(rng, blocks)
+
+
+def code_heavy_page(rng: random.Random):
+    blocks = []
+    for _ in range(15):
+        blocks.append(paragraph(rng, 1))
+        blocks.append(code_block(rng, rng.randint(10, 40)))
+    return page(rng, blocks)
+
+
+# Each corpus yields (relative directory, markdown) pairs; scale multiplies
+# the page count (or the page size for huge_pages)
+def corpus_small_pages(rng: random.Random, scale: float):
+    for index in range(int(2000 * scale)):
+        yield f"small/{index // 100}/{index}", small_page(rng)
+
+
+def corpus_huge_pages(rng: random.Random, scale: float):
+    for index in range(3):
+        yield f"huge/{index}", huge_page(rng, int(2 * 1024 * 1024 * scale))
+
+
+def corpus_link_dense(rng: random.Random, scale: float):
+    for index in range(int(200 * scale)):
+        yield f"links/{index}", link_dense_page(rng)
+
+
+def corpus_list_dense(rng: random.Random, scale: float):
+    for index in range(int(200 * scale)):
+        yield f"lists/{index}", list_dense_page(rng)
+
+
+def corpus_code_heavy(rng: random.Random, scale: float):
+    for index in range(int(200 * scale)):
+        yield f"code/{index}", code_heavy_page(rng)
+
+
+def corpus_deep_tree(rng: random.Random, scale: float):
+    for index in range(int(500 * scale)):
+        depth = 1 + index % 12
+        dirs = "/".join(f"d{(index >> level) % 3}" for level in range(depth))
+        yield f"deep/{dirs}/{index}", small_page(rng)
+
+
+corpora = {
+    "small_pages": corpus_small_pages,
+    "huge_pages": corpus_huge_pages,
+    "link_dense": corpus_link_dense,
+    "list_dense": corpus_list_dense,
+    "code_heavy": corpus_code_heavy,
+    "deep_tree": corpus_deep_tree,
+}
+
+
+# Writes the corpus under root as <dir>/index.md files and returns the number
+# of pages and total markdown bytes written
+def generate_corpus(name: str, root: str, scale=1.0, seed=0):
+    if name not in corpora:
+        raise ValueError(f"Unrecognized corpus {name}")
+    rng = random.Random(f"{name}:{seed}")
+    pages = 0
+    size = 0
+    for dir, markdown in corpora[name](rng, scale):
+        page_dir = path.join(root, dir)
+        makedirs(page_dir, exist_ok=True)
+        data = markdown.encode("utf-8")
+        with open(path.join(page_dir, "index.md"), "wb") as f:
+            f.write(data)
+        pages += 1
+        size += len(data)
+    return pages, size
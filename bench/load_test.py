@@ -0,0 +1,174 @@
+# Load test for server.py: starts it on a free port serving DIR (public/ by
+# default), requests every file under DIR from concurrent keep-alive
+# connections for a fixed duration and reports requests/sec and latency
+# percentiles.
+#
+#   python bench/load_test.py [--dir public] [--concurrency 16] [--duration 5]
+#       [--conditional] [--range] [--server-arg=--single-threaded ...]
+#
+# --conditional sends the ETag from a first response back as If-None-Match so
+# the server answers 304s, --range asks for the first KB of every file.
+# Against a server that does not keep connections alive, each request opens
+# a new one.
+import argparse
+import http.client
+import socket
+import subprocess
+import sys
+import threading
+from os import path, walk, sep
+from time import perf_counter, sleep
+
+ROOT_DIR = path.normpath(path.join(path.dirname(path.abspath(__file__)), ".."))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(dir: str, port: int, server_args: list, script=None):
+    server = subprocess.Popen(
+        [sys.executable, script or path.join(ROOT_DIR, "server.py"), "--dir", dir]
+        + ["--port", str(port)]
+        + server_args,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return server
+        except OSError:
+            sleep(0.05)
+    server.kill()
+    raise RuntimeError("Server did not start")
+
+
+def site_paths(dir: str):
+    paths = []
+    for current, _, names in walk(dir):
+        for name in sorted(names):
+            relative = path.relpath(path.join(current, name), dir).replace(sep, "/")
+            if name == "index.html":
+                relative = relative[: -len("index.html")]
+            paths.append("/" + relative)
+    return sorted(paths)
+
+
+def worker(port: int, paths: list, offset: int, deadline: float, args, results):
+    latencies = []
+    errors = 0
+    received = 0
+    etags = {}
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    index = offset
+    while perf_counter() < deadline:
+        url = paths[index % len(paths)]
+        index += 1
+        headers = {}
+        if args.conditional and url in etags:
+            headers["If-None-Match"] = etags[url]
+        if args.range:
+            headers["Range"] = "bytes=0-1023"
+        start = perf_counter()
+        try:
+            connection.request("GET", url, headers=headers)
+            response = connection.getresponse()
+            body = response.read()
+            if response.getheader("Connection", "").lower() == "close" or (
+                response.version == 10
+            ):
+                connection.close()
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+            continue
+        latencies.append(perf_counter() - start)
+        if response.status >= 400:
+            errors += 1
+        received += len(body)
+        if response.getheader("ETag"):
+            etags[url] = response.getheader("ETag")
+    connection.close()
+    results.append((latencies, errors, received))
+
+
+# Returns (sorted latencies, errors, bytes received, elapsed seconds)
+def load(port: int, paths: list, args):
+    results = []
+    deadline = perf_counter() + args.duration
+    threads = [
+        threading.Thread(
+            target=worker, args=(port, paths, offset, deadline, args, results)
+        )
+        for offset in range(args.concurrency)
+    ]
+    start = perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = perf_counter() - start
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = sum(result[1] for result in results)
+    received = sum(result[2] for result in results)
+    return latencies, errors, received, elapsed
+
+
+def percentile(values: list, fraction: float):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summary(latencies: list, received: int, elapsed: float):
+    return (
+        f"{len(latencies) / elapsed:,.0f} requests/s  "
+        f"{received / elapsed / 1024 / 1024:.1f} MB/s  "
+        f"p50 {percentile(latencies, 0.5) * 1000:.2f} ms  "
+        f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms  "
+        f"max {latencies[-1] * 1000:.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test server.py")
+    parser.add_argument("--dir", default=path.join(ROOT_DIR, "public"))
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--conditional", action="store_true")
+    parser.add_argument("--range", action="store_true")
+    parser.add_argument(
+        "--server-arg",
+        action="append",
+        default=[],
+        help="Extra argument for server.py, such as --server-arg=--single-threaded",
+    )
+    args = parser.parse_args()
+
+    paths = site_paths(args.dir)
+    if not paths:
+        print(f"No files to request in {args.dir}")
+        return 1
+    port = free_port()
+    server = start_server(args.dir, port, args.server_arg)
+    try:
+        latencies, errors, received, elapsed = load(port, paths, args)
+    finally:
+        server.terminate()
+        server.wait()
+
+    if not latencies:
+        print(f"No successful requests, {errors} errors")
+        return 1
+    print(
+        f"{len(latencies)} requests to {len(paths)} paths from {args.concurrency} "
+        f"connections in {elapsed:.1f}s, {errors} errors"
+    )
+    print(summary(latencies, received, elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+# Benchmark harness for the markdown pipeline.
+#
+#   python bench/run.py run [--corpus NAME ...] [--scale S] [--save PATH]
+#   python bench/run.py compare BASELINE [CURRENT] [--threshold PERCENT]
+#
+# run renders each synthetic corpus from bench/corpus.py through
+# generate_pages_recursive and records throughput, peak traced memory and the
+# slowest pipeline functions. compare exits non-zero when any metric in
+# CURRENT (or a fresh run) is worse than BASELINE by more than the threshold.
+import argparse
+import cProfile
+import io
+import json
+import platform
+import pstats
+import sys
+import tracemalloc
+from contextlib import redirect_stdout
+from os import path
+from shutil import rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+BENCH_DIR = path.dirname(path.abspath(__file__))
+SRC_DIR = path.normpath(path.join(BENCH_DIR, "..", "src"))
+sys.path.insert(0, SRC_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from corpus import corpora, generate_corpus
+from generate_page import generate_pages_recursive
+
+BASELINE_PATH = path.join(BENCH_DIR, "baseline.json")
+TEMPLATE = "<html><title>{{ Title }}</title><body>{{ Content }}</body></html>"
+
+# Metric name -> whether a larger value is better
+metrics = {
+    "pages_per_second": True,
+    "mb_per_second": True,
+    "peak_bytes": False,
+}
+
+
+def render(content: str, template_path: str, output: str):
+    rmtree(output, ignore_errors=True)
+    with redirect_stdout(io.StringIO()):
+        generate_pages_recursive(content, template_path, output)
+
+
+def top_functions(stats: pstats.Stats, top: int):
+    functions = []
+    for (file, line, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        if path.dirname(path.abspath(file)) != SRC_DIR:
+            continue
+        functions.append(
+            {
+                "function": f"{path.basename(file)}:{line}({name})",
+                "calls": calls,
+                "tottime": tottime,
+                "cumtime": cumtime,
+            }
+        )
+    functions.sort(key=lambda function: -function["tottime"])
+    return functions[:top]
+
+
+def bench_corpus(name: str, scale: float, repeat: int, top: int):
+    root = mkdtemp(prefix=f"bench-{name}-")
+    try:
+        content = path.join(root, "content")
+        output = path.join(root, "public")
+        template_path = path.join(root, "template.html")
+        with open(template_path, "w", encoding="utf-8") as f:
+            f.write(TEMPLATE)
+        pages, size = generate_corpus(name, content, scale)
+
+        best = float("inf")
+        for _ in range(repeat):
+            start = perf_counter()
+            render(content, template_path, output)
+            best = min(best, perf_counter() - start)
+
+        tracemalloc.start()
+        render(content, template_path, output)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        profile = cProfile.Profile()
+        profile.enable()
+        render(content, template_path, output)
+        profile.disable()
+
+        return {
+            "pages": pages,
+            "bytes": size,
+            "seconds": best,
+            "pages_per_second": pages / best,
+            "mb_per_second": size / 1024 / 1024 / best,
+            "peak_bytes": peak,
+            "functions": top_functions(pstats.Stats(profile), top),
+        }
+    finally:
+        rmtree(root, ignore_errors=True)
+
+
+def run(names: list, scale: float, repeat: int, top: int):
+    results = {
+        "python": platform.python_version(),
+        "scale": scale,
+        "corpora": {},
+    }
+    for name in names:
+        result = bench_corpus(name, scale, repeat, top)
+        results["corpora"][name] = result
+        print(
+            f"{name:<12} {result['pages']:>6} pages {result['bytes'] / 1024 / 1024:>7.2f} MB "
+            f"{result['pages_per_second']:>9.1f} pages/s {result['mb_per_second']:>7.2f} MB/s "
+            f"{result['peak_bytes'] / 1024 / 1024:>8.1f} MB peak"
+        )
+        for function in result["functions"][:5]:
+            print(
+                f"{'':<14}{function['tottime']:>8.3f}s {function['calls']:>9} calls  "
+                f"{function['function']}"
+            )
+    return results
+
+
+# Returns a line per metric that got worse than the baseline by more than
+# threshold percent
+def compare(baseline: dict, current: dict, threshold: float):
+    regressions = []
+    for name, result in current["corpora"].items():
+        base = baseline["corpora"].get(name)
+        if base is None:
+            continue
+        for metric, higher_is_better in metrics.items():
+            before, after = base[metric], result[metric]
+            if not before:
+                continue
+            change = (after - before) / before * 100
+            worse = -change if higher_is_better else change
+            status = "REGRESSION" if worse > threshold else "ok"
+            line = f"{name:<12} {metric:<17} {before:>14.2f} -> {after:>14.2f} ({change:+6.1f}%) {status}"
+            print(line)
+            if worse > threshold:
+                regressions.append(line)
+    return regressions
+
+
+def load(results_path: str):
+    with open(results_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save(results: dict, results_path: str):
+    with open(results_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {results_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Markdown pipeline benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Benchmark the synthetic corpora")
+    run_parser.add_argument(
+        "--corpus", action="append", choices=sorted(corpora), help="Corpus to run"
+    )
+    run_parser.add_argument("--scale", type=float, default=1.0)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--top", type=int, default=15)
+    run_parser.add_argument(
+        "--save",
+        nargs="?",
+        const=BASELINE_PATH,
+        help=f"Save results as a baseline (default {BASELINE_PATH})",
+    )
+
+    compare_parser = commands.add_parser(
+        "compare", help="Compare results against a saved baseline"
+    )
+    compare_parser.add_argument("baseline", nargs="?", default=BASELINE_PATH)
+    compare_parser.add_argument(
+        "current", nargs="?", help="Saved results to compare, runs fresh if omitted"
+    )
+    compare_parser.add_argument("--threshold", type=float, default=10.0)
+    compare_parser.add_argument("--repeat", type=int, default=3)
+    compare_parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run(args.corpus or list(corpora), args.scale, args.repeat, args.top)
+        if args.save:
+            save(results, args.save)
+        return 0
+
+    baseline = load(args.baseline)
+    if args.current:
+        current = load(args.current)
+    else:
+        current = run(
+            list(baseline["corpora"]), baseline["scale"], args.repeat, args.top
+        )
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold}%")
+        return 1
+    print("No regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
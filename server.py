@@ -1,6 +1,32 @@
 import os
 import argparse
-from http.server import HTTPServer, SimpleHTTPRequestHandler
+import mmap
+import stat
+import threading
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import HTTPServer, ThreadingHTTPServer, SimpleHTTPRequestHandler
+from time import monotonic
+from urllib.parse import urlsplit
+
+FILE_CACHE_SIZE = 64 * 1024 * 1024
+MAX_CACHED_FILE_SIZE = 1024 * 1024
+# With map_files, cached files from this size up are memory mapped. CPython's
+# mmap keeps a duplicate of the file descriptor open for as long as the map
+# lives, so smaller files, the bulk of a site, are held as bytes and only so
+# many maps are kept at once, well below the usual limit of 1024 descriptors.
+# A mapped file truncated in place kills the server with SIGBUS on its next
+# read, so only a build's output, whose files are replaced rather than
+# rewritten, is mapped, and never a file hard linked from elsewhere (as
+# --copy-mode hardlink links static files).
+MAP_MIN_FILE_SIZE = 64 * 1024
+MAX_MAPPED_FILES = 128
+REVALIDATE_SECONDS = 1.0
+
+# Content-Encoding -> suffix of the sibling written by the build's --compress
+# stage, in order of preference
+PRECOMPRESSED = [("br", ".br"), ("gzip", ".gz")]
 
 
 class CORSHTTPRequestHandler(SimpleHTTPRequestHandler):
@@ -10,14 +36,345 @@ class CORSHTTPRequestHandler(SimpleHTTPRequestHandler):
         self.send_header("Access-Control-Allow-Headers", "*")
         super().end_headers()
 
+    # Without a length, a client on a keep-alive connection waits for a
+    # body that never comes
     def do_OPTIONS(self):
         self.send_response(200, "OK")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+# A file's validators and, when it is small enough to keep, its contents.
+# Precompressed siblings carry their encoding, which is part of their ETag.
+class CachedFile:
+    def __init__(
+        self, path: str, stats, content_type: str, data=None, encoding=None
+    ) -> None:
+        self.path = path
+        self.size = stats.st_size
+        self.mtime = stats.st_mtime
+        self.mtime_ns = stats.st_mtime_ns
+        self.content_type = content_type
+        self.encoding = encoding
+        tag = f"{stats.st_mtime_ns:x}-{stats.st_size:x}"
+        if encoding is not None:
+            tag = f"{tag}-{encoding}"
+        self.etag = f'"{tag}"'
+        self.last_modified = formatdate(stats.st_mtime, usegmt=True)
+        self.data = data
+        self.checked = monotonic()
+
+    def __repr__(self) -> str:
+        return f"CachedFile({self.path}, {self.size}, {self.etag})"
+
+
+# Hot files shared by every request thread, evicting the least recently used
+# contents once they exceed max_bytes. Files larger than max_file_size only
+# have their validators cached. A cached file is stat'ed again at most once
+# every revalidate seconds, so edits show up within that time without a stat
+# and a read per request.
+#
+# Cached contents of at least map_min_file_size are read-only memory maps,
+# up to max_mapped of them, so they share the page cache rather than being
+# copied onto the heap. The build never rewrites an output in place (pages,
+# copies and site indexes replace the old file), so a mapping keeps seeing
+# the old contents until revalidation maps the new file.
+class FileCache:
+    def __init__(
+        self,
+        max_bytes=FILE_CACHE_SIZE,
+        max_file_size=MAX_CACHED_FILE_SIZE,
+        revalidate=REVALIDATE_SECONDS,
+        map_min_file_size=MAP_MIN_FILE_SIZE,
+        max_mapped=MAX_MAPPED_FILES,
+        map_files=False,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.max_file_size = min(max_file_size, max_bytes)
+        self.revalidate = revalidate
+        self.map_min_file_size = map_min_file_size
+        self.max_mapped = max_mapped
+        self.map_files = map_files
+        self.entries = OrderedDict()
+        self.size = 0
+        self.mapped = 0
+        # Paths of precompressed siblings found missing, and when
+        self.missing = {}
+        self.lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return (
+            f"FileCache({len(self.entries)} files, {self.size} bytes, "
+            f"{self.mapped} mapped)"
+        )
+
+    # Raises OSError when path is missing or not a regular file. Misses are
+    # remembered for encoded siblings, which are looked for on every request
+    # for their file.
+    def get(self, path: str, content_type: str, encoding=None):
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                self.entries.move_to_end(path)
+            missing = self.missing.get(path)
+        now = monotonic()
+        if entry is not None and now - entry.checked < self.revalidate:
+            return entry
+        if missing is not None and now - missing < self.revalidate:
+            raise FileNotFoundError(path)
+        try:
+            stats = os.stat(path)
+        except FileNotFoundError:
+            if encoding is not None:
+                with self.lock:
+                    self.missing[path] = now
+            raise
+        if not stat.S_ISREG(stats.st_mode):
+            raise IsADirectoryError(path)
+        if entry is not None and (entry.mtime_ns, entry.size) == (
+            stats.st_mtime_ns,
+            stats.st_size,
+        ):
+            entry.checked = now
+            return entry
+        data = None
+        if stats.st_size <= self.max_file_size:
+            data = self.load(path, stats)
+            if len(data) != stats.st_size:
+                # Changed since the stat, so serve it but do not keep it
+                return CachedFile(path, os.stat(path), content_type, data, encoding)
+        entry = CachedFile(path, stats, content_type, data, encoding)
+        self.put(entry)
+        return entry
+
+    def load(self, path: str, stats):
+        mapped = (
+            self.map_files
+            and stats.st_nlink == 1
+            and stats.st_size >= self.map_min_file_size
+        )
+        with self.lock:
+            mapped = mapped and self.mapped < self.max_mapped
+        if mapped:
+            return map_file(path)
+        return read_file(path)
+
+    def put(self, entry: CachedFile):
+        with self.lock:
+            self.remove(self.entries.pop(entry.path, None))
+            self.entries[entry.path] = entry
+            if entry.data is not None:
+                self.size += len(entry.data)
+            if isinstance(entry.data, mmap.mmap):
+                self.mapped += 1
+            while self.size > self.max_bytes or self.mapped > self.max_mapped:
+                self.remove(self.entries.popitem(last=False)[1])
+
+    # Takes an entry that has left the cache out of its totals, with the lock
+    # held
+    def remove(self, entry):
+        if entry is None or entry.data is None:
+            return
+        self.size -= len(entry.data)
+        if isinstance(entry.data, mmap.mmap):
+            self.mapped -= 1
+
+
+# Serves files from a FileCache over keep-alive connections with ETag and
+# Last-Modified validators, answering conditional requests with 304 Not
+# Modified and single byte ranges with 206 Partial Content. When the client
+# accepts it, a file's precompressed .br or .gz sibling is sent in its place.
+# Directory listings, redirects and errors are left to
+# SimpleHTTPRequestHandler.
+class CachingHTTPRequestHandler(CORSHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes, which Nagle's algorithm
+    # would hold back until the client's delayed ACK
+    disable_nagle_algorithm = True
+    file_cache = FileCache()
+
+    def do_GET(self):
+        self.serve(True)
+
+    def do_HEAD(self):
+        self.serve(False)
+
+    def serve(self, send_body: bool):
+        file_path = self.translate_path(self.path)
+        if urlsplit(self.path).path.endswith("/"):
+            file_path = os.path.join(file_path, "index.html")
+        content_type = self.guess_type(file_path)
+        try:
+            entry = self.file_cache.get(file_path, content_type)
+        except OSError:
+            f = self.send_head()
+            if f is not None:
+                try:
+                    if send_body:
+                        self.copyfile(f, self.wfile)
+                finally:
+                    f.close()
+            return
+        entry = self.precompressed_variant(entry) or entry
+
+        if self.not_modified(entry):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_validators(entry)
+            self.end_headers()
+            return
+
+        byte_range = self.requested_range(entry)
+        if byte_range is False:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{entry.size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if byte_range is None:
+            start, end = 0, entry.size - 1
+            self.send_response(HTTPStatus.OK)
+        else:
+            start, end = byte_range
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{entry.size}")
+        self.send_header("Content-Type", entry.content_type)
+        if entry.encoding is not None:
+            self.send_header("Content-Encoding", entry.encoding)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_validators(entry)
         self.end_headers()
+        if send_body:
+            self.send_body(entry, start, end + 1)
+
+    def send_validators(self, entry: CachedFile):
+        self.send_header("ETag", entry.etag)
+        self.send_header("Last-Modified", entry.last_modified)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+
+    # The freshest precompressed sibling the client accepts, if any. Range
+    # requests always get the file itself, so ranges keep addressing the
+    # same bytes.
+    def precompressed_variant(self, entry: CachedFile):
+        if "Range" in self.headers:
+            return None
+        accepted = accepted_encodings(self.headers.get("Accept-Encoding", ""))
+        for encoding, suffix in PRECOMPRESSED:
+            if not accepted.get(encoding, accepted.get("*", 0)) > 0:
+                continue
+            try:
+                variant = self.file_cache.get(
+                    entry.path + suffix, entry.content_type, encoding
+                )
+            except OSError:
+                continue
+            # A sibling older than its file was not rewritten by the last build
+            if variant.mtime_ns == entry.mtime_ns:
+                return variant
+        return None
+
+    # Files that are not cached go from the page cache to the socket with
+    # sendfile, without passing through Python buffers (socket.sendfile falls
+    # back to a send loop where os.sendfile is unavailable)
+    def send_body(self, entry: CachedFile, start: int, end: int):
+        if entry.data is not None:
+            self.wfile.write(memoryview(entry.data)[start:end])
+            return
+        with open(entry.path, "rb") as f:
+            self.connection.sendfile(f, start, end - start)
+
+    # If-None-Match takes precedence over If-Modified-Since
+    def not_modified(self, entry: CachedFile):
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or entry.etag in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, IndexError, OverflowError, ValueError):
+            return False
+        if since.tzinfo is None:
+            return False
+        return int(entry.mtime) <= since.timestamp()
+
+    # Returns (first byte, last byte) for a satisfiable single range, False
+    # for an unsatisfiable one and None to send the whole file, which is also
+    # the answer to multiple ranges and to an If-Range that no longer matches
+    def requested_range(self, entry: CachedFile):
+        header = self.headers.get("Range")
+        if header is None or not header.startswith("bytes="):
+            return None
+        if_range = self.headers.get("If-Range")
+        if if_range is not None and if_range not in (entry.etag, entry.last_modified):
+            return None
+        spec = header[len("bytes=") :].strip()
+        if "," in spec:
+            return None
+        first, _, last = spec.partition("-")
+        try:
+            if not first:
+                suffix = int(last)
+                if suffix <= 0 or entry.size == 0:
+                    return False
+                return max(0, entry.size - suffix), entry.size - 1
+            first = int(first)
+            last = int(last) if last else entry.size - 1
+        except ValueError:
+            return None
+        if first >= entry.size or last < first:
+            return False
+        return first, min(last, entry.size - 1)
+
+
+def read_file(path: str):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Evicted maps are closed once the last response using them is sent and the
+# map is garbage collected
+def map_file(path: str):
+    with open(path, "rb") as f:
+        try:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return b""
+
+
+# Accept-Encoding header -> {encoding: q value}
+def accepted_encodings(header: str):
+    accepted = {}
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+# A thread per connection, with a listen backlog deep enough that bursts of
+# new connections are not dropped and retried a second later
+class ThreadedHTTPServer(ThreadingHTTPServer):
+    request_queue_size = 128
 
 
 def run(
-    server_class=HTTPServer,
-    handler_class=CORSHTTPRequestHandler,
+    server_class=ThreadedHTTPServer,
+    handler_class=CachingHTTPRequestHandler,
     port=8000,
     directory=None,
 ):
@@ -35,6 +392,31 @@ if __name__ == "__main__":
         "--dir", type=str, help="Directory to serve files from", default="."
     )
     parser.add_argument("--port", type=int, help="Port to serve HTTP on", default=8888)
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=FILE_CACHE_SIZE // 1024 // 1024,
+        help="Memory limit in MB for hot files (0 serves every request from disk "
+        "without validators or ranges)",
+    )
+    parser.add_argument(
+        "--single-threaded",
+        action="store_true",
+        help="Handle one request at a time",
+    )
+    parser.add_argument(
+        "--map-files",
+        action="store_true",
+        help="Memory map hot files of 64 KB and more. Only safe for a build's "
+        "public/ directory, whose files are replaced rather than rewritten",
+    )
     args = parser.parse_args()
 
-    run(port=args.port, directory=args.dir)
+    handler_class = CORSHTTPRequestHandler
+    if args.cache_size > 0:
+        handler_class = CachingHTTPRequestHandler
+        handler_class.file_cache = FileCache(
+            args.cache_size * 1024 * 1024, map_files=args.map_files
+        )
+    server_class = HTTPServer if args.single_threaded else ThreadedHTTPServer
+    run(server_class, handler_class, port=args.port, directory=args.dir)
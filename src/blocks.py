@@ -6,29 +6,126 @@ block_type_unordered_list = "unordered_list"
 block_type_ordered_list = "ordered_list"
 
 
+CODE_FENCE = "```"
+
+
 def markdown_to_blocks(markdown: str):
-    return list(
-        filter(
-            # Reject empty strings
-            lambda s: len(s) > 1,
-            # Remove whitespace
-            [block.strip() for block in markdown.split("\n\n")],
-        )
-    )
+    return list(iter_blocks(iter_lines(markdown)))
+
+
+# Yields the lines of text without their newlines, without splitting the whole
+# string up front
+def iter_lines(text: str):
+    start = 0
+    while True:
+        end = text.find("\n", start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+# Lazily groups lines (from a string or an open file) into stripped blocks
+# separated by empty lines, rejecting blocks of a single character or less.
+# Empty lines inside a fenced code block do not end the block. A fence opens
+# on a line of ``` and an optional info string without backticks, so a block
+# starting with an inline code span is not one, and a fence that never closes
+# is split at its empty lines like any other text.
+def iter_blocks(lines, fences=True):
+    block = []
+    has_text = False
+    in_fence = False
+    for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if in_fence:
+            block.append(line)
+            in_fence = not line.rstrip().endswith(CODE_FENCE)
+            continue
+        if not line:
+            if block:
+                text = "\n".join(block).strip()
+                if len(text) > 1:
+                    yield text
+                block = []
+                has_text = False
+            continue
+        if not has_text:
+            opening = line.strip()
+            has_text = bool(opening)
+            in_fence = (
+                fences
+                and opening.startswith(CODE_FENCE)
+                and "`" not in opening[len(CODE_FENCE) :]
+            )
+        block.append(line)
+    if in_fence:
+        yield from iter_blocks(block, fences=False)
+    elif block:
+        text = "\n".join(block).strip()
+        if len(text) > 1:
+            yield text
 
 
 def block_to_block_type(block: str):
+    return classify_block(block)[0]
+
+
+# Returns (block type, lines), dispatching on the block's first character so
+# each block is checked against at most one block type. Blocks are split into
+# lines at most once; the lines are returned for quotes and lists, whose
+# html node functions reuse them, and None otherwise.
+def classify_block(block: str):
+    classify = block_classifiers.get(block[:1])
+    if classify is None:
+        return block_type_paragraph, None
+    return classify(block)
+
+
+def classify_heading(block: str):
     if is_heading_block(block):
-        return block_type_heading
+        return block_type_heading, None
+    return block_type_paragraph, None
+
+
+def classify_code(block: str):
     if is_code_block(block):
-        return block_type_code
-    if is_quote_block(block):
-        return block_type_quote
-    if is_unordered_list_block(block):
-        return block_type_unordered_list
-    if is_ordered_list_block(block):
-        return block_type_ordered_list
-    return block_type_paragraph
+        return block_type_code, None
+    return block_type_paragraph, None
+
+
+def classify_quote(block: str):
+    lines = block.split("\n")
+    if all(line.startswith(">") for line in lines):
+        return block_type_quote, lines
+    return block_type_paragraph, None
+
+
+def classify_unordered_list(block: str):
+    lines = block.split("\n")
+    if all(line.startswith(("* ", "- ")) for line in lines):
+        return block_type_unordered_list, lines
+    return block_type_paragraph, None
+
+
+def classify_ordered_list(block: str):
+    lines = block.split("\n")
+    if is_ordered_list(lines):
+        return block_type_ordered_list, lines
+    return block_type_paragraph, None
+
+
+# Only these first characters can start anything but a paragraph (an ordered
+# list has to start at 1)
+block_classifiers = {
+    "#": classify_heading,
+    "`": classify_code,
+    ">": classify_quote,
+    "*": classify_unordered_list,
+    "-": classify_unordered_list,
+    "1": classify_ordered_list,
+}
 
 
 def is_heading_block(block: str):
@@ -48,9 +145,14 @@ def is_unordered_list_block(block: str):
 
 
 def is_ordered_list_block(block: str):
-    numbers = [line.split(". ").pop(0) for line in block.split("\n")]
+    return is_ordered_list(block.split("\n"))
+
+
+# The numbers have to start at 1 and never decrease, compared as strings
+def is_ordered_list(lines: list):
+    numbers = [line.split(". ", 1)[0] for line in lines]
     return (
         numbers[0] == "1"
         and all(num.isdigit() for num in numbers)
-        and sorted(numbers) == numbers
+        and all(numbers[i] <= numbers[i + 1] for i in range(len(numbers) - 1))
     )
@@ -0,0 +1,206 @@
+import argparse
+import json
+import posixpath
+from os import path, makedirs, sep
+from urllib.parse import urlsplit
+
+BUILD_GRAPH_PATH = ".cache/build_graph.json"
+
+
+# The site URL of a page built from content_root/<dir>/index.md, such as
+# /majesty for content/majesty/index.md and / for the root page
+def page_url(source: str, content_root: str):
+    if path.isfile(content_root):
+        content_root = path.dirname(content_root)
+    dir = path.relpath(path.dirname(source), content_root)
+    if dir == ".":
+        return "/"
+    return "/" + dir.replace(sep, "/")
+
+
+def static_url(source: str, static_root: str):
+    return "/" + path.relpath(source, static_root).replace(sep, "/")
+
+
+# Resolves a link or image URL found on the page at page_url to the site
+# URL it points at, or None for links leaving the site. Queries, fragments,
+# trailing slashes and index.html are dropped so /majesty/ and
+# /majesty/index.html#intro both resolve to /majesty.
+def resolve_url(url: str, page_url="/"):
+    parts = urlsplit(url)
+    if parts.scheme or parts.netloc:
+        return None
+    if not parts.path:
+        return page_url
+    target = posixpath.join(page_url + "/", parts.path)
+    target = posixpath.normpath(target)
+    if target.startswith("//"):
+        target = target[1:]
+    if posixpath.basename(target) == "index.html":
+        target = posixpath.dirname(target)
+    return target.rstrip("/") or "/"
+
+
+# Which template each page was rendered with and which site URLs its links
+# and images point at, keyed by the page's markdown source. Edges are
+# recorded while pages render and persisted between builds, so the pages
+# affected by a change can be found without rendering anything.
+class BuildGraph:
+    def __init__(self, pages=None) -> None:
+        self.pages = pages if pages is not None else {}
+
+    def __repr__(self) -> str:
+        return f"BuildGraph({len(self.pages)} pages)"
+
+    @classmethod
+    def load(cls, graph_path: str):
+        if not path.isfile(graph_path):
+            return cls()
+        try:
+            with open(graph_path, encoding="utf-8") as f:
+                return cls(json.load(f)["pages"])
+        except (ValueError, KeyError):
+            # A corrupt graph is rebuilt from the pages rendered next
+            return cls()
+
+    def save(self, graph_path: str):
+        dir = path.dirname(graph_path)
+        if dir and not path.exists(dir):
+            makedirs(dir)
+        with open(graph_path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+    def add_page(self, source: str, url: str, template: str, metadata):
+        links = {resolve_url(link, url) for _, link in metadata.links}
+        images = {resolve_url(image, url) for _, image in metadata.images}
+        self.pages[path.normpath(source)] = {
+            "url": url,
+            "template": path.normpath(template),
+            "links": sorted(links - {None}),
+            "images": sorted(images - {None}),
+        }
+
+    # Keeps the edges of a page skipped as current, adding them from its
+    # recorded metadata when the graph has not seen the page yet
+    def keep_page(self, source: str, url: str, template: str, metadata=None):
+        edges = self.pages.get(path.normpath(source))
+        if edges is not None:
+            edges["template"] = path.normpath(template)
+        elif metadata is not None:
+            self.add_page(source, url, template, metadata)
+
+    # Drops pages at source, or under it when source was a directory
+    def remove_source(self, source: str):
+        source = path.normpath(source)
+        removed = [
+            page
+            for page in self.pages
+            if page == source or page.startswith(source + sep)
+        ]
+        for page in removed:
+            del self.pages[page]
+        return sorted(removed)
+
+    # Drops pages whose markdown no longer exists
+    def prune(self):
+        removed = sorted(page for page in self.pages if not path.isfile(page))
+        for page in removed:
+            del self.pages[page]
+        return removed
+
+    def pages_using(self, template: str):
+        template = path.normpath(template)
+        return sorted(
+            page for page, edges in self.pages.items() if edges["template"] == template
+        )
+
+    # Pages linking to or embedding each site URL
+    def reverse_edges(self):
+        linked = {}
+        for page, edges in self.pages.items():
+            for url in edges["links"] + edges["images"]:
+                linked.setdefault(url, set()).add(page)
+        return linked
+
+    # The pages whose output depends on the changed paths: the pages
+    # themselves and every page rendered with a changed template
+    def rebuild_set(self, changed: list):
+        changed = {path.normpath(file) for file in changed}
+        return sorted(
+            page
+            for page, edges in self.pages.items()
+            if page in changed or edges["template"] in changed
+        )
+
+    # The pages to rebuild plus the pages linking to or embedding the site
+    # URLs of the changed pages and static files, or of anything below a
+    # changed directory, whose links need checking again even though their
+    # output is unchanged
+    def affected(self, changed: list, content_root: str, static_root: str):
+        changed = [path.normpath(file) for file in changed]
+        affected = set(self.rebuild_set(changed))
+        linked = self.reverse_edges()
+        for file in changed:
+            if file in self.pages:
+                url = self.pages[file]["url"]
+            elif file.startswith(path.normpath(content_root) + sep):
+                if file.endswith(".md"):
+                    url = page_url(file, content_root)
+                else:
+                    url = static_url(file, content_root)
+            elif file.startswith(path.normpath(static_root) + sep):
+                url = static_url(file, static_root)
+            else:
+                continue
+            for target, pages in linked.items():
+                if target == url or target.startswith(url.rstrip("/") + "/"):
+                    affected |= pages
+        return sorted(affected)
+
+    # Saved compactly, which json.dumps does with its C encoder, and
+    # indented for people reading an export
+    def to_json(self, indent=None):
+        return json.dumps({"pages": self.pages}, indent=indent, sort_keys=True)
+
+    def to_dot(self):
+        lines = ["digraph build {", "  rankdir=LR;"]
+        for page, edges in sorted(self.pages.items()):
+            lines.append(f'  "{page}" [shape=box, label="{page}\\n{edges["url"]}"];')
+            lines.append(f'  "{page}" -> "{edges["template"]}" [label="template"];')
+            for url in edges["links"]:
+                lines.append(f'  "{page}" -> "{url}" [label="link"];')
+            for url in edges["images"]:
+                lines.append(f'  "{page}" -> "{url}" [label="image", style=dashed];')
+        lines.append("}")
+        return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Inspect the page, template and asset graph of the last build"
+    )
+    parser.add_argument("--graph", default=BUILD_GRAPH_PATH)
+    parser.add_argument(
+        "--format", choices=["json", "dot"], default="json", help="Export format"
+    )
+    parser.add_argument(
+        "--affected",
+        nargs="+",
+        metavar="PATH",
+        help="List the pages affected by changes to these paths instead",
+    )
+    args = parser.parse_args()
+
+    graph = BuildGraph.load(args.graph)
+    if args.affected:
+        rebuild = set(graph.rebuild_set(args.affected))
+        for page in graph.affected(args.affected, "content", "static"):
+            print(f"{'rebuild' if page in rebuild else 'check'} {page}")
+    elif args.format == "dot":
+        print(graph.to_dot(), end="")
+    else:
+        print(graph.to_json(indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+import gzip
+from os import path, walk, stat, remove, replace, utime
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import brotli
+except ImportError:
+    # Optional, only gzip siblings are written without it
+    brotli = None
+
+COMPRESSIBLE_SUFFIXES = {
+    ".html",
+    ".css",
+    ".js",
+    ".mjs",
+    ".json",
+    ".svg",
+    ".xml",
+    ".txt",
+    ".map",
+}
+# Below this size the compressed sibling saves less than its headers cost
+MIN_COMPRESS_SIZE = 256
+COMPRESSED_SUFFIXES = (".gz", ".br")
+
+compress_result_written = "written"
+compress_result_skipped = "skipped"
+compress_result_removed = "removed"
+
+
+def gzip_compress(data: bytes):
+    # A fixed mtime keeps the output identical across builds
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_compress(data: bytes):
+    return brotli.compress(data, quality=11)
+
+
+# Sibling suffix -> compress function, for the encodings available here
+def encoders():
+    available = {".gz": gzip_compress}
+    if brotli is not None:
+        available[".br"] = brotli_compress
+    return available
+
+
+class CompressStats:
+    def __init__(self) -> None:
+        self.compressed_files = 0
+        self.original_bytes = 0
+        self.compressed_bytes = 0
+        self.skipped_files = 0
+        self.removed_files = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"CompressStats({self.compressed_files}, {self.original_bytes}, "
+            f"{self.compressed_bytes}, {self.skipped_files}, {self.removed_files})"
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"Compressed {self.compressed_files} files "
+            f"({self.original_bytes} -> {self.compressed_bytes} bytes), "
+            f"skipped {self.skipped_files} up to date, "
+            f"removed {self.removed_files} stale"
+        )
+
+
+# Writes a .gz (and .br when brotli is installed) sibling next to every
+# compressible file under dir on a thread pool; zlib and brotli release the
+# GIL while compressing. A sibling is up to date when its mtime matches the
+# file's, which it is given when written. Siblings that would no longer be
+# smaller than their file are removed; siblings of removed outputs are
+# removed along with them by the manifest.
+def compress_outputs(dir: str, threads=None):
+    suffixes = encoders()
+    tasks = []
+    stats = CompressStats()
+    for current, _, names in walk(dir):
+        for name in sorted(names):
+            file = path.join(current, name)
+            if path.splitext(file)[1] not in COMPRESSIBLE_SUFFIXES:
+                continue
+            for sibling_suffix, compress in suffixes.items():
+                tasks.append((file, file + sibling_suffix, compress))
+    with ThreadPoolExecutor(threads) as executor:
+        for result, size, compressed_size in executor.map(
+            lambda task: compress_file(*task), tasks
+        ):
+            if result == compress_result_written:
+                stats.compressed_files += 1
+                stats.original_bytes += size
+                stats.compressed_bytes += compressed_size
+            elif result == compress_result_removed:
+                stats.removed_files += 1
+            else:
+                stats.skipped_files += 1
+    return stats
+
+
+# Returns (result, file size, compressed size)
+def compress_file(file: str, sibling: str, compress):
+    stats = stat(file)
+    try:
+        sibling_stats = stat(sibling)
+    except FileNotFoundError:
+        sibling_stats = None
+    if sibling_stats is not None and sibling_stats.st_mtime_ns == stats.st_mtime_ns:
+        return compress_result_skipped, stats.st_size, sibling_stats.st_size
+    if stats.st_size < MIN_COMPRESS_SIZE:
+        return remove_sibling(sibling_stats, sibling), stats.st_size, 0
+    with open(file, "rb") as f:
+        data = f.read()
+    compressed = compress(data)
+    if len(compressed) >= len(data):
+        return remove_sibling(sibling_stats, sibling), stats.st_size, 0
+    temp_path = f"{sibling}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(compressed)
+        utime(temp_path, ns=(stats.st_atime_ns, stats.st_mtime_ns))
+    except BaseException:
+        remove(temp_path)
+        raise
+    replace(temp_path, sibling)
+    return compress_result_written, len(data), len(compressed)
+
+
+def remove_sibling(sibling_stats, sibling: str):
+    if sibling_stats is None:
+        return compress_result_skipped
+    remove(sibling)
+    return compress_result_removed
@@ -1,17 +1,164 @@
-from os import path, listdir, mkdir
-from shutil import copy
+from os import path, listdir, makedirs, stat, remove, link, utime
+from shutil import copyfileobj, copystat
+from concurrent.futures import ThreadPoolExecutor
 
+try:
+    import fcntl
+    from os import copy_file_range
+except ImportError:
+    # Not available outside of Linux, plain buffered copies still work
+    fcntl = None
+    copy_file_range = None
 
-def copy_contents(src: str, dest: str):
-    if path.isfile(src):
-        copy(src, dest)
-    else:
-        files = listdir(src)
-        for file in files:
-            src_path = path.join(src, file)
-            dest_path = path.join(dest, file)
-            if path.isfile(src_path):
-                copy(src_path, dest_path)
+from manifest import hash_file
+
+copy_mode_auto = "auto"
+copy_mode_copy = "copy"
+copy_mode_hardlink = "hardlink"
+copy_modes = [copy_mode_auto, copy_mode_copy, copy_mode_hardlink]
+
+# linux/fs.h _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+COPY_CHUNK_SIZE = 1 << 20
+
+
+class CopyStats:
+    def __init__(self) -> None:
+        self.copied_files = 0
+        self.copied_bytes = 0
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"CopyStats({self.copied_files}, {self.copied_bytes}, "
+            f"{self.skipped_files}, {self.skipped_bytes})"
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"Copied {self.copied_files} files ({self.copied_bytes} bytes), "
+            f"skipped {self.skipped_files} files ({self.skipped_bytes} bytes)"
+        )
+
+
+# Copies src into dest on a thread pool, skipping files whose size and mtime
+# already match in dest. When a manifest is given, files whose content is
+# unchanged since the last build are skipped too.
+def copy_contents(
+    src: str, dest: str, manifest=None, mode=copy_mode_auto, threads=None
+):
+    if mode not in copy_modes:
+        raise ValueError(f"Unrecognized copy mode {mode}")
+    tasks = discover_files(src, dest)
+    stats = CopyStats()
+    with ThreadPoolExecutor(threads) as executor:
+        results = executor.map(lambda task: sync_file(*task, manifest, mode), tasks)
+        for copied, size in results:
+            if copied:
+                stats.copied_files += 1
+                stats.copied_bytes += size
             else:
-                mkdir(dest_path)
-                copy_contents(src_path, dest_path)
+                stats.skipped_files += 1
+                stats.skipped_bytes += size
+    return stats
+
+
+# Returns (source, destination) file pairs, mirroring the directory tree into
+# dest along the way
+def discover_files(src: str, dest: str):
+    if path.isfile(src):
+        if path.isdir(dest):
+            dest = path.join(dest, path.basename(src))
+        return [(src, dest)]
+    files = []
+    for file in sorted(listdir(src)):
+        src_path = path.join(src, file)
+        dest_path = path.join(dest, file)
+        if path.isdir(src_path):
+            makedirs(dest_path, exist_ok=True)
+        files.extend(discover_files(src_path, dest_path))
+    return files
+
+
+# Returns whether the file was copied along with its size
+def sync_file(src: str, dest: str, manifest, mode: str):
+    src_stat = stat(src)
+    if is_up_to_date(src_stat, dest) and (
+        manifest is None or manifest.keep(src, dest)
+    ):
+        return False, src_stat.st_size
+    source_hash = ""
+    if manifest is not None:
+        source_hash = hash_file(src)
+        if manifest.is_current(src, dest, source_hash):
+            # Only the mtime moved, so realign it to skip hashing next time
+            utime(dest, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+            return False, src_stat.st_size
+    copy_file(src, dest, mode)
+    if manifest is not None:
+        manifest.record(src, dest, source_hash)
+    return True, src_stat.st_size
+
+
+def is_up_to_date(src_stat, dest: str):
+    try:
+        dest_stat = stat(dest)
+    except FileNotFoundError:
+        return False
+    return (
+        dest_stat.st_size == src_stat.st_size
+        and dest_stat.st_mtime_ns == src_stat.st_mtime_ns
+    )
+
+
+# dest is always unlinked first so a previous hardlink to src is never
+# written through
+def copy_file(src: str, dest: str, mode=copy_mode_auto):
+    if path.lexists(dest):
+        remove(dest)
+    if mode == copy_mode_hardlink:
+        try:
+            link(src, dest)
+            return
+        except OSError:
+            # Different filesystems or no hardlink support, copy instead
+            pass
+    with open(src, "rb") as fsrc, open(dest, "wb") as fdst:
+        if mode == copy_mode_copy:
+            # A plain buffered copy, for when the kernel's copies misbehave
+            copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
+        elif not clone_file(fsrc, fdst):
+            copy_file_data(fsrc, fdst)
+    copystat(src, dest)
+
+
+# Shares the source's blocks copy-on-write where the filesystem supports it
+def clone_file(fsrc, fdst):
+    if fcntl is None:
+        return False
+    try:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except OSError:
+        return False
+
+
+# Copies in the kernel with copy_file_range, falling back to a buffered copy
+# from wherever it stopped
+def copy_file_data(fsrc, fdst):
+    offset = 0
+    try:
+        if copy_file_range is None:
+            raise OSError("copy_file_range is unavailable")
+        while True:
+            copied = copy_file_range(
+                fsrc.fileno(), fdst.fileno(), COPY_CHUNK_SIZE, offset, offset
+            )
+            if copied == 0:
+                return
+            offset += copied
+    except OSError:
+        fsrc.seek(offset)
+        fdst.seek(offset)
+        copyfileobj(fsrc, fdst, COPY_CHUNK_SIZE)
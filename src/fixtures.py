@@ -0,0 +1,35 @@
+from os import path, makedirs, walk
+
+# Files for the tests that build sites in temporary directories
+
+
+# Writes text, or bytes as they are, creating the parent directories
+def write(file_path: str, contents):
+    makedirs(path.dirname(file_path) or ".", exist_ok=True)
+    if isinstance(contents, bytes):
+        with open(file_path, "wb") as f:
+            f.write(contents)
+        return
+    with open(file_path, "w", encoding="utf-8") as f:
+        f.write(contents)
+
+
+def read(file_path: str):
+    with open(file_path, encoding="utf-8") as f:
+        return f.read()
+
+
+def read_bytes(file_path: str):
+    with open(file_path, "rb") as f:
+        return f.read()
+
+
+# Relative path -> contents of every file under root
+def read_tree(root: str):
+    files = {}
+    for dir, _, names in walk(root):
+        for name in names:
+            file_path = path.join(dir, name)
+            with open(file_path, "rb") as f:
+                files[path.relpath(file_path, root)] = f.read()
+    return files
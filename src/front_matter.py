@@ -0,0 +1,205 @@
+import argparse
+import json
+from itertools import chain
+from os import path, makedirs, sep
+
+from manifest import hash_file
+
+FRONT_MATTER_PATH = ".cache/front_matter.json"
+
+# Opening (and closing) line -> separator between keys and values: YAML-lite
+# "key: value" lines between --- and TOML-style "key = value" between +++
+front_matter_delimiters = {"---": ":", "+++": "="}
+
+
+# Splits the front matter off the start of an iterator of lines (from a
+# string or an open file), reading no further than its closing delimiter.
+# Returns the front matter and an iterator over the remaining lines, the
+# markdown body.
+def split_front_matter(lines, source=""):
+    lines = iter(lines)
+    first = next(lines, None)
+    if first is None:
+        return {}, lines
+    delimiter = first.strip()
+    if delimiter not in front_matter_delimiters:
+        return {}, chain([first], lines)
+    header = []
+    for line in lines:
+        if line.strip() == delimiter:
+            return parse_front_matter(header, delimiter, source), lines
+        header.append(line.rstrip("\n"))
+    raise ValueError(f"Unterminated front matter in {source}")
+
+
+def read_front_matter(source: str):
+    with open(source, encoding="utf-8") as f:
+        return split_front_matter(f, source)[0]
+
+
+# Values are booleans, integers, quoted or bare strings, and lists written
+# inline as [a, b] or, YAML-lite only, as "- item" lines under an empty key
+def parse_front_matter(lines: list, delimiter: str, source=""):
+    separator = front_matter_delimiters[delimiter]
+    front_matter = {}
+    key = None
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        if stripped.startswith("- ") and key is not None and separator == ":":
+            if front_matter[key] == "":
+                front_matter[key] = []
+            if isinstance(front_matter[key], list):
+                front_matter[key].append(parse_value(stripped[2:]))
+                continue
+        if separator not in stripped:
+            raise ValueError(f"Invalid front matter line in {source}: {line}")
+        key, value = stripped.split(separator, 1)
+        key = key.strip()
+        if not key:
+            raise ValueError(f"Invalid front matter line in {source}: {line}")
+        front_matter[key] = parse_value(value.strip())
+    return front_matter
+
+
+def parse_value(value: str):
+    if value.startswith("[") and value.endswith("]"):
+        items = value[1:-1].split(",")
+        return [parse_value(item.strip()) for item in items if item.strip()]
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    if value in ("true", "false"):
+        return value == "true"
+    if value.lstrip("-").isdigit():
+        return int(value)
+    return value
+
+
+def is_draft(front_matter: dict):
+    return front_matter.get("draft") is True
+
+
+# A single tag may be written without a list
+def page_tags(front_matter: dict):
+    tags = front_matter.get("tags", [])
+    if isinstance(tags, list):
+        return [str(tag) for tag in tags]
+    return [str(tags)]
+
+
+# The front matter of every page keyed by its markdown source, along with the
+# hash of the source it was read from. Persisted between builds, so pages can
+# be listed, grouped by tag or skipped as drafts without reading past their
+# headers, and unchanged pages without reading them at all.
+class FrontMatterIndex:
+    def __init__(self, entries=None) -> None:
+        self.entries = entries if entries is not None else {}
+
+    def __repr__(self) -> str:
+        return f"FrontMatterIndex({len(self.entries)} pages)"
+
+    @classmethod
+    def load(cls, index_path: str):
+        if not path.isfile(index_path):
+            return cls()
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except ValueError:
+            return cls()
+
+    def save(self, index_path: str):
+        dir = path.dirname(index_path)
+        if dir and not path.exists(dir):
+            makedirs(dir)
+        # json.dumps without an indent uses the C encoder
+        with open(index_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.entries, sort_keys=True))
+
+    # Returns the front matter of source, reading its header only when the
+    # recorded hash differs from source_hash (or source_hash is unknown)
+    def get(self, source: str, source_hash=None):
+        source = path.normpath(source)
+        entry = self.entries.get(source)
+        if source_hash and entry is not None and entry["source_hash"] == source_hash:
+            return entry["front_matter"]
+        front_matter = read_front_matter(source)
+        self.entries[source] = {
+            "source_hash": source_hash or hash_file(source),
+            "front_matter": front_matter,
+        }
+        return front_matter
+
+    # Drops pages at source, or under it when source was a directory
+    def remove_source(self, source: str):
+        source = path.normpath(source)
+        removed = [
+            page
+            for page in self.entries
+            if page == source or page.startswith(source + sep)
+        ]
+        for page in removed:
+            del self.entries[page]
+        return sorted(removed)
+
+    # Drops pages whose markdown no longer exists
+    def prune(self):
+        removed = sorted(page for page in self.entries if not path.isfile(page))
+        for page in removed:
+            del self.entries[page]
+        return removed
+
+    # (source, front matter) pairs of the published pages, newest first by
+    # their date, then by source for pages without one
+    def listing(self):
+        pages = [
+            (source, entry["front_matter"])
+            for source, entry in sorted(self.entries.items())
+            if not is_draft(entry["front_matter"])
+        ]
+        dated = [page for page in pages if "date" in page[1]]
+        undated = [page for page in pages if "date" not in page[1]]
+        dated.sort(key=lambda page: str(page[1]["date"]), reverse=True)
+        return dated + undated
+
+    # Tag -> sources of the published pages tagged with it
+    def tags(self):
+        tags = {}
+        for source, front_matter in self.listing():
+            for tag in page_tags(front_matter):
+                tags.setdefault(tag, []).append(source)
+        return dict(sorted(tags.items()))
+
+    def drafts(self):
+        return sorted(
+            source
+            for source, entry in self.entries.items()
+            if is_draft(entry["front_matter"])
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="List pages, tags and drafts from the front matter index"
+    )
+    parser.add_argument("--index", default=FRONT_MATTER_PATH)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--tags", action="store_true", help="List pages by tag")
+    group.add_argument("--drafts", action="store_true", help="List draft pages")
+    args = parser.parse_args()
+
+    index = FrontMatterIndex.load(args.index)
+    if args.tags:
+        for tag, sources in index.tags().items():
+            print(f"{tag}: {', '.join(sources)}")
+    elif args.drafts:
+        for source in index.drafts():
+            print(source)
+    else:
+        for source, front_matter in index.listing():
+            print(f"{front_matter.get('date', '-')} {source}")
+
+
+if __name__ == "__main__":
+    main()
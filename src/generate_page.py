@@ -1,60 +1,328 @@
-from os import path, mkdir, makedirs, listdir
+from contextlib import contextmanager
+from os import path, makedirs, listdir, cpu_count, remove, replace
 from pathlib import Path
+from multiprocessing import Pool
+from tempfile import SpooledTemporaryFile
 
-from blocks import is_heading_block
+from blocks import is_heading_block, iter_blocks, iter_lines
+from manifest import hash_file
+from build_graph import page_url
 
-from markdown import markdown_to_html_node, markdown_to_blocks
+from markdown import blocks_to_html_chunks
+from metadata import PageMetadata, MAX_PAGE_LINKS, MAX_PAGE_TERMS
+from front_matter import split_front_matter, read_front_matter, is_draft
+from template import Template, load_template, find_template
+import profiler
+import render_cache
+from profiler import stage_block_split, stage_serialize, stage_write
 
-TITLE_PLACEHOLDER = "{{ Title }}"
-CONTENT_PLACEHOLDER = "{{ Content }}"
+CONTENT_SPOOL_SIZE = 1024 * 1024
+SPOOL_CHUNK_SIZE = 1 << 16
 
 
-# Creates index.html files for each markdown file
+# Creates index.html files for each markdown file and returns the page's
+# metadata, bounded under a memory budget
 # Implies that only one .md file can be stored in each directory within
-def generate_page(from_path: str, template_path: str, dest_path: str):
+def generate_page(from_path: str, template_path: str, dest_path: str, bounded=False):
     print(f"Generating page from {from_path} to {dest_path} using {template_path}")
 
-    template = open(template_path).read()
-    markdown = open(from_path).read()
+    with profiler.page(from_path), open_page(from_path, bounded) as (slots, metadata):
+        template = load_template(template_path)
+        write_page(dest_path, template.iter_render(slots))
+    return metadata
 
-    title = extract_title(markdown)
-    markdown_html = markdown_to_html_node(markdown).to_html()
 
-    template_with_title = template.replace(TITLE_PLACEHOLDER, title)
+# Returns the page's HTML and metadata
+def render_page(from_path: str, template_path: str):
+    template = load_template(template_path)
+
+    with open_page(from_path) as (slots, metadata):
+        return template.render(slots), metadata
+
+
+def page_chunks(markdown: str, template: Template):
+    front_matter, lines = split_front_matter(iter_lines(markdown), markdown)
+    with page_document(iter_blocks(lines), markdown, front_matter) as (slots, _):
+        yield from template.iter_render(slots)
+
+
+@contextmanager
+def open_page(from_path: str, bounded=False):
+    with open(from_path) as f:
+        front_matter, lines = split_front_matter(f, from_path)
+        blocks = iter_blocks(lines)
+        with page_document(blocks, from_path, front_matter, bounded) as page:
+            yield page
+
+
+# Parses and renders the blocks once, collecting the page metadata on the way.
+# The content is spooled (in memory up to CONTENT_SPOOL_SIZE, to a temporary
+# file beyond) so the title and other metadata slots that come before
+# {{ Content }} in a template are known before anything is written. Yields
+# the template slots and the metadata; a page without a heading fails here.
+@contextmanager
+def page_document(blocks, source: str, front_matter=None, bounded=False):
+    metadata = PageMetadata(front_matter=front_matter, bounded=bounded)
+    with SpooledTemporaryFile(CONTENT_SPOOL_SIZE, "w+", encoding="utf-8") as spool:
+        chunks = blocks_to_html_chunks(blocks, metadata)
+        # writelines only rolls the spool over to disk once every chunk is
+        # written, so a large page would be held whole in memory
+        for chunk in profiler.profile_chunks(stage_serialize, chunks):
+            spool.write(chunk)
+        if metadata.title is None:
+            raise ValueError(f"Page require a heading: {source}")
+        slots = metadata.slots()
+        slots["Content"] = lambda: read_spool(spool)
+        yield slots, metadata
+
+
+def read_spool(spool):
+    spool.seek(0)
+    return iter(lambda: spool.read(SPOOL_CHUNK_SIZE), "")
 
-    template_with_markdown = template_with_title.replace(
-        CONTENT_PLACEHOLDER, markdown_html
-    )
 
+# Writes to a temporary file first so a failure part way through a page never
+# leaves a truncated index.html behind
+def write_page(dest_path: str, chunks):
     dir = path.dirname(dest_path)
     if not path.exists(dir):
         makedirs(dir)
-    with open(path.join(dir, "index.html"), "w", encoding="utf-8") as f:
-        f.write(template_with_markdown)
+    output_path = page_output_path(dest_path)
+    temp_path = f"{output_path}.tmp"
+    try:
+        with profiler.stage(stage_write), open(temp_path, "w", encoding="utf-8") as f:
+            f.writelines(profiler.profile_chunks(stage_serialize, chunks))
+    except BaseException:
+        remove(temp_path)
+        raise
+    replace(temp_path, output_path)
+
+
+def page_output_path(dest_path: str):
+    return path.join(path.dirname(dest_path), "index.html")
 
 
 def extract_title(markdown: str):
-    blocks = markdown_to_blocks(markdown)
-    heading = [block for block in blocks if is_heading_block(block)]
-    try:
-        return heading.pop(0).lstrip("# ")
-    except:
+    _, lines = split_front_matter(iter_lines(markdown), markdown)
+    title = first_heading(iter_blocks(lines))
+    if title is None:
         raise ValueError(f"Page require a heading: {markdown}")
+    return title
+
+
+def first_heading(blocks):
+    with profiler.stage(stage_block_split):
+        for block in blocks:
+            if is_heading_block(block):
+                return block.lstrip("# ")
+    return None
+
+
+# Returns (markdown path, destination path) pairs in a deterministic order,
+# mirroring the content directory tree into dest_dir_path along the way
+def discover_pages(src_path_content: str, dest_dir_path: str):
+    if path.isfile(src_path_content):
+        if Path(src_path_content).suffix == ".md":
+            return [(src_path_content, dest_dir_path)]
+        return []
+    pages = []
+    for file in sorted(listdir(src_path_content)):
+        src_path = path.join(src_path_content, file)
+        dest_path = path.join(dest_dir_path, file)
+        if path.isdir(src_path):
+            makedirs(dest_path, exist_ok=True)
+        pages.extend(discover_pages(src_path, dest_path))
+    return pages
+
+
+# Runs in pool workers, so failures are returned rather than raised to keep
+# the remaining pages rendering. Workers inherit the parent's render cache
+# when forked and report their hits and misses back with each page.
+def render_page_task(task):
+    return run_page_task(render_page, task)
+
+
+# Under a memory budget workers write their (markdown path, template path,
+# destination path) pages themselves instead of sending the HTML back, so
+# no page is ever held whole
+def generate_page_task(task):
+    return run_page_task(lambda *page: (None, generate_page(*page, True)), task)
+
+
+def run_page_task(render, task):
+    cache = render_cache.active_cache
+    hits, misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+    try:
+        (html, metadata), error = render(*task), None
+    except Exception as e:
+        html, metadata, error = None, None, f"{type(e).__name__}: {e}"
+    if cache is not None:
+        hits, misses = cache.hits - hits, cache.misses - misses
+    return html, metadata, error, (hits, misses)
+
+
+# Yields (html, metadata, error, (cache hits, cache misses)) for each
+# (markdown path, template path, destination path) task in the order given.
+# Without a pool the metadata is None and the page is left to be streamed
+# straight to disk. Under a memory budget the workers have written the page
+# already and the html is None.
+def render_pages(tasks: list, jobs=1, budget=None):
+    if jobs <= 1 or len(tasks) <= 1:
+        yield from ((None, None, None, (0, 0)) for _ in tasks)
+        return
+    with Pool(min(jobs, len(tasks))) as pool:
+        if budget is not None:
+            yield from budget.imap(pool, generate_page_task, tasks)
+            return
+        chunksize = max(1, len(tasks) // (jobs * 4))
+        yield from pool.imap(render_page_task, [task[:2] for task in tasks], chunksize)
+
+
+# Removes what an earlier build generated from a page that is now a draft
+def skip_draft(from_path: str, dest_path: str, manifest=None, graph=None):
+    print(f"Skipping draft {from_path}")
+    output_path = path.normpath(page_output_path(dest_path))
+    if manifest is not None and output_path in manifest.entries:
+        manifest.remove_output(output_path)
+    if graph is not None:
+        graph.remove_source(from_path)
 
 
 # Only include .md files within content directory
 def generate_pages_recursive(
-    src_path_content: str, template_path: str, dest_dir_path: str
+    src_path_content: str,
+    template_path: str,
+    dest_dir_path: str,
+    manifest=None,
+    jobs=1,
+    graph=None,
+    front_matter=None,
+    budget=None,
+):
+    pages = discover_pages(src_path_content, dest_dir_path)
+    return generate_pages(
+        pages,
+        src_path_content,
+        template_path,
+        manifest,
+        jobs,
+        graph,
+        front_matter,
+        budget,
+    )
+
+
+# Generates the given (markdown path, destination path) pages and returns how
+# many were written. Each page uses the nearest template.html above it within
+# content_root, or template_path when there is none. With a manifest, pages
+# whose markdown and template are unchanged since the last build are skipped
+# and the metadata of every generated page is recorded alongside its output.
+# With a build graph, each page's template, link and image edges are
+# recorded too. Pages whose front matter marks them as drafts are skipped
+# before anything else is done with them, their front matter coming from
+# the front_matter index when one is given. jobs=0 uses every available core.
+# With a MemoryBudget, no more pages are rendered at once than it allows.
+def generate_pages(
+    pages: list,
+    content_root: str,
+    template_path: str,
+    manifest=None,
+    jobs=1,
+    graph=None,
+    front_matter=None,
+    budget=None,
 ):
-    if path.isfile(src_path_content) and Path(src_path_content).suffix == ".md":
-        generate_page(src_path_content, template_path, dest_dir_path)
-    else:
-        files = listdir(src_path_content)
-        for file in files:
-            src_path = path.join(src_path_content, file)
-            dest_path = path.join(dest_dir_path, file)
-            if path.isfile(src_path):
-                generate_page(src_path, template_path, dest_path)
+    if jobs == 0:
+        jobs = cpu_count() or 1
+    template_hashes = {}
+
+    errors = []
+    outstanding = []
+    for from_path, dest_path in pages:
+        page_template_path = find_template(from_path, content_root, template_path)
+        source_hash = ""
+        template_hash = ""
+        if manifest is not None:
+            if page_template_path not in template_hashes:
+                template_hashes[page_template_path] = hash_file(page_template_path)
+            template_hash = template_hashes[page_template_path]
+            source_hash = hash_file(from_path)
+        try:
+            if front_matter is not None:
+                page_front_matter = front_matter.get(from_path, source_hash)
             else:
-                mkdir(dest_path)
-                generate_pages_recursive(src_path, template_path, dest_path)
+                page_front_matter = read_front_matter(from_path)
+        except ValueError as e:
+            errors.append(f"{from_path}: {type(e).__name__}: {e}")
+            continue
+        if is_draft(page_front_matter):
+            skip_draft(from_path, dest_path, manifest, graph)
+            continue
+        if manifest is not None:
+            output_path = page_output_path(dest_path)
+            if manifest.is_current(from_path, output_path, source_hash, template_hash):
+                metadata = manifest.page_metadata(output_path)
+                if metadata is not None:
+                    if graph is not None:
+                        graph.keep_page(
+                            from_path,
+                            page_url(from_path, content_root),
+                            page_template_path,
+                            metadata,
+                        )
+                    continue
+        outstanding.append(
+            (from_path, dest_path, page_template_path, source_hash, template_hash)
+        )
+
+    rendered = render_pages(
+        [(page[0], page[2], page[1]) for page in outstanding], jobs, budget
+    )
+    generated = 0
+    cache = render_cache.active_cache
+    for page, (html, metadata, error, (hits, misses)) in zip(outstanding, rendered):
+        from_path, dest_path, page_template_path, source_hash, template_hash = page
+        if cache is not None:
+            cache.hits += hits
+            cache.misses += misses
+        if error is not None:
+            errors.append(f"{from_path}: {error}")
+            continue
+        try:
+            if metadata is None:
+                metadata = generate_page(
+                    from_path, page_template_path, dest_path, budget is not None
+                )
+            elif html is not None:
+                print(
+                    f"Generating page from {from_path} to {dest_path} using {page_template_path}"
+                )
+                write_page(dest_path, [html])
+        except Exception as e:
+            errors.append(f"{from_path}: {type(e).__name__}: {e}")
+            continue
+        generated += 1
+        if metadata.truncated:
+            print(
+                f"Indexed only part of {from_path} to fit the memory budget: a page "
+                f"keeps at most {MAX_PAGE_LINKS} links, images and headings each "
+                f"and {MAX_PAGE_TERMS} distinct words"
+            )
+        if graph is not None:
+            graph.add_page(
+                from_path, page_url(from_path, content_root), page_template_path, metadata
+            )
+        if manifest is not None:
+            manifest.record(
+                from_path,
+                page_output_path(dest_path),
+                source_hash,
+                template_hash,
+                metadata.to_dict(),
+            )
+
+    if errors:
+        raise ValueError(
+            f"Failed to generate {len(errors)} page(s):\n" + "\n".join(errors)
+        )
+    return generated
@@ -0,0 +1,301 @@
+from collections import OrderedDict
+from hashlib import blake2b
+from html import escape
+from sys import getsizeof
+
+from patterns import register_pattern
+
+HIGHLIGHT_CACHE_SIZE = 4 * 1024 * 1024
+
+# Token patterns shared between languages
+c_comment = r"//[^\n]*|/\*[\s\S]*?\*/"
+hash_comment = r"#[^\n]*"
+double_quoted = r'"(?:[^"\\\n]|\\.)*"'
+single_quoted = r"'(?:[^'\\\n]|\\.)*'"
+number = r"\b(?:0[xX][0-9a-fA-F_]+|\d[\d_]*(?:\.\d+)?(?:[eE][+-]?\d+)?)\b"
+
+
+# A language is tokenized by one regular expression of named alternatives,
+# tried in order at each position, whose group names are the token classes.
+# Identifiers are matched as a whole by the word pattern and then looked up
+# as keywords, literals or builtins, or taken as function names when called.
+class Language:
+    def __init__(
+        self,
+        name: str,
+        tokens: list,
+        keywords="",
+        literals="",
+        builtins="",
+        word=r"[A-Za-z_]\w*",
+        functions=True,
+    ) -> None:
+        self.name = name
+        self.word_tokens = {}
+        for token, words in [
+            ("builtin", builtins),
+            ("literal", literals),
+            ("keyword", keywords),
+        ]:
+            self.word_tokens.update((word, token) for word in words.split())
+        self.functions = functions
+        alternatives = [f"(?P<{token}>{pattern})" for token, pattern in tokens]
+        alternatives.append(f"(?P<word>{word})")
+        self.regex = register_pattern(f"highlight_{name}", "|".join(alternatives))
+
+    def __repr__(self) -> str:
+        return f"Language({self.name})"
+
+    # (token class, text) pairs covering the code, where text that is not a
+    # token has the class None
+    def tokenize(self, code: str):
+        tokens = []
+        word_tokens = self.word_tokens
+        position = 0
+        for match in self.regex.finditer(code):
+            token = match.lastgroup
+            start, end = match.span()
+            if token == "word":
+                token = word_tokens.get(match.group())
+                if token is None:
+                    if not (self.functions and code[end : end + 1] == "("):
+                        continue
+                    token = "function"
+            if start > position:
+                tokens.append((None, code[position:start]))
+            tokens.append((token, code[start:end]))
+            position = end
+        if position < len(code):
+            tokens.append((None, code[position:]))
+        return tokens
+
+
+c_family_tokens = [
+    ("comment", c_comment),
+    ("string", f"{double_quoted}|{single_quoted}"),
+    ("number", number),
+]
+
+languages = {
+    language.name: language
+    for language in [
+        Language(
+            "python",
+            [
+                ("comment", hash_comment),
+                (
+                    "string",
+                    r"[rRbBuUfF]{0,2}(?:\"\"\"[\s\S]*?\"\"\"|'''[\s\S]*?'''|"
+                    f"{double_quoted}|{single_quoted})",
+                ),
+                ("decorator", r"@[A-Za-z_][\w.]*"),
+                ("number", number),
+            ],
+            keywords="and as assert async await break class continue def del "
+            "elif else except finally for from global if import in is lambda "
+            "nonlocal not or pass raise return try while with yield match case",
+            literals="True False None",
+            builtins="self cls print len range open str int float list dict set "
+            "tuple bool isinstance super type object",
+        ),
+        Language(
+            "javascript",
+            [
+                ("comment", c_comment),
+                ("string", rf"{double_quoted}|{single_quoted}|`(?:[^`\\]|\\.)*`"),
+                ("number", number),
+            ],
+            keywords="async await break case catch class const continue debugger "
+            "default delete do else export extends finally for from function if "
+            "import in instanceof let new of return static switch throw try "
+            "typeof var void while with yield interface type enum implements",
+            literals="true false null undefined NaN Infinity this",
+            builtins="console window document Math JSON Object Array Promise",
+            word=r"[A-Za-z_$][\w$]*",
+        ),
+        Language(
+            "json",
+            [
+                ("property", rf"{double_quoted}(?=\s*:)"),
+                ("string", double_quoted),
+                ("number", r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?"),
+            ],
+            literals="true false null",
+            functions=False,
+        ),
+        Language(
+            "bash",
+            [
+                ("comment", r"(?<![^\s;])#[^\n]*"),
+                ("string", f"{double_quoted}|'[^']*'"),
+                ("variable", r"\$(?:\{[^}\n]*\}|[A-Za-z_]\w*|[0-9@#?$!*-])"),
+                ("number", r"\b\d+\b"),
+            ],
+            keywords="if then else elif fi for while until do done case esac in "
+            "function return local export readonly select time",
+            builtins="echo cd printf read set unset source exit test shift eval "
+            "exec trap",
+            word=r"[A-Za-z_][\w-]*",
+            functions=False,
+        ),
+        Language(
+            "css",
+            [
+                ("comment", r"/\*[\s\S]*?\*/"),
+                ("string", f"{double_quoted}|{single_quoted}"),
+                ("keyword", r"@[\w-]+|!important"),
+                ("property", r"[\w-]+(?=\s*:[^:{};]*[;}])"),
+                ("number", r"#[0-9a-fA-F]{3,8}\b|-?\d*\.?\d+(?:%|[a-zA-Z]+)?"),
+            ],
+            word=r"[A-Za-z_-][\w-]*",
+            functions=False,
+        ),
+        Language(
+            "html",
+            [
+                ("comment", r"<!--[\s\S]*?-->"),
+                ("tag", r"</?[A-Za-z][\w:-]*|/?>"),
+                ("attribute", r"[\w:-]+(?==)"),
+                ("string", f"{double_quoted}|{single_quoted}"),
+            ],
+            functions=False,
+        ),
+        Language(
+            "go",
+            [
+                ("comment", c_comment),
+                ("string", rf"{double_quoted}|{single_quoted}|`[^`]*`"),
+                ("number", number),
+            ],
+            keywords="break case chan const continue default defer else "
+            "fallthrough for func go goto if import interface map package range "
+            "return select struct switch type var",
+            literals="true false nil iota",
+            builtins="append cap close copy delete len make new panic print "
+            "println recover string int int64 float64 byte rune error bool",
+        ),
+        Language(
+            "rust",
+            [
+                ("comment", c_comment),
+                # Single quotes hold one character, or start a lifetime
+                ("string", rf"{double_quoted}|'(?:[^'\\\n]|\\[^'\n]+)'"),
+                ("label", r"'[A-Za-z_]\w*"),
+                ("number", number),
+            ],
+            keywords="as async await break const continue crate dyn else enum "
+            "extern fn for if impl in let loop match mod move mut pub ref return "
+            "static struct super trait type unsafe use where while",
+            literals="true false self Self None Some Ok Err",
+            builtins="String Vec Option Result Box println format vec",
+        ),
+        Language(
+            "c",
+            c_family_tokens + [("keyword", r"#\s*[a-z]+")],
+            keywords="auto break case char const continue default do double else "
+            "enum extern float for goto if inline int long register return short "
+            "signed sizeof static struct switch typedef union unsigned void "
+            "volatile while class namespace template typename public private "
+            "protected virtual using new delete bool",
+            literals="true false NULL nullptr this",
+        ),
+        Language(
+            "java",
+            c_family_tokens + [("decorator", r"@[A-Za-z_]\w*")],
+            keywords="abstract assert boolean break byte case catch char class "
+            "const continue default do double else enum extends final finally "
+            "float for if implements import instanceof int interface long native "
+            "new package private protected public return short static super "
+            "switch synchronized throw throws transient try var void volatile "
+            "while record",
+            literals="true false null this",
+            builtins="String Object System Integer List Map",
+        ),
+    ]
+}
+
+language_aliases = {
+    "py": "python",
+    "python3": "python",
+    "js": "javascript",
+    "jsx": "javascript",
+    "ts": "javascript",
+    "typescript": "javascript",
+    "sh": "bash",
+    "shell": "bash",
+    "zsh": "bash",
+    "console": "bash",
+    "xml": "html",
+    "svg": "html",
+    "golang": "go",
+    "rs": "rust",
+    "h": "c",
+    "cpp": "c",
+    "c++": "c",
+    "cc": "c",
+    "hpp": "c",
+}
+
+
+def get_language(name: str):
+    name = name.lower()
+    return languages.get(language_aliases.get(name, name))
+
+
+# Highlighted code keyed by its language and a hash of the code, so a snippet
+# repeated across pages is highlighted once, evicting the least recently used
+# once the highlighted HTML takes more than max_bytes
+class HighlightCache:
+    def __init__(self, max_bytes=HIGHLIGHT_CACHE_SIZE) -> None:
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return f"HighlightCache({len(self.entries)} entries, {self.size} bytes)"
+
+    def get(self, key: tuple):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key: tuple, html: str):
+        size = getsizeof(html)
+        if size > self.max_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= previous[0]
+        self.entries[key] = (size, html)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, (evicted, _) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+
+highlight_cache = HighlightCache()
+
+
+# Returns the code's HTML, with each token in a span classed hl-<token class>,
+# or None when the language is not one the highlighter knows
+def highlight(code: str, language_name: str):
+    language = get_language(language_name)
+    if language is None:
+        return None
+    key = (language.name, blake2b(code.encode("utf-8"), digest_size=16).digest())
+    html = highlight_cache.get(key)
+    if html is None:
+        html = "".join(
+            escape(text, quote=False)
+            if token is None
+            else f'<span class="hl-{token}">{escape(text, quote=False)}</span>'
+            for token, text in language.tokenize(code)
+        )
+        highlight_cache.put(key, html)
+    return html
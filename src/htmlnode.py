@@ -1,4 +1,4 @@
-import re
+from html import escape
 
 from textnode import (
     text_type_text,
@@ -10,9 +10,20 @@ from textnode import (
     TextNode,
 )
 from inline import text_to_textnodes
+from highlight import highlight
+from blocks import CODE_FENCE
+from patterns import (
+    code_language_regex,
+    quote_marker_regex,
+    unordered_list_marker_regex,
+    ordered_list_marker_regex,
+    ordered_list_number_regex,
+)
 
 
 class HTMLNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag="", value="", children=[], props={}) -> None:
         self.tag = tag
         self.value = value
@@ -25,6 +36,13 @@ class HTMLNode:
     def to_html(self):
         raise NotImplementedError
 
+    # Yields the same HTML as to_html in chunks, without joining subtrees
+    def iter_html(self):
+        raise NotImplementedError
+
+    def write(self, fp):
+        fp.writelines(self.iter_html())
+
     def props_to_html(self):
         if not self.props:
             return ""
@@ -51,6 +69,8 @@ class HTMLNode:
 
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, value: str, props=None) -> None:
         super().__init__(tag, value, None, props)
         if self.value is None:
@@ -61,6 +81,9 @@ class LeafNode(HTMLNode):
             return self.value
         return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
 
+    def iter_html(self):
+        yield self.to_html()
+
     def __eq__(self, value) -> bool:
         return (
             self.tag == value.tag
@@ -72,7 +95,28 @@ class LeafNode(HTMLNode):
         return f"LeafNode({self.tag}, {self.value}, {self.props})"
 
 
+# A leaf of HTML rendered elsewhere (highlighted code, say) whose value is the
+# text it shows, which is what page metadata collects from leaves
+class RenderedNode(LeafNode):
+    __slots__ = ("html",)
+
+    def __init__(self, html: str, text: str) -> None:
+        super().__init__(None, text)
+        self.html = html
+
+    def to_html(self):
+        return self.html
+
+    def __eq__(self, value) -> bool:
+        return super().__eq__(value) and self.html == getattr(value, "html", None)
+
+    def __repr__(self) -> str:
+        return f"RenderedNode({self.html}, {self.value})"
+
+
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag: str, children: object, props=None) -> None:
         super().__init__(tag, None, children, props)
         if self.tag is None:
@@ -84,6 +128,12 @@ class ParentNode(HTMLNode):
         nodes = "".join([node.to_html() for node in self.children])
         return f"<{self.tag}{self.props_to_html()}>{nodes}</{self.tag}>"
 
+    def iter_html(self):
+        yield f"<{self.tag}{self.props_to_html()}>"
+        for node in self.children:
+            yield from node.iter_html()
+        yield f"</{self.tag}>"
+
     def __repr__(self) -> str:
         return f"ParentNode({self.tag}, {self.children}, {self.props})"
 
@@ -104,50 +154,132 @@ def text_node_to_html_node(text_node: TextNode):
     raise ValueError(f"Unrecognized text_type found on {text_node}")
 
 
-def quote_block_to_html_node(block: str):
-    text_nodes = text_to_textnodes("".join(re.split("\n?> ", block)))
+# The block functions all take the block's lines when the classifier already
+# split them. Lines are only used when every marker sits at the start of its
+# line; otherwise the markers are split out of the whole block as before.
+def quote_block_to_html_node(block: str, lines=None):
+    text = None
+    if lines is not None:
+        text = strip_line_markers(lines, quote_marker)
+    if text is None:
+        text = "".join(quote_marker_regex.split(block))
+    text_nodes = text_to_textnodes(text)
     child_html_nodes = [text_node_to_html_node(node) for node in text_nodes]
     html = ParentNode("blockquote", child_html_nodes)
     return html
 
 
-def unordered_list_block_to_html_node(block: str):
-    items = [item for item in re.split("\n?[*-] ", block) if len(item)]
+def unordered_list_block_to_html_node(block: str, lines=None):
+    items = None
+    if lines is not None:
+        items = list_items_from_lines(lines, unordered_list_marker_length)
+    if items is None:
+        items = unordered_list_marker_regex.split(block)
     list_items = [
         ParentNode(
             "li",
             [text_node_to_html_node(node) for node in text_to_textnodes(list_item)],
         )
         for list_item in items
+        if len(list_item)
     ]
     html = ParentNode("ul", list_items)
     return html
 
 
-def ordered_list_block_to_html_node(block: str):
-    items = [item for item in re.split("\n?\d+\. ", block) if len(item)]
+def ordered_list_block_to_html_node(block: str, lines=None):
+    items = None
+    if lines is not None:
+        items = list_items_from_lines(lines, ordered_list_marker_length)
+    if items is None:
+        items = ordered_list_marker_regex.split(block)
     list_items = [
         ParentNode(
             "li",
             [text_node_to_html_node(node) for node in text_to_textnodes(list_item)],
         )
         for list_item in items
+        if len(list_item)
     ]
     html = ParentNode("ol", list_items)
     return html
 
 
-def code_block_to_html_node(block: str):
-    text = block.lstrip("```\n").rstrip("```")
-    text_nodes = text_to_textnodes(text)
-    child_html_nodes = [
-        ParentNode("code", [text_node_to_html_node(node) for node in text_nodes])
-    ]
-    html = ParentNode("pre", child_html_nodes)
+quote_marker = "> "
+
+
+# Quote lines joined without their markers, or None if a line lacks the marker
+# or has another one further in
+def strip_line_markers(lines: list, marker: str):
+    size = len(marker)
+    texts = []
+    for line in lines:
+        if not line.startswith(marker) or marker in line[size:]:
+            return None
+        texts.append(line[size:])
+    return "".join(texts)
+
+
+def unordered_list_marker_length(line: str):
+    if line[1:2] != " " or line[0] not in "*-":
+        return None
+    rest = line[2:]
+    if "* " in rest or "- " in rest:
+        return None
+    return 2
+
+
+def ordered_list_marker_length(line: str):
+    number, separator, rest = line.partition(". ")
+    if not separator or not (number.isascii() and number.isdigit()):
+        return None
+    if ordered_list_number_regex.search(rest):
+        return None
+    return len(number) + 2
+
+
+# List items taken from the lines, or None if a line does not start with a
+# single marker of the list
+def list_items_from_lines(lines: list, marker_length):
+    items = []
+    for line in lines:
+        size = marker_length(line)
+        if size is None:
+            return None
+        items.append(line[size:])
+    return items
+
+
+# Code is escaped rather than inline parsed. With a language tag the highlighter
+# knows, each token is a span classed after its kind; the tag itself becomes a
+# language- class on the code element either way. The node's value is the
+# code itself, so page metadata sees its words rather than the markup.
+def code_block_to_html_node(block: str, lines=None):
+    language, code = split_code_block(block)
+    html = highlight(code, language) if language is not None else None
+    if html is None:
+        html = escape(code, quote=False)
+    child_html_node = RenderedNode(html, code)
+    props = {"class": f"language-{language}"} if language is not None else None
+    html = ParentNode("pre", [ParentNode("code", [child_html_node], props)])
     return html
 
 
-def heading_block_to_html_node(block: str):
+# (language tag or None, code) with the fences removed. Only a single word on
+# the opening fence's own line is a language tag; a block written on one line
+# is all code.
+def split_code_block(block: str):
+    code = block[len(CODE_FENCE) :]
+    if code.endswith(CODE_FENCE):
+        code = code[: -len(CODE_FENCE)]
+    info, newline, rest = code.partition("\n")
+    info = info.strip()
+    if newline and code_language_regex.fullmatch(info):
+        return info.lower(), rest
+    return None, code.lstrip("\n")
+
+
+def heading_block_to_html_node(block: str, lines=None):
     heading_level = block.count("#", 0, block.index(" "))
     text = block.split(" ", 1).pop(1)
     text_nodes = text_to_textnodes(text)
@@ -156,7 +288,7 @@ def heading_block_to_html_node(block: str):
     return html
 
 
-def paragraph_block_to_html_node(block: str):
+def paragraph_block_to_html_node(block: str, lines=None):
     text_nodes = text_to_textnodes(block)
     child_html_nodes = [text_node_to_html_node(node) for node in text_nodes]
     html = ParentNode("p", child_html_nodes)
@@ -1,5 +1,3 @@
-import re
-
 from textnode import (
     TextNode,
     text_type_bold,
@@ -9,6 +7,8 @@ from textnode import (
     text_type_link,
     text_type_text,
 )
+from patterns import image_regex, link_regex
+from profiler import stage, stage_inline
 
 
 def split_nodes_delimiter(nodes: TextNode, delimiter: str, text_type: str):
@@ -77,20 +77,64 @@ def split_nodes_link(nodes: TextNode):
 
 
 def extract_markdown_images(text: str):
-    capture_embedded_image_regex = r"!\[(.*?)\]\((.*?)\)"
-    return re.findall(capture_embedded_image_regex, text)
+    return image_regex.findall(text)
 
 
 def extract_markdown_links(text: str):
-    capture_link_regex = r"\[(.*?)\]\((.*?)\)"
-    return re.findall(capture_link_regex, text)
+    return link_regex.findall(text)
+
+
+# Nested in precedence order, matching the order the split_nodes_delimiter
+# passes used to run in: code spans shield bold, bold shields italic
+inline_delimiters = [
+    ("`", text_type_code),
+    ("**", text_type_bold),
+    ("_", text_type_italic),
+]
 
 
+# Produces the same nodes as running split_nodes_image, split_nodes_link and
+# then split_nodes_delimiter for code, bold and italic, but scans the text
+# once: images first, links within the text between images, and delimiters
+# within the text between links
 def text_to_textnodes(text: str):
-    node = TextNode(text, text_type_text)
-    and_images = split_nodes_image([node])
-    and_links = split_nodes_link(and_images)
-    and_code = split_nodes_delimiter(and_links, "`", text_type_code)
-    and_bold = split_nodes_delimiter(and_code, "**", text_type_bold)
-    all_nodes = split_nodes_delimiter(and_bold, "_", text_type_italic)
-    return [node for node in all_nodes if len(node.text)]
+    with stage(stage_inline):
+        return tokenize_inline(text)
+
+
+def tokenize_inline(text: str):
+    nodes = []
+    position = 0
+    for image in image_regex.finditer(text):
+        append_link_nodes(nodes, text, position, image.start())
+        if image.group(1):
+            nodes.append(TextNode(image.group(1), text_type_image, image.group(2)))
+        position = image.end()
+    append_link_nodes(nodes, text, position, len(text))
+    return nodes
+
+
+def append_link_nodes(nodes: list, text: str, start: int, end: int):
+    position = start
+    for link in link_regex.finditer(text, start, end):
+        append_delimited_nodes(nodes, text[position : link.start()], 0)
+        if link.group(1):
+            nodes.append(TextNode(link.group(1), text_type_link, link.group(2)))
+        position = link.end()
+    append_delimited_nodes(nodes, text[position:end], 0)
+
+
+def append_delimited_nodes(nodes: list, text: str, depth: int):
+    if depth == len(inline_delimiters):
+        if text:
+            nodes.append(TextNode(text, text_type_text))
+        return
+    delimiter, text_type = inline_delimiters[depth]
+    substrings = text.split(delimiter)
+    if len(substrings) % 2 == 0:
+        raise ValueError("Text contains invalid markdown syntax.")
+    for index, substring in enumerate(substrings):
+        if index % 2 == 0:
+            append_delimited_nodes(nodes, substring, depth + 1)
+        elif substring:
+            nodes.append(TextNode(substring, text_type))
@@ -0,0 +1,83 @@
+from os import path, sep
+
+from build_graph import resolve_url
+
+
+# The site URL an output file is served at: /majesty for
+# public/majesty/index.html and /images/logo.png for public/images/logo.png
+def output_url(dest: str, public_dir: str):
+    prefix = public_dir.rstrip(sep) + sep
+    if dest.startswith(prefix):
+        # The common case of a normalized path below public_dir, which is
+        # checked for every output file on every link check
+        url = "/" + dest[len(prefix) :].replace(sep, "/")
+        if not any(part in url for part in ("//", "/.", "?", "#")):
+            if url.endswith("/index.html"):
+                return url[: -len("/index.html")] or "/"
+            return url.rstrip("/") or "/"
+    return resolve_url("/" + path.relpath(dest, public_dir).replace(sep, "/"))
+
+
+class BrokenLink:
+    def __init__(self, source: str, kind: str, text: str, url: str) -> None:
+        self.source = source
+        self.kind = kind
+        self.text = text
+        self.url = url
+
+    def __repr__(self) -> str:
+        return f"BrokenLink({self.source}, {self.kind}, {self.text}, {self.url})"
+
+    def __eq__(self, value) -> bool:
+        return (
+            self.source == value.source
+            and self.kind == value.kind
+            and self.text == value.text
+            and self.url == value.url
+        )
+
+    def __str__(self) -> str:
+        return f"{self.source}: broken {self.kind} [{self.text}]({self.url})"
+
+
+class LinkReport:
+    def __init__(self) -> None:
+        self.pages = 0
+        self.links = 0
+        self.broken = []
+
+    def __repr__(self) -> str:
+        return f"LinkReport({self.pages} pages, {self.links} links, {self.broken})"
+
+    def __str__(self) -> str:
+        return (
+            f"Checked {self.links} links on {self.pages} pages, "
+            f"{len(self.broken)} broken"
+        )
+
+
+# Checks the links and images recorded in the manifest for each page against
+# the URLs of every output the manifest knows about (generated pages and
+# copied static files), without reading any output. Each link is one set
+# lookup, so checking is linear in the number of links. sources restricts the
+# check to those pages, such as the ones a build graph reports as affected.
+def check_links(manifest, public_dir: str, sources=None):
+    targets = {output_url(dest, public_dir) for dest in manifest.entries}
+    if sources is not None:
+        sources = {path.normpath(source) for source in sources}
+    report = LinkReport()
+    for dest, entry in sorted(manifest.entries.items()):
+        if sources is not None and entry["source"] not in sources:
+            continue
+        metadata = manifest.page_metadata(dest)
+        if metadata is None:
+            continue
+        report.pages += 1
+        page_url = output_url(dest, public_dir)
+        for kind, links in (("link", metadata.links), ("image", metadata.images)):
+            for text, url in links:
+                report.links += 1
+                target = resolve_url(url, page_url)
+                if target is not None and target not in targets:
+                    report.broken.append(BrokenLink(entry["source"], kind, text, url))
+    return report
@@ -1,17 +1,240 @@
-from os import path, mkdir
+import argparse
+import sys
+from os import path, mkdir, cpu_count
 from shutil import rmtree
 
 from generate_page import generate_pages_recursive
-from copy_contents import copy_contents
+from copy_contents import copy_contents, copy_modes, copy_mode_auto
+from manifest import Manifest, MANIFEST_PATH
+from build_graph import BuildGraph, BUILD_GRAPH_PATH
+from front_matter import FrontMatterIndex, FRONT_MATTER_PATH
+from link_check import check_links
+from compress import compress_outputs
+from site_index import write_site_index, SITE_URL
+from shard import build_shard, merge_shards, parse_shard
+from memory import MemoryBudget, MB, peak_rss_summary
+import render_cache
+from render_cache import RenderCache, RENDER_CACHE_PATH, RENDER_CACHE_SIZE
+import profiler
+from profiler import (
+    Profiler,
+    PROFILE_PATH,
+    stage_static_copy,
+    stage_merge_shards,
+    stage_site_index,
+    stage_link_check,
+    stage_compress,
+)
 
 
 def main():
-    if path.exists("public"):
-        rmtree("public")
-    mkdir("public")
+    parser = argparse.ArgumentParser(description="Static site generator")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Delete public/ and rebuild every page and asset",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to render pages (0 uses every core)",
+    )
+    parser.add_argument(
+        "--copy-mode",
+        choices=copy_modes,
+        default=copy_mode_auto,
+        help="How static files are copied: auto tries reflinks and "
+        "copy_file_range before a plain copy, copy only makes plain copies, "
+        "hardlink links where possible",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=PROFILE_PATH,
+        help="Record per-stage and per-page timings and allocations and write "
+        f"a JSON report (default {PROFILE_PATH}). Pages render serially.",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=10,
+        help="Number of slowest pages listed in the profile summary",
+    )
+    parser.add_argument(
+        "--render-cache-size",
+        type=int,
+        default=RENDER_CACHE_SIZE // 1024 // 1024,
+        help="Memory limit in MB for rendered blocks reused across pages (0 disables)",
+    )
+    parser.add_argument(
+        "--persist-render-cache",
+        action="store_true",
+        help=f"Load and save the render cache at {RENDER_CACHE_PATH} between "
+        "builds (with --jobs 1 only)",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Write .gz (and .br with brotli installed) siblings of compressible "
+        "outputs for the server to send as-is",
+    )
+    parser.add_argument(
+        "--site-url",
+        default=SITE_URL,
+        help="Absolute URL the site is published at, used in the sitemap and feed",
+    )
+    parser.add_argument(
+        "--strict-links",
+        action="store_true",
+        help="Exit with an error when a page has a broken internal link or image",
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=int,
+        metavar="MB",
+        help="Memory budget for the build: caps the render caches and renders "
+        "no more pages at once than fit, with workers writing pages themselves",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        metavar="I/N",
+        help="Render only shard I of N (0 to N - 1) of the pages into its own "
+        "directory for a later --merge-shards N, then stop",
+    )
+    parser.add_argument(
+        "--merge-shards",
+        type=int,
+        metavar="N",
+        help="Copy the pages rendered by shards 0 to N - 1 into public/ instead "
+        "of rendering them, then finish the build",
+    )
+    args = parser.parse_args()
+    if args.shard is not None and args.persist_render_cache:
+        # Every shard would save over the same file
+        parser.error("--persist-render-cache cannot be used with --shard")
 
-    copy_contents("static", "public")
-    generate_pages_recursive("content", "template.html", "public")
+    jobs = args.jobs
+    if args.profile:
+        # Stages are recorded in this process only
+        jobs = 1
+        profiler.enable(Profiler())
 
+    processes = jobs or cpu_count() or 1
+    # Pages are only rendered in a pool with more than one process
+    pooled = processes > 1
+    if pooled and args.persist_render_cache:
+        # Workers fill their own copies of the cache, which are never saved
+        parser.error("--persist-render-cache cannot be used with more than one job")
+    budget = None
+    if args.max_memory is not None:
+        # Pool workers run alongside this process
+        budget = MemoryBudget(
+            args.max_memory * MB, processes + 1 if pooled else processes
+        )
 
-main()
+    cache = None
+    if args.render_cache_size > 0:
+        cache_size = args.render_cache_size * 1024 * 1024
+        if budget is not None:
+            cache_size = min(cache_size, budget.cache_bytes)
+        if args.persist_render_cache:
+            cache = RenderCache.load(RENDER_CACHE_PATH, cache_size)
+        else:
+            cache = RenderCache(cache_size)
+        render_cache.enable(cache)
+
+    broken = []
+    if args.shard is not None:
+        shard, shards = args.shard
+        generated, pages = build_shard(
+            "content", "template.html", shard, shards, jobs=jobs, budget=budget
+        )
+        print(f"Shard {shard} of {shards}: generated {generated} of {pages} pages")
+    else:
+        broken = build(args, jobs, cache, budget)
+
+    if cache is not None:
+        print(cache)
+        render_cache.disable()
+
+    if args.profile:
+        build_profiler = profiler.active_profiler
+        profiler.disable()
+        build_profiler.save(args.profile)
+        print(build_profiler.summary(args.profile_top))
+        print(f"Profile written to {args.profile}")
+
+    print(peak_rss_summary(budget, pooled))
+
+    if args.strict_links and broken:
+        sys.exit(1)
+
+
+# Brings public/ up to date and returns the broken links found in it
+def build(args, jobs, cache, budget=None):
+    if args.full or not path.exists("public"):
+        if path.exists("public"):
+            rmtree("public")
+        mkdir("public")
+        manifest = Manifest()
+        graph = BuildGraph()
+        front_matter = FrontMatterIndex()
+    else:
+        manifest = Manifest.load(MANIFEST_PATH)
+        graph = BuildGraph.load(BUILD_GRAPH_PATH)
+        front_matter = FrontMatterIndex.load(FRONT_MATTER_PATH)
+
+    try:
+        with profiler.stage(stage_static_copy):
+            print(copy_contents("static", "public", manifest, args.copy_mode))
+        if args.merge_shards:
+            with profiler.stage(stage_merge_shards):
+                stats = merge_shards(
+                    args.merge_shards,
+                    "public",
+                    manifest,
+                    graph,
+                    front_matter,
+                    mode=args.copy_mode,
+                )
+            print(stats)
+        else:
+            generate_pages_recursive(
+                "content",
+                "template.html",
+                "public",
+                manifest,
+                jobs,
+                graph,
+                front_matter,
+                budget,
+            )
+        with profiler.stage(stage_site_index):
+            print(write_site_index(manifest, "content", "public", args.site_url))
+        for removed in manifest.prune():
+            print(f"Removed {removed}")
+        graph.prune()
+        front_matter.prune()
+        with profiler.stage(stage_link_check):
+            links = check_links(manifest, "public")
+        for broken in links.broken:
+            print(broken)
+        print(links)
+        if args.compress:
+            with profiler.stage(stage_compress):
+                print(compress_outputs("public"))
+    finally:
+        # Keep the progress of a failed build so the next run only retries
+        # what is still outstanding
+        manifest.save(MANIFEST_PATH)
+        graph.save(BUILD_GRAPH_PATH)
+        front_matter.save(FRONT_MATTER_PATH)
+        if cache is not None and args.persist_render_cache:
+            cache.save(RENDER_CACHE_PATH)
+    return links.broken
+
+
+if __name__ == "__main__":
+    main()
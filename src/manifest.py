@@ -0,0 +1,152 @@
+import json
+from hashlib import sha256
+from os import path, makedirs, remove, rmdir, listdir
+
+from metadata import PageMetadata
+from compress import COMPRESSED_SUFFIXES
+
+MANIFEST_PATH = ".cache/manifest.json"
+
+HASH_CHUNK_SIZE = 1 << 16
+
+
+def hash_file(file_path: str):
+    digest = sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Tracks which source (and template) produced each output file so that
+# unchanged outputs can be skipped and orphaned outputs removed
+class Manifest:
+    def __init__(self, entries=None) -> None:
+        self.entries = entries if entries is not None else {}
+        self.seen = set()
+
+    def __repr__(self) -> str:
+        return f"Manifest({self.entries})"
+
+    @classmethod
+    def load(cls, manifest_path: str):
+        if not path.isfile(manifest_path):
+            return cls()
+        try:
+            with open(manifest_path, encoding="utf-8") as f:
+                return cls(json.load(f))
+        except ValueError:
+            # A corrupt manifest only costs a full rebuild
+            return cls()
+
+    # Saved on every rebuild in watch mode, with every page's metadata, so it
+    # is written compactly by json.dumps, which unlike json.dump and indented
+    # output uses the C encoder
+    def save(self, manifest_path: str):
+        dir = path.dirname(manifest_path)
+        if dir and not path.exists(dir):
+            makedirs(dir)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self.entries, sort_keys=True))
+
+    def is_current(
+        self, source: str, dest: str, source_hash: str, template_hash=""
+    ) -> bool:
+        dest = path.normpath(dest)
+        self.seen.add(dest)
+        entry = self.entries.get(dest)
+        return (
+            entry is not None
+            and entry["source"] == path.normpath(source)
+            and entry["source_hash"] == source_hash
+            and entry["template_hash"] == template_hash
+            and path.isfile(dest)
+        )
+
+    # Marks dest as still produced by source without rehashing it
+    def keep(self, source: str, dest: str) -> bool:
+        dest = path.normpath(dest)
+        entry = self.entries.get(dest)
+        if entry is None or entry["source"] != path.normpath(source):
+            return False
+        self.seen.add(dest)
+        return True
+
+    # Pages also record the metadata collected while rendering them, so later
+    # stages can use it for pages skipped as current
+    def record(
+        self, source: str, dest: str, source_hash: str, template_hash="", metadata=None
+    ):
+        dest = path.normpath(dest)
+        self.seen.add(dest)
+        self.entries[dest] = {
+            "source": path.normpath(source),
+            "source_hash": source_hash,
+            "template_hash": template_hash,
+        }
+        if metadata is not None:
+            self.entries[dest]["metadata"] = metadata
+
+    # Metadata recorded by an older build that lacks fields added since
+    # counts as missing, so the page is rendered again
+    def page_metadata(self, dest: str):
+        entry = self.entries.get(path.normpath(dest))
+        if entry is None or "metadata" not in entry:
+            return None
+        try:
+            return PageMetadata.from_dict(entry["metadata"])
+        except KeyError:
+            return None
+
+    # The metadata recorded for each page output, keyed by output path
+    def pages(self):
+        pages = {}
+        for dest in self.entries:
+            metadata = self.page_metadata(dest)
+            if metadata is not None:
+                pages[dest] = metadata
+        return pages
+
+    # Deletes outputs whose sources were not seen during this build, along with
+    # any output directories left empty whose source directory is also gone
+    def prune(self):
+        removed = []
+        for dest in sorted(set(self.entries) - self.seen):
+            self.remove_output(dest)
+            removed.append(dest)
+        return removed
+
+    # Deletes the outputs built from source, or from anything under it when
+    # source was a directory
+    def remove_source(self, source: str):
+        source = path.normpath(source)
+        removed = []
+        for dest, entry in sorted(self.entries.items()):
+            if entry["source"] == source or entry["source"].startswith(
+                source + path.sep
+            ):
+                removed.append(dest)
+        for dest in removed:
+            self.remove_output(dest)
+        return removed
+
+    def remove_output(self, dest: str):
+        source = self.entries.pop(dest)["source"]
+        self.seen.discard(dest)
+        for file in [dest] + [dest + suffix for suffix in COMPRESSED_SUFFIXES]:
+            if path.isfile(file):
+                remove(file)
+        remove_orphaned_dirs(path.dirname(dest), path.dirname(source))
+
+
+def remove_orphaned_dirs(dest_dir: str, source_dir: str):
+    while (
+        dest_dir
+        and source_dir
+        and not path.exists(source_dir)
+        and path.isdir(dest_dir)
+        and not listdir(dest_dir)
+    ):
+        rmdir(dest_dir)
+        dest_dir = path.dirname(dest_dir)
+        source_dir = path.dirname(source_dir)
@@ -1,6 +1,10 @@
+from itertools import chain
+
 from blocks import (
-    block_to_block_type,
+    classify_block,
     markdown_to_blocks,
+    iter_blocks,
+    iter_lines,
     block_type_paragraph,
     block_type_heading,
     block_type_code,
@@ -9,6 +13,17 @@ from blocks import (
     block_type_ordered_list,
 )
 
+import render_cache
+from render_cache import block_key
+from metadata import PageMetadata, block_metadata
+from profiler import (
+    stage,
+    profile_chunks,
+    stage_block_split,
+    stage_block_type,
+    stage_tree_build,
+)
+
 from htmlnode import (
     ParentNode,
     code_block_to_html_node,
@@ -20,23 +35,88 @@ from htmlnode import (
 )
 
 
+block_type_to_html_node_func = {
+    block_type_heading: heading_block_to_html_node,
+    block_type_code: code_block_to_html_node,
+    block_type_quote: quote_block_to_html_node,
+    block_type_ordered_list: ordered_list_block_to_html_node,
+    block_type_unordered_list: unordered_list_block_to_html_node,
+    block_type_paragraph: paragraph_block_to_html_node,
+}
+
+
 def get_html_node_func(block_type: str):
-    block_type_to_html_node_func = {
-        f"{block_type_heading}": heading_block_to_html_node,
-        f"{block_type_code}": code_block_to_html_node,
-        f"{block_type_quote}": quote_block_to_html_node,
-        f"{block_type_ordered_list}": ordered_list_block_to_html_node,
-        f"{block_type_unordered_list}": unordered_list_block_to_html_node,
-        f"{block_type_paragraph}": paragraph_block_to_html_node,
-    }
-    return block_type_to_html_node_func[f"{block_type}"]
+    return block_type_to_html_node_func[block_type]
 
 
 def markdown_to_html_node(markdown: str):
-    blocks = markdown_to_blocks(markdown)
+    with stage(stage_block_split):
+        blocks = markdown_to_blocks(markdown)
     child_nodes = []
     for block in blocks:
-        block_type = block_to_block_type(block)
-        child_nodes.append(get_html_node_func(block_type)(block))
+        with stage(stage_block_type):
+            block_type, lines = classify_block(block)
+        with stage(stage_tree_build):
+            child_nodes.append(get_html_node_func(block_type)(block, lines))
     root = ParentNode("div", child_nodes)
     return root
+
+
+# Streams the same HTML as markdown_to_html_node(markdown).to_html() while only
+# holding one block's node tree at a time
+def markdown_to_html_chunks(markdown: str):
+    return blocks_to_html_chunks(iter_blocks(iter_lines(markdown)))
+
+
+# Builds the document tree and its metadata in one pass over the blocks
+def markdown_to_document(markdown: str):
+    metadata = PageMetadata()
+    child_nodes = []
+    for block in profile_chunks(stage_block_split, iter_blocks(iter_lines(markdown))):
+        block_type, node = block_to_typed_html_node(block)
+        metadata.add_block(block_metadata(block, block_type, node))
+        child_nodes.append(node)
+    return ParentNode("div", child_nodes), metadata
+
+
+# Renders lazily produced blocks (from iter_blocks over an open file, say) so
+# memory use does not grow with the document. Blocks are served from the
+# active render cache when one is enabled. When given a PageMetadata, each
+# block's metadata is added to it as the block is rendered.
+def blocks_to_html_chunks(blocks, metadata=None):
+    blocks = iter(profile_chunks(stage_block_split, blocks))
+    first = next(blocks, None)
+    if first is None:
+        raise ValueError("ParentNodes require children.")
+    yield "<div>"
+    cache = render_cache.active_cache
+    for block in chain([first], blocks):
+        if cache is not None:
+            key = block_key(block)
+            entry = cache.get(key)
+            if entry is None:
+                block_type, node = block_to_typed_html_node(block)
+                entry = (node.to_html(), block_metadata(block, block_type, node))
+                cache.put(key, *entry)
+            html, rendered_metadata = entry
+            if metadata is not None:
+                metadata.add_block(rendered_metadata)
+            yield html
+        elif metadata is not None:
+            block_type, node = block_to_typed_html_node(block)
+            metadata.add_block(block_metadata(block, block_type, node))
+            yield from node.iter_html()
+        else:
+            yield from block_to_html_node(block).iter_html()
+    yield "</div>"
+
+
+def block_to_html_node(block: str):
+    return block_to_typed_html_node(block)[1]
+
+
+def block_to_typed_html_node(block: str):
+    with stage(stage_block_type):
+        block_type, lines = classify_block(block)
+    with stage(stage_tree_build):
+        return block_type, get_html_node_func(block_type)(block, lines)
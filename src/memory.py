@@ -0,0 +1,104 @@
+import sys
+from collections import deque
+from os import path
+
+from blocks import iter_blocks
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, where peak memory goes unreported
+    resource = None
+
+MB = 1024 * 1024
+
+# Resident memory of an interpreter with the generator imported, before it
+# renders anything
+PROCESS_BYTES = 24 * MB
+# Rendering a page streams it block by block and its metadata is bounded, so
+# a page needs room for that metadata and the in-memory part of its content
+# spool, plus the node tree of its largest block. Block trees peak at up to
+# 28 times the block's markdown (a paragraph of one link per line).
+PAGE_BYTES = 8 * MB
+BLOCK_MEMORY_FACTOR = 30
+# The part of the budget set aside for render caches, shared out between
+# the processes since each holds its own
+CACHE_SHARE = 0.25
+
+
+# Splits a memory limit for the whole build between the render caches and
+# the pages rendered at once, given how many processes the build runs
+class MemoryBudget:
+    def __init__(self, max_bytes: int, processes=1) -> None:
+        self.max_bytes = max_bytes
+        self.processes = processes
+        self.cache_bytes = int(max_bytes * CACHE_SHARE) // processes
+        self.page_bytes = (
+            max_bytes - self.cache_bytes * processes - PROCESS_BYTES * processes
+        )
+
+    def __repr__(self) -> str:
+        return f"MemoryBudget({self.max_bytes}, {self.processes})"
+
+    # Only pages whose size alone could outgrow PAGE_BYTES are read to find
+    # their largest block
+    def page_cost(self, source: str):
+        if path.getsize(source) * BLOCK_MEMORY_FACTOR <= PAGE_BYTES:
+            return PAGE_BYTES
+        return PAGE_BYTES + BLOCK_MEMORY_FACTOR * largest_block(source)
+
+    # Like pool.imap over tasks whose first item is a markdown source, but
+    # only as many pages are handed to the pool as their estimated cost
+    # fits in the budget. Results are taken in order, so a large page waits
+    # for those before it and runs alone if it needs the whole budget.
+    def imap(self, pool, func, tasks: list):
+        pending = deque()
+        in_use = 0
+        for task in tasks:
+            cost = self.page_cost(task[0])
+            while pending and in_use + cost > self.page_bytes:
+                done, result = pending.popleft()
+                in_use -= done
+                yield result.get()
+            if cost > self.max_bytes:
+                print(
+                    f"{task[0]} may need {cost // MB} MB on its own, over the "
+                    f"{self.max_bytes // MB} MB budget"
+                )
+            pending.append((cost, pool.apply_async(func, (task,))))
+            in_use += cost
+        while pending:
+            yield pending.popleft()[1].get()
+
+
+def largest_block(source: str):
+    with open(source, encoding="utf-8") as f:
+        return max(map(len, iter_blocks(f)), default=0)
+
+
+# (this process, largest finished child process) peak resident memory in
+# bytes, or None where it cannot be measured
+def peak_rss():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes, except on macOS where it is in bytes
+    scale = 1 if sys.platform == "darwin" else 1024
+    return (
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    )
+
+
+# The largest child is only reported as a worker for builds that render
+# with a pool (pooled), since any other child process would count as one
+def peak_rss_summary(budget=None, pooled=False):
+    peak = peak_rss()
+    if peak is None:
+        return "Peak memory: unavailable on this platform"
+    build, worker = peak
+    summary = f"Peak memory: {build // MB} MB"
+    if pooled and worker:
+        summary += f", {worker // MB} MB in the largest worker"
+    if budget is not None:
+        summary += f" (budget {budget.max_bytes // MB} MB)"
+    return summary
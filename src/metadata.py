@@ -0,0 +1,189 @@
+from html import escape
+
+from blocks import block_type_heading, block_type_paragraph
+from patterns import term_regex
+
+WORDS_PER_MINUTE = 200
+SUMMARY_WORDS = 50
+# Bounds on what a page keeps under a memory budget, so its metadata stays a
+# few megabytes however large the page: links, images and headings each, and
+# distinct words
+MAX_PAGE_LINKS = 10_000
+MAX_PAGE_TERMS = 100_000
+
+
+# What a single pass over a page's blocks learns about it: the title (the
+# first heading's markdown), the outline of every heading, the number of
+# words of rendered text, the links and images it contains, the distinct
+# words of its text (reduced to search terms once, when stored), a summary
+# taken from its first paragraph and the page's front matter. When bounded,
+# whatever is past the bounds above is dropped and truncated is set.
+class PageMetadata:
+    def __init__(
+        self,
+        title=None,
+        outline=None,
+        word_count=0,
+        links=None,
+        images=None,
+        terms=None,
+        summary=None,
+        front_matter=None,
+        bounded=False,
+    ) -> None:
+        self.title = title
+        self.outline = outline if outline is not None else []
+        self.word_count = word_count
+        self.links = links if links is not None else []
+        self.images = images if images is not None else []
+        self.terms = terms if terms is not None else set()
+        self.summary = summary
+        self.front_matter = front_matter if front_matter is not None else {}
+        self.bounded = bounded
+        self.truncated = False
+
+    def __repr__(self) -> str:
+        return (
+            f"PageMetadata({self.title}, {self.outline}, {self.word_count}, "
+            f"{self.links}, {self.images}, {len(self.terms)} terms, {self.summary}, {self.front_matter})"
+        )
+
+    def __eq__(self, value) -> bool:
+        return self.to_dict() == value.to_dict()
+
+    def add_block(self, block_metadata: dict):
+        heading = block_metadata["heading"]
+        if heading is not None:
+            if self.title is None:
+                self.title = heading[1]
+            self.add_bounded(self.outline, [heading])
+        self.word_count += block_metadata["words"]
+        self.add_bounded(self.links, block_metadata["links"])
+        self.add_bounded(self.images, block_metadata["images"])
+        # Checking before adding is cheaper than trimming a set, and lets
+        # through at most one block's words past the bound
+        if not self.bounded or len(self.terms) < MAX_PAGE_TERMS:
+            self.terms.update(block_metadata["terms"])
+        elif not self.terms.issuperset(block_metadata["terms"]):
+            self.truncated = True
+        if self.summary is None:
+            self.summary = block_metadata["summary"]
+
+    def add_bounded(self, items: list, added: list):
+        if not self.bounded:
+            items.extend(added)
+            return
+        room = MAX_PAGE_LINKS - len(items)
+        if len(added) > room:
+            self.truncated = True
+            added = added[:room]
+        items.extend(added)
+
+    # Template slots filled from the metadata, alongside {{ Content }}. Scalar
+    # front matter values fill the slots named after their keys ({{ author }}),
+    # escaped as the plain text they are, but never the built-in slots.
+    def slots(self):
+        slots = {
+            key: escape(front_matter_text(value))
+            for key, value in self.front_matter.items()
+            if not isinstance(value, list)
+        }
+        slots.update(
+            {
+                "Title": self.title,
+                "WordCount": str(self.word_count),
+                "ReadingTime": str(
+                    max(1, round(self.word_count / WORDS_PER_MINUTE))
+                ),
+            }
+        )
+        return slots
+
+    def to_dict(self):
+        return {
+            "title": self.title,
+            "outline": [list(heading) for heading in self.outline],
+            "word_count": self.word_count,
+            "links": [list(link) for link in self.links],
+            "images": [list(image) for image in self.images],
+            # One space separated string keeps the manifest small and quick
+            # to load
+            "terms": " ".join(sorted(search_terms(self.terms))),
+            "summary": self.summary,
+            "front_matter": self.front_matter,
+        }
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        return cls(
+            values["title"],
+            [tuple(heading) for heading in values["outline"]],
+            values["word_count"],
+            [tuple(link) for link in values["links"]],
+            [tuple(image) for image in values["images"]],
+            set(values["terms"].split()),
+            values["summary"],
+            values["front_matter"],
+        )
+
+
+# Collects a block's contribution to the page metadata from the node tree
+# rendered for it. Headings keep their markdown, as extract_title always has.
+def block_metadata(block: str, block_type: str, node):
+    metadata = {"heading": None, "links": [], "images": [], "summary": None}
+    if block_type == block_type_heading:
+        level = block.count("#", 0, block.index(" "))
+        metadata["heading"] = (level, block.lstrip("# "))
+    text = []
+    collect_node_metadata(node, metadata, text)
+    # Splitting the text of the whole block at once is cheaper than splitting
+    # each node's, and joining with spaces keeps the same words
+    words = " ".join(text).split()
+    metadata["words"] = len(words)
+    # The page's set of terms dedupes the words, so a block doesn't build
+    # its own
+    metadata["terms"] = words
+    if block_type == block_type_paragraph:
+        metadata["summary"] = summarize(words)
+    return metadata
+
+
+def collect_node_metadata(node, metadata: dict, text: list):
+    if node.children:
+        for child in node.children:
+            collect_node_metadata(child, metadata, text)
+        return
+    if node.tag == "img":
+        metadata["images"].append((node.props["alt"], node.props["src"]))
+        return
+    if node.tag == "a":
+        metadata["links"].append((node.value, node.props["href"]))
+    text.append(node.value)
+
+
+# Reduces distinct words to the lower cased runs of two or more word
+# characters the search index stores. Only words containing something other
+# than word characters need matching.
+def search_terms(words):
+    terms = set()
+    for word in words:
+        word = word.lower()
+        if word.isalnum():
+            if len(word) > 1:
+                terms.add(word)
+        else:
+            terms.update(term_regex.findall(word))
+    return terms
+
+
+# Front matter values as written: true and false rather than True and False
+def front_matter_text(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def summarize(words: list):
+    if len(words) <= SUMMARY_WORDS:
+        return " ".join(words)
+    return " ".join(words[:SUMMARY_WORDS]) + "..."
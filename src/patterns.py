@@ -0,0 +1,45 @@
+import re
+
+# Every regular expression of the markdown grammar, compiled once at import
+# and registered by name. Extensions look patterns up with get_pattern and
+# add their own with register_pattern rather than passing pattern strings to
+# re, whose cache of compiled patterns is small and starts evicting (and
+# recompiling) the grammar once enough other patterns are in use.
+registry = {}
+
+
+def register_pattern(name: str, pattern: str, flags=0):
+    compiled = re.compile(pattern, flags)
+    registered = registry.get(name)
+    if registered is not None:
+        if registered.pattern != compiled.pattern or registered.flags != compiled.flags:
+            raise ValueError(f"Pattern {name} is already registered: {registered}")
+        return registered
+    registry[name] = compiled
+    return compiled
+
+
+def get_pattern(name: str):
+    if name not in registry:
+        raise ValueError(f"Unrecognized pattern {name}")
+    return registry[name]
+
+
+# Inline
+image_regex = register_pattern("image", r"!\[(.*?)\]\((.*?)\)")
+link_regex = register_pattern("link", r"\[(.*?)\]\((.*?)\)")
+
+# Block markers, which also match within a line, as they always have
+quote_marker_regex = register_pattern("quote_marker", r"\n?> ")
+unordered_list_marker_regex = register_pattern("unordered_list_marker", r"\n?[*-] ")
+ordered_list_marker_regex = register_pattern("ordered_list_marker", r"\n?\d+\. ")
+ordered_list_number_regex = register_pattern("ordered_list_number", r"\d+\. ")
+
+# The language tag on the opening fence of a code block
+code_language_regex = register_pattern("code_language", r"[\w+#.-]+")
+
+# Search terms in rendered text, two or more word characters long
+term_regex = register_pattern("term", r"\w\w+")
+
+# Templates
+slot_regex = register_pattern("slot", r"\{\{ (\w+) \}\}")
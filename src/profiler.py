@@ -0,0 +1,180 @@
+import json
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from time import perf_counter
+
+stage_static_copy = "static_copy"
+stage_block_split = "block_split"
+stage_block_type = "block_type"
+stage_inline = "inline"
+stage_tree_build = "tree_build"
+stage_serialize = "serialize"
+stage_write = "write"
+stage_merge_shards = "merge_shards"
+stage_site_index = "site_index"
+stage_link_check = "link_check"
+stage_compress = "compress"
+
+PROFILE_PATH = "profile.json"
+
+null_context = nullcontext()
+active_profiler = None
+
+
+# Records wall time and traced allocations per stage, both for the build as a
+# whole and for each page. Stage times are exclusive: time spent in a nested
+# stage (inline parsing within a tree build) is only counted against the
+# innermost one.
+class Profiler:
+    def __init__(self, trace_memory=True) -> None:
+        self.trace_memory = trace_memory
+        self.build_stages = {}
+        self.pages = []
+        self.current = self.build_stages
+        self.stack = []
+        self.started = perf_counter()
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return f"Profiler({len(self.pages)} pages)"
+
+    def traced(self):
+        if not self.trace_memory:
+            return 0
+        return tracemalloc.get_traced_memory()[0]
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.started = perf_counter()
+
+    def stop(self):
+        self.seconds = perf_counter() - self.started
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def stage(self, name: str):
+        start = perf_counter()
+        start_memory = self.traced()
+        self.stack.append([0.0, 0])
+        try:
+            yield
+        finally:
+            child_seconds, child_bytes = self.stack.pop()
+            seconds = perf_counter() - start
+            allocated = self.traced() - start_memory
+            stats = self.current.setdefault(
+                name, {"seconds": 0.0, "calls": 0, "allocated_bytes": 0}
+            )
+            stats["seconds"] += seconds - child_seconds
+            stats["calls"] += 1
+            stats["allocated_bytes"] += max(0, allocated - child_bytes)
+            if self.stack:
+                self.stack[-1][0] += seconds
+                self.stack[-1][1] += allocated
+
+    @contextmanager
+    def page(self, page_path: str):
+        record = {"path": page_path, "seconds": 0.0, "peak_bytes": 0, "stages": {}}
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        previous = self.current
+        self.current = record["stages"]
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            record["seconds"] = perf_counter() - start
+            if self.trace_memory:
+                record["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            self.current = previous
+            self.pages.append(record)
+
+    def stage_totals(self):
+        totals = {}
+        for stages in [self.build_stages] + [page["stages"] for page in self.pages]:
+            for name, stats in stages.items():
+                total = totals.setdefault(
+                    name, {"seconds": 0.0, "calls": 0, "allocated_bytes": 0}
+                )
+                for key in total:
+                    total[key] += stats[key]
+        return totals
+
+    def slowest_pages(self, top=10):
+        return sorted(self.pages, key=lambda page: page["seconds"], reverse=True)[:top]
+
+    def report(self):
+        return {
+            "seconds": self.seconds,
+            "trace_memory": self.trace_memory,
+            "stages": self.stage_totals(),
+            "build_stages": self.build_stages,
+            "pages": self.pages,
+        }
+
+    def save(self, report_path: str):
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def summary(self, top=10):
+        lines = [f"Build took {self.seconds:.3f}s over {len(self.pages)} pages"]
+        lines.append(f"{'stage':<14}{'seconds':>10}{'calls':>10}{'allocated KB':>15}")
+        totals = self.stage_totals()
+        for name, stats in sorted(totals.items(), key=lambda item: -item[1]["seconds"]):
+            lines.append(
+                f"{name:<14}{stats['seconds']:>10.3f}{stats['calls']:>10}"
+                f"{stats['allocated_bytes'] / 1024:>15.1f}"
+            )
+        lines.append(f"Slowest {min(top, len(self.pages))} pages:")
+        for page in self.slowest_pages(top):
+            lines.append(
+                f"{page['seconds']:>10.3f}s {page['peak_bytes'] / 1024:>10.1f} KB peak"
+                f"  {page['path']}"
+            )
+        return "\n".join(lines)
+
+
+def enable(profiler: Profiler):
+    global active_profiler
+    active_profiler = profiler
+    profiler.start()
+
+
+def disable():
+    global active_profiler
+    if active_profiler is not None:
+        active_profiler.stop()
+    active_profiler = None
+
+
+# Cheap no-op contexts when profiling is off so the pipeline can stay
+# instrumented unconditionally
+def stage(name: str):
+    if active_profiler is None:
+        return null_context
+    return active_profiler.stage(name)
+
+
+def page(page_path: str):
+    if active_profiler is None:
+        return null_context
+    return active_profiler.page(page_path)
+
+
+# Attributes the time spent producing each chunk to a stage
+def profile_chunks(name: str, chunks):
+    if active_profiler is None:
+        return chunks
+    return iter_profiled_chunks(active_profiler, name, chunks)
+
+
+def iter_profiled_chunks(profiler: Profiler, name: str, chunks):
+    iterator = iter(chunks)
+    while True:
+        with profiler.stage(name):
+            chunk = next(iterator, None)
+        if chunk is None:
+            return
+        yield chunk
@@ -0,0 +1,152 @@
+import json
+from collections import OrderedDict
+from hashlib import blake2b, sha256
+from os import path, makedirs
+from sys import getsizeof
+
+RENDER_CACHE_PATH = ".cache/render_cache.json"
+RENDER_CACHE_SIZE = 64 * 1024 * 1024
+
+# Approximate memory of a cached block's metadata beyond its containers: each
+# distinct word is a small string, each link or image a tuple of two, and the
+# entry itself holds a key, a tuple and an ordered dict node
+TERM_BYTES = 56
+LINK_BYTES = 200
+ENTRY_BYTES = 200
+
+# Rendered HTML depends on these modules, so a persisted cache is discarded
+# whenever one of them changes
+RENDERER_MODULES = [
+    "blocks.py",
+    "inline.py",
+    "htmlnode.py",
+    "highlight.py",
+    "textnode.py",
+    "markdown.py",
+    "metadata.py",
+    "patterns.py",
+]
+
+active_cache = None
+
+
+def renderer_fingerprint():
+    digest = sha256()
+    for module in RENDERER_MODULES:
+        with open(path.join(path.dirname(path.abspath(__file__)), module), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def block_key(block: str):
+    return blake2b(block.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# Rendered block HTML and block metadata keyed by a hash of the block's
+# markdown, evicting the least recently used blocks once the cached HTML and
+# the estimated size of its metadata exceed max_bytes
+class RenderCache:
+    def __init__(self, max_bytes=RENDER_CACHE_SIZE) -> None:
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self) -> str:
+        return f"RenderCache({len(self.entries)} entries, {self.size} bytes)"
+
+    def __str__(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups * 100 if lookups else 0
+        return (
+            f"Render cache: {self.hits} hits, {self.misses} misses "
+            f"({rate:.1f}% hit rate), {len(self.entries)} entries "
+            f"({self.size // 1024} KB)"
+        )
+
+    # Returns (html, metadata), or None for an uncached block
+    def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, html: str, metadata=None):
+        if metadata is not None:
+            # Only a block's distinct words are kept
+            metadata = dict(metadata, terms=set(metadata["terms"]))
+        size = entry_size(html, metadata)
+        if size > self.max_bytes:
+            return
+        previous = self.entries.pop(key, None)
+        if previous is not None:
+            self.size -= entry_size(*previous)
+        self.entries[key] = (html, metadata)
+        self.size += size
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= entry_size(*evicted)
+
+    @classmethod
+    def load(cls, cache_path: str, max_bytes=RENDER_CACHE_SIZE):
+        cache = cls(max_bytes)
+        if not path.isfile(cache_path):
+            return cache
+        try:
+            with open(cache_path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except ValueError:
+            return cache
+        if stored.get("fingerprint") != renderer_fingerprint():
+            return cache
+        for key, html, metadata in stored["entries"]:
+            cache.put(key, html, metadata)
+        return cache
+
+    # Entries are stored least recently used first so reloading them keeps
+    # the same eviction order
+    def save(self, cache_path: str):
+        dir = path.dirname(cache_path)
+        if dir and not path.exists(dir):
+            makedirs(dir)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "fingerprint": renderer_fingerprint(),
+                    "entries": [
+                        [key, html, metadata]
+                        for key, (html, metadata) in self.entries.items()
+                    ],
+                },
+                f,
+                # Block metadata holds the set of words in the block
+                default=sorted,
+            )
+
+
+# The block metadata (its set of words in particular) usually takes far more
+# memory than the HTML, so it counts towards the limit too
+def entry_size(html: str, metadata=None):
+    if metadata is None:
+        return len(html)
+    size = len(html) + ENTRY_BYTES + getsizeof(metadata)
+    terms = metadata["terms"]
+    size += getsizeof(terms) + TERM_BYTES * len(terms)
+    size += LINK_BYTES * (len(metadata["links"]) + len(metadata["images"]))
+    if metadata["summary"] is not None:
+        size += getsizeof(metadata["summary"])
+    return size
+
+
+def enable(cache: RenderCache):
+    global active_cache
+    active_cache = cache
+
+
+def disable():
+    global active_cache
+    active_cache = None
@@ -0,0 +1,292 @@
+import argparse
+import json
+import subprocess
+import sys
+from hashlib import blake2b
+from os import path, makedirs, remove, sep, stat
+
+from build_graph import BuildGraph
+from copy_contents import copy_file, copy_mode_auto, is_up_to_date
+from front_matter import FrontMatterIndex
+from generate_page import discover_pages, generate_pages
+from manifest import Manifest
+
+SHARD_ROOT = ".cache/shards"
+SHARD_STATUS_NAME = "shard.json"
+
+
+# The shard (0 to shards - 1) a page belongs to, from a hash of its path
+# relative to the content root so every machine partitions the same way
+def shard_of(source: str, content_root: str, shards: int):
+    relative = path.relpath(source, content_root).replace(sep, "/")
+    digest = blake2b(relative.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def shard_pages(pages: list, content_root: str, shard: int, shards: int):
+    return [
+        page for page in pages if shard_of(page[0], content_root, shards) == shard
+    ]
+
+
+# Identifies the set of pages the shards were partitioned from, so shards
+# built from different checkouts are never merged
+def tree_fingerprint(pages: list, content_root: str):
+    digest = blake2b(digest_size=16)
+    for source, _ in pages:
+        digest.update(path.relpath(source, content_root).replace(sep, "/").encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+# "I/N" -> (I, N) for --shard
+def parse_shard(value: str):
+    try:
+        shard, shards = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected I/N, got {value}")
+    if shards < 1 or not 0 <= shard < shards:
+        raise argparse.ArgumentTypeError(
+            f"Shard {shard} is not within 0 to {shards - 1}"
+        )
+    return shard, shards
+
+
+# Each shard renders into its own directory, named after the shard count so
+# outputs of a different partitioning are never mixed in
+class ShardPaths:
+    def __init__(self, shard: int, shards: int, root=SHARD_ROOT) -> None:
+        self.dir = path.join(root, f"shard-{shard}-of-{shards}")
+        self.public = path.join(self.dir, "public")
+        self.manifest = path.join(self.dir, "manifest.json")
+        self.graph = path.join(self.dir, "build_graph.json")
+        self.front_matter = path.join(self.dir, "front_matter.json")
+        self.status = path.join(self.dir, SHARD_STATUS_NAME)
+        self.log = path.join(self.dir, "build.log")
+
+    def __repr__(self) -> str:
+        return f"ShardPaths({self.dir})"
+
+
+# Renders the pages of one shard into its directory, incrementally against
+# the shard's own manifest, and records that the shard finished. Returns
+# (pages generated, pages in the shard).
+def build_shard(
+    content_root: str,
+    template_path: str,
+    shard: int,
+    shards: int,
+    root=SHARD_ROOT,
+    jobs=1,
+    budget=None,
+):
+    paths = ShardPaths(shard, shards, root)
+    makedirs(paths.public, exist_ok=True)
+    # A failed build must not be merged
+    if path.isfile(paths.status):
+        remove(paths.status)
+    manifest = Manifest.load(paths.manifest)
+    graph = BuildGraph.load(paths.graph)
+    front_matter = FrontMatterIndex.load(paths.front_matter)
+    pages = discover_pages(content_root, paths.public)
+    selected = shard_pages(pages, content_root, shard, shards)
+    try:
+        generated = generate_pages(
+            selected,
+            content_root,
+            template_path,
+            manifest,
+            jobs,
+            graph,
+            front_matter,
+            budget,
+        )
+        manifest.prune()
+        graph.prune()
+        front_matter.prune()
+    finally:
+        manifest.save(paths.manifest)
+        graph.save(paths.graph)
+        front_matter.save(paths.front_matter)
+    with open(paths.status, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "shard": shard,
+                "shards": shards,
+                "pages": len(selected),
+                "tree": tree_fingerprint(pages, content_root),
+            },
+            f,
+        )
+    return generated, len(selected)
+
+
+class MergeStats:
+    def __init__(self) -> None:
+        self.shards = 0
+        self.copied_files = 0
+        self.skipped_files = 0
+
+    def __repr__(self) -> str:
+        return f"MergeStats({self.shards}, {self.copied_files}, {self.skipped_files})"
+
+    def __str__(self) -> str:
+        return (
+            f"Merged {self.shards} shards, copied {self.copied_files} files, "
+            f"skipped {self.skipped_files} unchanged"
+        )
+
+
+def load_status(paths: ShardPaths, shard: int, shards: int):
+    try:
+        with open(paths.status, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        raise ValueError(f"Shard {shard} of {shards} has not finished: {paths.dir}")
+
+
+# Copies the outputs of shards 0 to shards - 1 into public_dir and records
+# them, with their metadata, in manifest as though they had been rendered in
+# place, so the rest of the build (pruning, link checks, compression) runs
+# unchanged. Graph and front matter index entries are combined too. Before
+# anything is written, every shard must have finished building the same
+# content tree and no output may be claimed by two shards, or by a file this
+# build already put in public_dir; otherwise a ValueError lists the
+# conflicts. Unchanged outputs are skipped.
+def merge_shards(
+    shards: int,
+    public_dir: str,
+    manifest,
+    graph=None,
+    front_matter=None,
+    root=SHARD_ROOT,
+    mode=copy_mode_auto,
+):
+    shard_paths = [ShardPaths(shard, shards, root) for shard in range(shards)]
+    trees = {
+        load_status(paths, shard, shards)["tree"]
+        for shard, paths in enumerate(shard_paths)
+    }
+    if len(trees) > 1:
+        raise ValueError(f"Shards were built from {len(trees)} different content trees")
+
+    claims = {}
+    for dest in manifest.seen:
+        claims[dest] = [("this build", manifest.entries[dest]["source"], None, None)]
+    for shard, paths in enumerate(shard_paths):
+        shard_manifest = Manifest.load(paths.manifest)
+        for output, entry in sorted(shard_manifest.entries.items()):
+            dest = path.normpath(
+                path.join(public_dir, path.relpath(output, paths.public))
+            )
+            claims.setdefault(dest, []).append(
+                (f"shard {shard}", entry["source"], output, entry)
+            )
+    conflicts = [
+        f"{dest}: " + ", ".join(f"{source} ({owner})" for owner, source, _, _ in owners)
+        for dest, owners in sorted(claims.items())
+        if len(owners) > 1
+    ]
+    if conflicts:
+        raise ValueError(
+            f"{len(conflicts)} conflicting output(s):\n" + "\n".join(conflicts)
+        )
+
+    stats = MergeStats()
+    stats.shards = shards
+    for dest, [(_, source, output, entry)] in sorted(claims.items()):
+        if output is None:
+            continue
+        current = manifest.entries.get(dest)
+        if (
+            current is not None
+            and current["source"] == entry["source"]
+            and current["source_hash"] == entry["source_hash"]
+            and current["template_hash"] == entry["template_hash"]
+            and is_up_to_date(stat(output), dest)
+        ):
+            stats.skipped_files += 1
+        else:
+            makedirs(path.dirname(dest), exist_ok=True)
+            copy_file(output, dest, mode)
+            stats.copied_files += 1
+        manifest.record(
+            source,
+            dest,
+            entry["source_hash"],
+            entry["template_hash"],
+            entry.get("metadata"),
+        )
+    for paths in shard_paths:
+        if graph is not None:
+            graph.pages.update(BuildGraph.load(paths.graph).pages)
+        if front_matter is not None:
+            shard_front_matter = FrontMatterIndex.load(paths.front_matter)
+            front_matter.entries.update(shard_front_matter.entries)
+    return stats
+
+
+# Builds every shard in its own worker process against the shared working
+# directory, each logging to its shard directory, then merges them with
+# main.py --merge-shards. A max_memory budget in MB is split evenly between
+# the workers. Returns the exit status.
+def run_local(
+    shards: int, jobs=1, merge_args=(), cwd=None, root=SHARD_ROOT, max_memory=None
+):
+    main_path = path.join(path.dirname(path.abspath(__file__)), "main.py")
+    workers = []
+    for shard in range(shards):
+        paths = ShardPaths(shard, shards, root)
+        makedirs(path.join(cwd or "", paths.dir), exist_ok=True)
+        log = open(path.join(cwd or "", paths.log), "w", encoding="utf-8")
+        command = [sys.executable, main_path, "--shard", f"{shard}/{shards}"]
+        command += ["--jobs", str(jobs)]
+        if max_memory is not None:
+            command += ["--max-memory", str(max_memory // shards)]
+        workers.append(
+            (
+                shard,
+                log,
+                subprocess.Popen(
+                    command, cwd=cwd, stdout=log, stderr=subprocess.STDOUT
+                ),
+            )
+        )
+    failed = []
+    for shard, log, worker in workers:
+        if worker.wait() != 0:
+            failed.append(shard)
+        log.close()
+    for shard in failed:
+        print(f"Shard {shard} failed, see {ShardPaths(shard, shards, root).log}")
+    if failed:
+        return 1
+    command = [sys.executable, main_path, "--merge-shards", str(shards)]
+    return subprocess.call(command + list(merge_args), cwd=cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Build the site in shards on local worker processes and merge them",
+        epilog="Arguments after -- are passed to the merge, such as -- --compress",
+    )
+    parser.add_argument("--shards", type=int, required=True)
+    parser.add_argument(
+        "--jobs", type=int, default=1, help="Render processes within each shard"
+    )
+    parser.add_argument(
+        "--max-memory",
+        type=int,
+        metavar="MB",
+        help="Memory budget shared evenly by the shard workers",
+    )
+    parser.add_argument("merge_args", nargs="*")
+    args = parser.parse_args()
+    status = run_local(
+        args.shards, args.jobs, args.merge_args, max_memory=args.max_memory
+    )
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import json
+from bisect import bisect_left, insort
+from datetime import date, datetime, timezone
+from email.utils import format_datetime
+from os import path, remove, replace
+from xml.sax.saxutils import escape
+
+from link_check import output_url
+from front_matter import page_tags
+
+SITE_URL = "http://localhost:8888"
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "feed.xml"
+SEARCH_INDEX_NAME = "search_index.json"
+FEED_ITEMS = 20
+SEARCH_INDEX_VERSION = 1
+
+
+class SiteIndexStats:
+    def __init__(self) -> None:
+        self.pages = 0
+        self.terms = 0
+        self.written_files = 0
+        self.index_bytes = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"SiteIndexStats({self.pages}, {self.terms}, "
+            f"{self.written_files}, {self.index_bytes})"
+        )
+
+    def __str__(self) -> str:
+        return (
+            f"Indexed {self.pages} pages and {self.terms} terms "
+            f"({self.index_bytes} byte search index), "
+            f"wrote {self.written_files} changed files"
+        )
+
+
+def absolute_url(site_url: str, url: str):
+    # Pages are directories, which the server redirects to with a slash
+    return site_url.rstrip("/") + url.rstrip("/") + "/"
+
+
+# The date in a page's front matter, or None when it has no valid one
+def page_date(metadata):
+    try:
+        return date.fromisoformat(str(metadata.front_matter["date"])[:10])
+    except (KeyError, ValueError):
+        return None
+
+
+# A page of the site index with what the sitemap, feed and search index
+# need of its metadata, worked out once when it is read from the manifest
+class IndexedPage:
+    def __init__(self, url: str, metadata, entry: dict, site_url: str) -> None:
+        self.url = url
+        self.title = metadata.title
+        self.summary = metadata.summary
+        self.tags = page_tags(metadata.front_matter)
+        self.terms = metadata.terms
+        self.date = page_date(metadata)
+        # The manifest entry the metadata was read from, which the manifest
+        # replaces whenever the page is recorded again
+        self.entry = entry
+        self.doc_id = None
+        loc = f"<loc>{escape(absolute_url(site_url, url))}</loc>"
+        if self.date is not None:
+            loc += f"<lastmod>{self.date.isoformat()}</lastmod>"
+        self.sitemap_entry = f"  <url>{loc}</url>"
+
+    def __repr__(self) -> str:
+        return f"IndexedPage({self.url}, {self.title}, {self.doc_id})"
+
+
+# Dated pages newest first, followed by the rest in URL order
+def feed_order(pages: list):
+    dated = [page for page in pages if page.date is not None]
+    undated = [page for page in pages if page.date is None]
+    dated.sort(key=lambda page: page.date, reverse=True)
+    return dated + undated
+
+
+def sitemap_xml(pages: list):
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    lines.extend(page.sitemap_entry for page in pages)
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+# An RSS 2.0 feed of the newest FEED_ITEMS pages by their front matter
+# date, titled after the root page
+def feed_xml(pages: list, site_url: str):
+    titles = {page.url: page.title for page in pages}
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0">',
+        "  <channel>",
+        f"    <title>{escape(titles.get('/') or site_url)}</title>",
+        f"    <link>{escape(absolute_url(site_url, '/'))}</link>",
+        f"    <description>{escape(titles.get('/') or site_url)}</description>",
+    ]
+    for page in feed_order(pages)[:FEED_ITEMS]:
+        link = escape(absolute_url(site_url, page.url))
+        lines.append("    <item>")
+        lines.append(f"      <title>{escape(page.title)}</title>")
+        lines.append(f"      <link>{link}</link>")
+        lines.append(f"      <guid>{link}</guid>")
+        if page.summary:
+            lines.append(f"      <description>{escape(page.summary)}</description>")
+        if page.date is not None:
+            published = datetime.combine(page.date, datetime.min.time(), timezone.utc)
+            lines.append(f"      <pubDate>{format_datetime(published)}</pubDate>")
+        for tag in page.tags:
+            lines.append(f"      <category>{escape(tag)}</category>")
+        lines.append("    </item>")
+    lines.extend(["  </channel>", "</rss>"])
+    return "\n".join(lines) + "\n"
+
+
+# A term and its postings as they appear in the search index: the gaps
+# between the ascending ids of the pages containing it, so most postings
+# are one or two digits. A client rebuilds the ids with a running sum.
+def encode_postings(term: str, ids: list):
+    gaps = [ids[0]] + [ids[i] - ids[i - 1] for i in range(1, len(ids))]
+    return json.dumps({term: gaps}, separators=(",", ":"), ensure_ascii=False)[1:-1]
+
+
+# The search index of pages in document id order, as compact JSON mapping
+# each term to its postings
+def search_index_json(pages: list, encoded: dict):
+    docs = [[page.url, page.title] for page in pages]
+    return (
+        f'{{"version":{SEARCH_INDEX_VERSION},"docs":'
+        + json.dumps(docs, separators=(",", ":"), ensure_ascii=False)
+        + ',"terms":{'
+        + ",".join(encoded[term] for term in sorted(encoded))
+        + "}}"
+    )
+
+
+# Leaves an unchanged file alone so its mtime, and so its compressed
+# siblings, stay current. A changed file is written beside it and replaces
+# it, never rewritten in place, since the server may have it mapped.
+def write_if_changed(file_path: str, text: str):
+    data = text.encode("utf-8")
+    if path.isfile(file_path):
+        with open(file_path, "rb") as f:
+            if f.read() == data:
+                return False
+    temp_path = f"{file_path}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(data)
+    except BaseException:
+        remove(temp_path)
+        raise
+    replace(temp_path, file_path)
+    return True
+
+
+# The pages seen by the build and their search postings. Pages are read back
+# from the manifest only when their entry was recorded since the last
+# update, so a SiteIndex kept between rebuilds in watch mode only indexes
+# the pages just rendered, and only the postings of the terms they gained
+# or lost are encoded again. Pages are numbered in URL order, so adding or
+# removing one renumbers the rest and indexes every page again.
+class SiteIndex:
+    def __init__(self, public_dir: str, site_url=SITE_URL) -> None:
+        self.public_dir = public_dir
+        self.site_url = site_url
+        # Output path -> IndexedPage
+        self.pages = {}
+        # Pages in URL order, whose position is their document id
+        self.order = []
+        # Term -> ascending ids of the pages containing it, and the encoded
+        # postings
+        self.postings = {}
+        self.encoded = {}
+
+    def __repr__(self) -> str:
+        return f"SiteIndex({len(self.pages)} pages, {len(self.postings)} terms)"
+
+    # Pages whose source is gone are left out before the manifest prunes
+    # them
+    def update(self, manifest):
+        pages = {}
+        replaced = []
+        for dest in manifest.seen:
+            entry = manifest.entries.get(dest)
+            if entry is None or "metadata" not in entry:
+                continue
+            page = self.pages.get(dest)
+            if page is None or page.entry is not entry:
+                metadata = manifest.page_metadata(dest)
+                if metadata is None:
+                    continue
+                url = output_url(dest, self.public_dir)
+                page = IndexedPage(url, metadata, entry, self.site_url)
+                replaced.append((self.pages.get(dest), page))
+            pages[dest] = page
+        renumber = pages.keys() != self.pages.keys()
+        self.pages = pages
+        if renumber:
+            self.reindex()
+            return
+        for previous, page in replaced:
+            self.replace(previous, page)
+
+    def reindex(self):
+        self.order = sorted(self.pages.values(), key=lambda page: page.url)
+        self.postings = {}
+        for doc_id, page in enumerate(self.order):
+            page.doc_id = doc_id
+            for term in page.terms:
+                self.postings.setdefault(term, []).append(doc_id)
+        self.encoded = {
+            term: encode_postings(term, ids) for term, ids in self.postings.items()
+        }
+
+    # Puts page in the place of previous, a page with the same URL
+    def replace(self, previous: IndexedPage, page: IndexedPage):
+        doc_id = page.doc_id = previous.doc_id
+        self.order[doc_id] = page
+        for term in previous.terms - page.terms:
+            ids = self.postings[term]
+            del ids[bisect_left(ids, doc_id)]
+            if ids:
+                self.encoded[term] = encode_postings(term, ids)
+            else:
+                del self.postings[term]
+                del self.encoded[term]
+        for term in page.terms - previous.terms:
+            ids = self.postings.setdefault(term, [])
+            insort(ids, doc_id)
+            self.encoded[term] = encode_postings(term, ids)
+
+    # Writes the sitemap, feed and search index for every page in the
+    # manifest from the metadata recorded while rendering them, so no
+    # markdown is read again. The files are recorded in the manifest as
+    # outputs of content_root so links to them check out and they are
+    # pruned if no longer written.
+    def write(self, manifest, content_root: str):
+        self.update(manifest)
+        index_json = search_index_json(self.order, self.encoded)
+        stats = SiteIndexStats()
+        stats.pages = len(self.order)
+        stats.terms = len(self.encoded)
+        stats.index_bytes = len(index_json.encode("utf-8"))
+        for name, text in (
+            (SITEMAP_NAME, sitemap_xml(self.order)),
+            (FEED_NAME, feed_xml(self.order, self.site_url)),
+            (SEARCH_INDEX_NAME, index_json),
+        ):
+            dest = path.join(self.public_dir, name)
+            if write_if_changed(dest, text):
+                stats.written_files += 1
+            manifest.record(content_root, dest, "")
+        return stats
+
+
+def write_site_index(manifest, content_root: str, public_dir: str, site_url=SITE_URL):
+    return SiteIndex(public_dir, site_url).write(manifest, content_root)
@@ -0,0 +1,79 @@
+from os import path, stat
+
+from patterns import slot_regex
+
+TEMPLATE_NAME = "template.html"
+
+
+# A template parsed once into static text at even indices and slot names
+# (the Title in {{ Title }}) at odd indices
+class Template:
+    def __init__(self, source: str) -> None:
+        self.segments = slot_regex.split(source)
+
+    def __repr__(self) -> str:
+        return f"Template({self.segments})"
+
+    def slots(self):
+        return set(self.segments[1::2])
+
+    # Slot values are either strings or callables returning an iterable of
+    # chunks, which are called once per occurrence of the slot. Slots without
+    # a value are left in the output untouched.
+    def iter_render(self, slots: dict):
+        for index, segment in enumerate(self.segments):
+            if index % 2 == 0:
+                yield segment
+            elif segment not in slots:
+                yield f"{{{{ {segment} }}}}"
+            elif isinstance(slots[segment], str):
+                yield slots[segment]
+            else:
+                yield from slots[segment]()
+
+    def render(self, slots: dict):
+        return "".join(self.iter_render(slots))
+
+
+# Compiled templates keyed by path, reparsed only when the file's mtime or
+# size changes
+class TemplateCache:
+    def __init__(self) -> None:
+        self.templates = {}
+
+    def __repr__(self) -> str:
+        return f"TemplateCache({list(self.templates)})"
+
+    def get(self, template_path: str):
+        stats = stat(template_path)
+        version = (stats.st_mtime_ns, stats.st_size)
+        cached = self.templates.get(template_path)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        with open(template_path, encoding="utf-8") as f:
+            template = Template(f.read())
+        self.templates[template_path] = (version, template)
+        return template
+
+
+template_cache = TemplateCache()
+
+
+def load_template(template_path: str):
+    return template_cache.get(template_path)
+
+
+# A template.html inside the content tree applies to the pages in its
+# directory and below, falling back to the site-wide default template
+def find_template(from_path: str, content_root: str, default_template_path: str):
+    if path.isfile(content_root):
+        content_root = path.dirname(content_root)
+    content_root = path.normpath(content_root)
+    dir = path.dirname(path.normpath(from_path))
+    while True:
+        candidate = path.join(dir, TEMPLATE_NAME)
+        if path.isfile(candidate):
+            return candidate
+        if dir == content_root or not dir or dir == path.dirname(dir):
+            return default_template_path
+        dir = path.dirname(dir)
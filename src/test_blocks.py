@@ -13,7 +13,9 @@ from blocks import (
     is_unordered_list_block,
     is_ordered_list_block,
     block_to_block_type,
+    classify_block,
     markdown_to_blocks,
+    iter_blocks,
 )
 
 
@@ -43,6 +45,45 @@ This is the same paragraph on a new line
         expected = ["This markdown should produce a single block."]
         self.assertListEqual(actual, expected)
 
+    def test_markdown_to_blocks_keeps_fenced_code_together(self):
+        markdown = """# Heading
+
+```
+first line
+
+after a blank line
+```
+
+Paragraph"""
+        actual = markdown_to_blocks(markdown)
+        expected = [
+            "# Heading",
+            "```\nfirst line\n\nafter a blank line\n```",
+            "Paragraph",
+        ]
+        self.assertListEqual(actual, expected)
+
+    def test_markdown_to_blocks_inline_code_is_not_a_fence(self):
+        markdown = "```code``` is inline\n\nNext paragraph\n\n# Heading"
+        self.assertListEqual(
+            markdown_to_blocks(markdown),
+            ["```code``` is inline", "Next paragraph", "# Heading"],
+        )
+
+    def test_markdown_to_blocks_splits_unclosed_fence(self):
+        markdown = "# Heading\n\n```python\nnever closed\n\nParagraph\n\n## End"
+        self.assertListEqual(
+            markdown_to_blocks(markdown),
+            ["# Heading", "```python\nnever closed", "Paragraph", "## End"],
+        )
+
+    def test_iter_blocks_from_file_lines(self):
+        lines = iter(["# Heading\n", "\n", "Line one\n", "Line two\n", "\n", "\n"])
+        blocks = iter_blocks(lines)
+        self.assertEqual(next(blocks), "# Heading")
+        self.assertEqual(next(lines), "Line one\n")
+        self.assertListEqual(list(blocks), ["Line two"])
+
     def test_is_heading_block(self):
         mocks = [
             "# Heading 1",
@@ -116,6 +157,23 @@ pbd.set_trace()
         for mock, type in mocks:
             self.assertEqual(block_to_block_type(mock), type)
 
+    def test_classify_block_returns_lines_of_quotes_and_lists(self):
+        mocks = [
+            ("# Heading", block_type_heading, None),
+            ("#Heading", block_type_paragraph, None),
+            ("> a\n> b", block_type_quote, ["> a", "> b"]),
+            ("> a\nb", block_type_paragraph, None),
+            ("- a\n* b", block_type_unordered_list, ["- a", "* b"]),
+            ("1. a\n2. b", block_type_ordered_list, ["1. a", "2. b"]),
+            ("2. a\n3. b", block_type_paragraph, None),
+        ]
+        for mock, type, lines in mocks:
+            self.assertEqual(classify_block(mock), (type, lines))
+
+    def test_ordered_list_numbers_compare_as_strings(self):
+        block = "\n".join(f"{number}. item" for number in range(1, 11))
+        self.assertEqual(block_to_block_type(block), block_type_paragraph)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+
+from build_graph import BuildGraph, page_url, resolve_url
+from fixtures import write
+from generate_page import generate_pages_recursive
+from manifest import Manifest
+from metadata import PageMetadata
+
+
+class TestBuildGraph(unittest.TestCase):
+    def setUp(self):
+        self.graph = BuildGraph()
+        self.graph.add_page(
+            "content/index.md",
+            "/",
+            "template.html",
+            PageMetadata(
+                "Home",
+                links=[("post", "/post/"), ("wiki", "https://example.com")],
+                images=[("logo", "/images/logo.png")],
+            ),
+        )
+        self.graph.add_page(
+            "content/post/index.md",
+            "/post",
+            "content/post/template.html",
+            PageMetadata("Post", links=[("home", "../index.html#top")]),
+        )
+
+    def test_resolve_url(self):
+        self.assertEqual(resolve_url("/majesty/"), "/majesty")
+        self.assertEqual(resolve_url("/majesty/index.html#intro"), "/majesty")
+        self.assertEqual(resolve_url("other?page=2", "/blog"), "/blog/other")
+        self.assertEqual(resolve_url("#intro", "/blog"), "/blog")
+        self.assertIsNone(resolve_url("https://example.com/x"))
+        self.assertIsNone(resolve_url("mailto:me@example.com"))
+
+    def test_page_url(self):
+        self.assertEqual(page_url(path.join("content", "index.md"), "content"), "/")
+        self.assertEqual(
+            page_url(path.join("content", "a", "b", "index.md"), "content"), "/a/b"
+        )
+
+    def test_edges(self):
+        self.assertEqual(
+            self.graph.pages["content/index.md"],
+            {
+                "url": "/",
+                "template": "template.html",
+                "links": ["/post"],
+                "images": ["/images/logo.png"],
+            },
+        )
+        self.assertEqual(self.graph.pages["content/post/index.md"]["links"], ["/"])
+
+    def test_rebuild_set(self):
+        self.assertEqual(self.graph.rebuild_set(["template.html"]), ["content/index.md"])
+        self.assertEqual(
+            self.graph.rebuild_set(["content/post/index.md"]), ["content/post/index.md"]
+        )
+
+    def test_affected_includes_linking_pages(self):
+        self.assertEqual(
+            self.graph.affected(["content/post/index.md"], "content", "static"),
+            ["content/index.md", "content/post/index.md"],
+        )
+        self.assertEqual(
+            self.graph.affected(["static/images/logo.png"], "content", "static"),
+            ["content/index.md"],
+        )
+
+    def test_remove_source(self):
+        self.assertEqual(
+            self.graph.remove_source("content/post"), ["content/post/index.md"]
+        )
+        self.assertEqual(list(self.graph.pages), ["content/index.md"])
+
+    def test_save_load_and_dot(self):
+        with TemporaryDirectory() as root:
+            graph_path = path.join(root, "cache", "build_graph.json")
+            self.graph.save(graph_path)
+            self.assertEqual(BuildGraph.load(graph_path).pages, self.graph.pages)
+        dot = self.graph.to_dot()
+        self.assertTrue(dot.startswith("digraph build {"))
+        self.assertIn('"content/index.md" -> "/post" [label="link"];', dot)
+
+    def test_recorded_while_rendering_and_kept_for_skipped_pages(self):
+        with TemporaryDirectory() as root:
+            content = path.join(root, "content")
+            template = path.join(root, "template.html")
+            write(template, "{{ Content }}")
+            write(path.join(content, "index.md"), "# Home\n\n[post](/post)")
+            write(path.join(content, "post", "index.md"), "# Post\n\n![a](/a.png)")
+            dest = path.join(root, "public")
+            manifest = Manifest()
+            generate_pages_recursive(content, template, dest, manifest)
+            graph = BuildGraph()
+            generate_pages_recursive(content, template, dest, manifest, graph=graph)
+            post = path.join(content, "post", "index.md")
+            self.assertEqual(graph.pages[post]["images"], ["/a.png"])
+            self.assertEqual(graph.pages[post]["url"], "/post")
+            self.assertEqual(graph.pages_using(template), sorted(graph.pages))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import gzip
+import unittest
+from os import path, stat, utime
+from tempfile import TemporaryDirectory
+
+from compress import compress_outputs, encoders
+from fixtures import write
+from manifest import Manifest
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+        self.page = path.join(self.root, "post", "index.html")
+        write(self.page, "<p>compress me</p>" * 100)
+        write(path.join(self.root, "tiny.css"), "body {}")
+        write(path.join(self.root, "image.png"), "not text" * 100)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_writes_gzip_siblings_of_compressible_files(self):
+        stats = compress_outputs(self.root)
+        self.assertEqual(stats.compressed_files, len(encoders()))
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>compress me</p>" * 100)
+        self.assertEqual(
+            stat(self.page + ".gz").st_mtime_ns, stat(self.page).st_mtime_ns
+        )
+        self.assertFalse(path.exists(path.join(self.root, "tiny.css.gz")))
+        self.assertFalse(path.exists(path.join(self.root, "image.png.gz")))
+
+    def test_skips_up_to_date_siblings(self):
+        compress_outputs(self.root)
+        self.assertEqual(compress_outputs(self.root).compressed_files, 0)
+        write(self.page, "<p>changed</p>" * 100)
+        utime(self.page, ns=(0, stat(self.page).st_mtime_ns + 10**9))
+        self.assertEqual(compress_outputs(self.root).compressed_files, len(encoders()))
+        with gzip.open(self.page + ".gz", "rt") as f:
+            self.assertEqual(f.read(), "<p>changed</p>" * 100)
+
+    def test_removed_outputs_take_their_siblings(self):
+        manifest = Manifest()
+        manifest.record("content/post/index.md", self.page, "hash")
+        compress_outputs(self.root)
+        manifest.remove_output(path.normpath(self.page))
+        self.assertFalse(path.exists(self.page + ".gz"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import unittest
+from os import path, makedirs, stat, utime
+from tempfile import TemporaryDirectory
+
+from copy_contents import (
+    copy_contents,
+    copy_file,
+    copy_mode_copy,
+    copy_mode_hardlink,
+)
+import copy_contents as copy_contents_module
+from fixtures import read_bytes, write
+from manifest import Manifest
+
+
+class TestCopyContents(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+        self.static = path.join(self.root, "static")
+        self.public = path.join(self.root, "public")
+        write(path.join(self.static, "index.css"), b"body {}")
+        write(path.join(self.static, "images", "image.png"), bytes(range(256)) * 64)
+        makedirs(self.public)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_copies_tree(self):
+        stats = copy_contents(self.static, self.public)
+        self.assertEqual(stats.copied_files, 2)
+        self.assertEqual(stats.copied_bytes, 7 + 256 * 64)
+        self.assertEqual(
+            read_bytes(path.join(self.public, "images", "image.png")),
+            bytes(range(256)) * 64,
+        )
+
+    def test_skips_matching_size_and_mtime(self):
+        copy_contents(self.static, self.public)
+        stats = copy_contents(self.static, self.public)
+        self.assertEqual(stats.copied_files, 0)
+        self.assertEqual(stats.skipped_files, 2)
+        self.assertEqual(stats.skipped_bytes, 7 + 256 * 64)
+
+    def test_copies_changed_file(self):
+        copy_contents(self.static, self.public)
+        write(path.join(self.static, "index.css"), b"body { margin: 0 }")
+        stats = copy_contents(self.static, self.public)
+        self.assertEqual(stats.copied_files, 1)
+        self.assertEqual(read_bytes(path.join(self.public, "index.css")), b"body { margin: 0 }")
+
+    def test_touched_file_is_not_recopied_with_manifest(self):
+        manifest = Manifest()
+        copy_contents(self.static, self.public, manifest)
+        source = path.join(self.static, "index.css")
+        utime(source, (1, 1))
+        stats = copy_contents(self.static, self.public, manifest)
+        self.assertEqual(stats.copied_files, 0)
+        self.assertEqual(stat(path.join(self.public, "index.css")).st_mtime, 1)
+
+    def test_plain_copy_mode(self):
+        source = path.join(self.static, "index.css")
+        dest = path.join(self.public, "index.css")
+        # Plain copies never go through the kernel's copy_file_range
+        def copy_file_range(*args):
+            raise AssertionError("copy_file_range called")
+
+        kernel_copy = copy_contents_module.copy_file_range
+        copy_contents_module.copy_file_range = copy_file_range
+        try:
+            copy_file(source, dest, copy_mode_copy)
+        finally:
+            copy_contents_module.copy_file_range = kernel_copy
+        self.assertEqual(read_bytes(dest), b"body {}")
+
+    def test_hardlink_is_not_written_through(self):
+        source = path.join(self.static, "index.css")
+        dest = path.join(self.public, "index.css")
+        copy_file(source, dest, copy_mode_hardlink)
+        write(path.join(self.root, "other.css"), b"other")
+        copy_file(path.join(self.root, "other.css"), dest, copy_mode_copy)
+        self.assertEqual(read_bytes(source), b"body {}")
+        self.assertEqual(read_bytes(dest), b"other")
+
+
+if __name__ == "__main__":
+    unittest.main()
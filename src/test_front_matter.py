@@ -0,0 +1,149 @@
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+
+from blocks import iter_lines
+from fixtures import write
+from front_matter import FrontMatterIndex, split_front_matter
+from generate_page import generate_pages_recursive
+from manifest import Manifest, hash_file
+
+
+class TestFrontMatter(unittest.TestCase):
+    def test_yaml_lite(self):
+        markdown = (
+            "---\n"
+            "title: \"Hello: world\"\n"
+            "date: 2024-05-01\n"
+            "draft: false\n"
+            "weight: 3\n"
+            "tags: [one, 'two three']\n"
+            "# a comment\n"
+            "authors:\n"
+            "  - Ann\n"
+            "  - Bob\n"
+            "---\n"
+            "# Heading"
+        )
+        front_matter, lines = split_front_matter(iter_lines(markdown))
+        self.assertEqual(
+            front_matter,
+            {
+                "title": "Hello: world",
+                "date": "2024-05-01",
+                "draft": False,
+                "weight": 3,
+                "tags": ["one", "two three"],
+                "authors": ["Ann", "Bob"],
+            },
+        )
+        self.assertEqual(list(lines), ["# Heading"])
+
+    def test_toml_style(self):
+        markdown = '+++\ntitle = "Post"\ndraft = true\n+++\n# Heading'
+        front_matter, lines = split_front_matter(iter_lines(markdown))
+        self.assertEqual(front_matter, {"title": "Post", "draft": True})
+        self.assertEqual(list(lines), ["# Heading"])
+
+    def test_without_front_matter(self):
+        front_matter, lines = split_front_matter(iter_lines("# Heading\n\nBody"))
+        self.assertEqual(front_matter, {})
+        self.assertEqual(list(lines), ["# Heading", "", "Body"])
+
+    def test_invalid_front_matter(self):
+        with self.assertRaises(ValueError):
+            split_front_matter(iter_lines("---\ntitle: Post\n# Heading"), "page.md")
+        with self.assertRaises(ValueError):
+            split_front_matter(iter_lines("---\nnot a pair\n---\n# Heading"))
+
+
+class TestFrontMatterIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        root = self.tmp.name
+        self.content = path.join(root, "content")
+        self.public = path.join(root, "public")
+        self.template = path.join(root, "template.html")
+        write(self.template, "{{ Content }}")
+        write(path.join(self.content, "index.md"), "# Home")
+        write(
+            path.join(self.content, "old", "index.md"),
+            "---\ndate: 2023-01-01\ntags: [news]\n---\n# Old",
+        )
+        write(
+            path.join(self.content, "new", "index.md"),
+            "---\ndate: 2024-01-01\ntags: [news, tips]\n---\n# New",
+        )
+        # A draft without a heading would fail to render
+        write(path.join(self.content, "draft", "index.md"), "---\ndraft: true\n---\n")
+        self.index = FrontMatterIndex()
+        self.manifest = Manifest()
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            self.public,
+            self.manifest,
+            front_matter=self.index,
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def source(self, name: str):
+        return path.normpath(path.join(self.content, name, "index.md"))
+
+    def test_drafts_are_skipped_before_rendering(self):
+        self.assertFalse(path.exists(path.join(self.public, "draft", "index.html")))
+        self.assertEqual(self.index.drafts(), [self.source("draft")])
+        self.assertTrue(path.isfile(path.join(self.public, "new", "index.html")))
+
+    def test_listing_and_tags(self):
+        self.assertEqual(
+            [source for source, _ in self.index.listing()],
+            [
+                self.source("new"),
+                self.source("old"),
+                path.normpath(path.join(self.content, "index.md")),
+            ],
+        )
+        self.assertEqual(
+            self.index.tags(),
+            {
+                "news": [self.source("new"), self.source("old")],
+                "tips": [self.source("new")],
+            },
+        )
+
+    def test_cached_front_matter_is_reused_for_the_same_hash(self):
+        page = self.source("old")
+        source_hash = hash_file(page)
+        write(page, "---\ndraft: true\n---\n# Old")
+        self.assertEqual(
+            self.index.get(page, source_hash),
+            {"date": "2023-01-01", "tags": ["news"]},
+        )
+        self.assertEqual(self.index.get(page, hash_file(page)), {"draft": True})
+
+    def test_page_turned_draft_is_removed(self):
+        page = self.source("old")
+        write(page, "---\ndraft: true\n---\n# Old")
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            self.public,
+            self.manifest,
+            front_matter=self.index,
+        )
+        self.assertFalse(path.exists(path.join(self.public, "old", "index.html")))
+        self.assertNotIn(
+            path.join(self.public, "old", "index.html"), self.manifest.entries
+        )
+
+    def test_save_and_load(self):
+        index_path = path.join(self.tmp.name, ".cache", "front_matter.json")
+        self.index.save(index_path)
+        self.assertEqual(FrontMatterIndex.load(index_path).entries, self.index.entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,167 @@
+import unittest
+from os import path, listdir
+from tempfile import TemporaryDirectory
+
+from fixtures import read_tree, write
+from generate_page import (
+    open_page,
+    render_page,
+    discover_pages,
+    generate_pages_recursive,
+    page_chunks,
+)
+from manifest import Manifest
+from memory import MemoryBudget, MB
+from metadata import MAX_PAGE_LINKS
+from template import Template
+
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = path.join(self.root, "content")
+        self.template = path.join(self.root, "template.html")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        for index in range(6):
+            write(
+                path.join(self.content, f"page{index}", "index.md"),
+                f"# Page {index}\n\nSome **bold** text and a [link](/page{index})",
+            )
+        write(path.join(self.content, "index.md"), "# Home\n\n* one\n* two")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_page_chunks_fill_every_placeholder(self):
+        template = Template("{{ Title }}|{{ Content }}|{{ Title }}")
+        html = "".join(page_chunks("# Name\n\nBody", template))
+        self.assertEqual(html, "Name|<div><h1>Name</h1><p>Body</p></div>|Name")
+
+    def test_open_page_parses_once_for_slots_and_metadata(self):
+        page = path.join(self.content, "page4", "index.md")
+        with open_page(page) as (slots, metadata):
+            self.assertEqual(slots["Title"], "Page 4")
+            self.assertEqual(
+                "".join(slots["Content"]()),
+                "<div><h1>Page 4</h1><p>Some <b>bold</b> text and a "
+                '<a href="/page4">link</a></p></div>',
+            )
+        self.assertEqual(metadata.outline, [(1, "Page 4")])
+        self.assertEqual(metadata.word_count, 8)
+        self.assertEqual(metadata.links, [("link", "/page4")])
+
+    def test_page_without_heading_fails(self):
+        write(path.join(self.content, "index.md"), "No heading")
+        with self.assertRaises(ValueError):
+            render_page(path.join(self.content, "index.md"), self.template)
+
+    def test_metadata_fills_template_slots(self):
+        write(self.template, "{{ Title }}: {{ WordCount }} words")
+        html, _ = render_page(path.join(self.content, "index.md"), self.template)
+        self.assertEqual(html, "Home: 3 words")
+
+    def test_front_matter_fills_template_slots(self):
+        write(self.template, "{{ Title }} by {{ author }}{{ missing }}")
+        page = path.join(self.content, "index.md")
+        write(page, "---\nauthor: Ada\n---\n# Home\n\nText")
+        html, _ = render_page(page, self.template)
+        self.assertEqual(html, "Home by Ada{{ missing }}")
+
+    def test_manifest_records_page_metadata(self):
+        dest = path.join(self.root, "public")
+        manifest = Manifest()
+        generate_pages_recursive(self.content, self.template, dest, manifest)
+        pages = manifest.pages()
+        self.assertEqual(len(pages), 7)
+        home = pages[path.join(dest, "index.html")]
+        self.assertEqual(home.title, "Home")
+        self.assertEqual(home.word_count, 3)
+
+    def test_directory_template_overrides_default(self):
+        write(path.join(self.content, "page1", "template.html"), "<x>{{ Title }}</x>")
+        dest = path.join(self.root, "public")
+        generate_pages_recursive(self.content, self.template, dest)
+        with open(path.join(dest, "page1", "index.html")) as f:
+            self.assertEqual(f.read(), "<x>Page 1</x>")
+        with open(path.join(dest, "page2", "index.html")) as f:
+            self.assertTrue(f.read().startswith("<title>Page 2</title>"))
+
+    def test_failed_page_leaves_no_output(self):
+        broken = path.join(self.content, "page2", "index.md")
+        write(broken, "# Broken\n\nUnclosed **bold")
+        dest = path.join(self.root, "public")
+        with self.assertRaises(ValueError):
+            generate_pages_recursive(self.content, self.template, dest)
+        self.assertListEqual(listdir(path.join(dest, "page2")), [])
+
+    def test_discover_pages_is_sorted_and_skips_other_files(self):
+        write(path.join(self.content, "notes.txt"), "not markdown")
+        dest = path.join(self.root, "public")
+        pages = discover_pages(self.content, dest)
+        self.assertEqual(
+            [path.relpath(src, self.content) for src, _ in pages],
+            ["index.md"] + [path.join(f"page{i}", "index.md") for i in range(6)],
+        )
+
+    def test_parallel_output_matches_serial(self):
+        serial = path.join(self.root, "serial")
+        parallel = path.join(self.root, "parallel")
+        generate_pages_recursive(self.content, self.template, serial)
+        generate_pages_recursive(self.content, self.template, parallel, jobs=3)
+        self.assertEqual(read_tree(serial), read_tree(parallel))
+
+    def test_budgeted_parallel_output_matches_serial(self):
+        serial = path.join(self.root, "serial")
+        budgeted = path.join(self.root, "budgeted")
+        serial_manifest = Manifest()
+        budgeted_manifest = Manifest()
+        generate_pages_recursive(self.content, self.template, serial, serial_manifest)
+        generate_pages_recursive(
+            self.content,
+            self.template,
+            budgeted,
+            budgeted_manifest,
+            jobs=2,
+            budget=MemoryBudget(128 * MB, 3),
+        )
+        self.assertEqual(read_tree(serial), read_tree(budgeted))
+        self.assertEqual(
+            list(serial_manifest.pages().values()),
+            list(budgeted_manifest.pages().values()),
+        )
+
+    def test_links_are_only_bounded_under_a_budget(self):
+        write(
+            path.join(self.content, "page0", "index.md"),
+            "# Links\n\n" + "[a](/a) " * (MAX_PAGE_LINKS + 1),
+        )
+        for budget, links in [
+            (None, MAX_PAGE_LINKS + 1),
+            (MemoryBudget(128 * MB), MAX_PAGE_LINKS),
+        ]:
+            manifest = Manifest()
+            generate_pages_recursive(
+                self.content,
+                self.template,
+                path.join(self.root, "public"),
+                manifest,
+                budget=budget,
+            )
+            page = manifest.page_metadata(
+                path.join(self.root, "public", "page0", "index.html")
+            )
+            self.assertEqual(len(page.links), links)
+
+    def test_errors_name_the_source_page(self):
+        broken = path.join(self.content, "page3", "index.md")
+        write(broken, "No heading here")
+        dest = path.join(self.root, "public")
+        with self.assertRaises(ValueError) as context:
+            generate_pages_recursive(self.content, self.template, dest, jobs=2)
+        self.assertIn(broken, str(context.exception))
+        self.assertTrue(path.exists(path.join(dest, "page4", "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+
+import highlight
+from highlight import HighlightCache, get_language, highlight as highlight_code
+
+
+class TestHighlight(unittest.TestCase):
+    def setUp(self):
+        self.cache = highlight.highlight_cache
+        highlight.highlight_cache = HighlightCache()
+
+    def tearDown(self):
+        highlight.highlight_cache = self.cache
+
+    def test_tokenizes_python(self):
+        code = 'def f(x):\n    return x + 1  # "one"\n'
+        self.assertEqual(
+            get_language("python").tokenize(code),
+            [
+                ("keyword", "def"),
+                (None, " "),
+                ("function", "f"),
+                (None, "(x):\n    "),
+                ("keyword", "return"),
+                (None, " x + "),
+                ("number", "1"),
+                (None, "  "),
+                ("comment", '# "one"'),
+                (None, "\n"),
+            ],
+        )
+
+    def test_tokens_cover_the_code(self):
+        samples = {
+            "js": "const a = `x${b}` // done\nconsole.log(a, null, 0x1f)",
+            "json": '{"key": [1, "two", true, null]}',
+            "bash": 'for f in *.md; do echo "$f" ${HOME}; done # loop',
+            "css": "a:hover { color: #fff; margin: 0 2px !important }",
+            "html": '<a href="/x">link</a><!-- note -->',
+            "go": "func main() { fmt.Println(`raw`, 'c', nil) }",
+            "rust": "fn f<'a>(x: &'a str) -> char { let c = '\\n'; c }",
+            "c++": "#include <stdio.h>\nint main(void) { return 0; }",
+            "java": "@Override public String toString() { return \"x\"; }",
+        }
+        for language, code in samples.items():
+            tokens = get_language(language).tokenize(code)
+            self.assertEqual("".join(text for _, text in tokens), code)
+            self.assertTrue(any(token is not None for token, _ in tokens))
+
+    def test_words_inside_identifiers_are_not_keywords(self):
+        tokens = get_language("python").tokenize("iffy = format_in")
+        self.assertEqual(tokens, [(None, "iffy = format_in")])
+
+    def test_rust_lifetimes_are_not_strings(self):
+        tokens = get_language("rust").tokenize("&'a str, 'b'")
+        self.assertIn(("label", "'a"), tokens)
+        self.assertIn(("string", "'b'"), tokens)
+
+    def test_highlights_escaped_html(self):
+        self.assertEqual(
+            highlight_code('x = "<b>" & y', "py"),
+            'x = <span class="hl-string">"&lt;b&gt;"</span> &amp; y',
+        )
+
+    def test_unknown_language(self):
+        self.assertIsNone(highlight_code("anything", "brainfork"))
+
+    def test_repeated_code_is_highlighted_once(self):
+        code = "let x = 1;"
+        first = highlight_code(code, "js")
+        self.assertEqual(highlight_code(code, "javascript"), first)
+        self.assertEqual(
+            (highlight.highlight_cache.hits, highlight.highlight_cache.misses), (1, 1)
+        )
+        highlight_code(code, "rust")
+        self.assertEqual(highlight.highlight_cache.misses, 2)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = HighlightCache(max_bytes=1000)
+        cache.put("a", "a" * 100)
+        cache.put("b", "b" * 100)
+        cache.get("a")
+        cache.put("c", "c" * 700)
+        self.assertEqual(list(cache.entries), ["a", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
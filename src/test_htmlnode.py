@@ -1,9 +1,11 @@
+import io
 import unittest
 
 from htmlnode import (
     HTMLNode,
     LeafNode,
     ParentNode,
+    RenderedNode,
     quote_block_to_html_node,
     code_block_to_html_node,
     heading_block_to_html_node,
@@ -27,6 +29,16 @@ class TestHTMLNode(unittest.TestCase):
         self.assertEqual(html_props, ' href="https://www.boot.dev"')
 
 
+    def test_slots(self):
+        nodes = [
+            HTMLNode("a", "text"),
+            LeafNode("b", "text"),
+            ParentNode("p", [LeafNode(None, "text")]),
+        ]
+        for node in nodes:
+            self.assertFalse(hasattr(node, "__dict__"))
+
+
 class TestLeafNode(unittest.TestCase):
     def test_raise_when_no_value(self):
         self.assertRaises(ValueError, LeafNode, "p", None)
@@ -91,6 +103,23 @@ class TestParentNode(unittest.TestCase):
             "<section><div><b>child 1</b></div><div><b>child 2</b></div></section>",
         )
 
+    def test_iter_html_matches_to_html(self):
+        parent_node = ParentNode(
+            "section",
+            [
+                ParentNode("div", [LeafNode("b", "child 1", {"class": "bold"})]),
+                LeafNode(None, "text"),
+                ParentNode("div", [LeafNode("a", "child 2", {"href": "/"})]),
+            ],
+        )
+        self.assertEqual("".join(parent_node.iter_html()), parent_node.to_html())
+
+    def test_write(self):
+        parent_node = ParentNode("div", [LeafNode("p", "paragraph")])
+        buffer = io.StringIO()
+        parent_node.write(buffer)
+        self.assertEqual(buffer.getvalue(), "<div><p>paragraph</p></div>")
+
     def test_create_quote_html_node(self):
         block = ">example quote\n>another line\n>and another"
         actual = quote_block_to_html_node(block)
@@ -101,10 +130,49 @@ class TestParentNode(unittest.TestCase):
         block = "```print('something')```"
         actual = code_block_to_html_node(block)
         expected = ParentNode(
-            "pre", [ParentNode("code", [LeafNode(None, "print('something')")])]
+            "pre",
+            [
+                ParentNode(
+                    "code", [RenderedNode("print('something')", "print('something')")]
+                )
+            ],
         )
         self.assertEqual(actual, expected)
 
+    def test_code_block_is_escaped_not_inline_parsed(self):
+        block = "```\nif a < b and **c**:\n```"
+        actual = code_block_to_html_node(block)
+        expected = ParentNode(
+            "pre",
+            [
+                ParentNode(
+                    "code",
+                    [
+                        RenderedNode(
+                            "if a &lt; b and **c**:\n", "if a < b and **c**:\n"
+                        )
+                    ],
+                )
+            ],
+        )
+        self.assertEqual(actual, expected)
+
+    def test_code_block_with_language_is_highlighted(self):
+        block = "```Python\nprint(1)\n```"
+        self.assertEqual(
+            code_block_to_html_node(block).to_html(),
+            '<pre><code class="language-python">'
+            '<span class="hl-builtin">print</span>('
+            '<span class="hl-number">1</span>)\n</code></pre>',
+        )
+
+    def test_code_block_with_unknown_language_is_plain(self):
+        block = "```mermaid\ngraph TD;\n```"
+        self.assertEqual(
+            code_block_to_html_node(block).to_html(),
+            '<pre><code class="language-mermaid">graph TD;\n</code></pre>',
+        )
+
     def test_heading_block_to_html_node(self):
         blocks = [
             ("# Heading 1", ParentNode("h1", [LeafNode(None, "Heading 1")])),
@@ -150,6 +218,19 @@ class TestParentNode(unittest.TestCase):
         )
         self.assertEqual(actual, expected)
 
+    def test_block_functions_match_with_pre_split_lines(self):
+        mocks = [
+            (quote_block_to_html_node, "> first\n> second"),
+            (quote_block_to_html_node, "> nested > marker\n>no space"),
+            (unordered_list_block_to_html_node, "* one\n- two * three"),
+            (ordered_list_block_to_html_node, "1. one\n2. two\n3. three"),
+            (ordered_list_block_to_html_node, "1. one 2. two\n2"),
+        ]
+        for func, block in mocks:
+            self.assertEqual(
+                func(block, block.split("\n")).to_html(), func(block).to_html()
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
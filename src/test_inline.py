@@ -203,6 +203,27 @@ class TestInline(unittest.TestCase):
         ]
         self.assertListEqual(actual, expected)
 
+    def test_text_to_textnodes_matches_chained_splits(self):
+        mocks = [
+            "plain text",
+            "![a](x) and [b](y) back to back![c](z)[d](w)",
+            "[outer ![image](x)](y) with `code` inside",
+            "**bold** and _italic_ then `snake_case` code",
+            "[](empty) and ![](empty) text",
+            "line one [link](a)\nline two ![img](b)",
+        ]
+        for mock in mocks:
+            node = TextNode(mock, text_type_text)
+            chained = split_nodes_link(split_nodes_image([node]))
+            chained = split_nodes_delimiter(chained, "`", text_type_code)
+            chained = split_nodes_delimiter(chained, "**", text_type_bold)
+            chained = split_nodes_delimiter(chained, "_", text_type_italic)
+            expected = [node for node in chained if len(node.text)]
+            self.assertListEqual(text_to_textnodes(mock), expected)
+
+    def test_text_to_textnodes_invalid(self):
+        self.assertRaises(ValueError, text_to_textnodes, "[link](x) with **bold")
+
 
 if __name__ == "__main__":
     unittest.main()
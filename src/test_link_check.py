@@ -0,0 +1,79 @@
+import unittest
+from os import path, makedirs
+from tempfile import TemporaryDirectory
+
+from copy_contents import copy_contents
+from fixtures import write
+from generate_page import generate_pages_recursive
+from link_check import BrokenLink, check_links, output_url
+from manifest import Manifest
+
+
+class TestLinkCheck(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        root = self.tmp.name
+        self.content = path.join(root, "content")
+        self.public = path.join(root, "public")
+        template = path.join(root, "template.html")
+        write(template, "{{ Content }}")
+        write(path.join(root, "static", "images", "logo.png"), "png")
+        write(
+            path.join(self.content, "index.md"),
+            "# Home\n\n[post](/post/) [missing](/gone#top) [web](https://example.com)",
+        )
+        write(
+            path.join(self.content, "post", "index.md"),
+            "# Post\n\n[home](../) ![logo](/images/logo.png) ![broken](pic.png)",
+        )
+        makedirs(self.public)
+        self.manifest = Manifest()
+        copy_contents(path.join(root, "static"), self.public, self.manifest)
+        generate_pages_recursive(self.content, template, self.public, self.manifest)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_output_url(self):
+        self.assertEqual(output_url(path.join("public", "index.html"), "public"), "/")
+        self.assertEqual(
+            output_url(path.join("public", "a", "index.html"), "public"), "/a"
+        )
+        self.assertEqual(
+            output_url(path.join("public", "a", "b.png"), "public"), "/a/b.png"
+        )
+        self.assertEqual(
+            output_url(path.join("public", "a", "..", "index.html"), "public/"), "/"
+        )
+        self.assertEqual(
+            output_url(path.join("public", "a?b.png"), "public"),
+            output_url(path.join("public", ".", "a?b.png"), "public"),
+        )
+
+    def test_reports_broken_links_per_page(self):
+        report = check_links(self.manifest, self.public)
+        self.assertEqual((report.pages, report.links), (2, 6))
+        self.assertEqual(
+            report.broken,
+            [
+                BrokenLink(
+                    path.join(self.content, "index.md"), "link", "missing", "/gone#top"
+                ),
+                BrokenLink(
+                    path.join(self.content, "post", "index.md"),
+                    "image",
+                    "broken",
+                    "pic.png",
+                ),
+            ],
+        )
+
+    def test_checks_only_given_sources(self):
+        sources = [path.join(self.content, "post", "index.md")]
+        report = check_links(self.manifest, self.public, sources)
+        self.assertEqual(report.pages, 1)
+        self.assertEqual([broken.url for broken in report.broken], ["pic.png"])
+
+
+if __name__ == "__main__":
+    unittest.main()
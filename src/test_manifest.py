@@ -0,0 +1,83 @@
+import unittest
+from os import path, makedirs, remove, rmdir
+from tempfile import TemporaryDirectory
+
+from copy_contents import copy_contents
+from fixtures import write
+from generate_page import generate_pages_recursive
+from manifest import Manifest, hash_file
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = path.join(self.root, "content")
+        self.static = path.join(self.root, "static")
+        self.public = path.join(self.root, "public")
+        self.template = path.join(self.root, "template.html")
+        self.manifest_path = path.join(self.root, ".cache", "manifest.json")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write(path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        write(path.join(self.content, "post", "index.md"), "# Post\n\nBody")
+        write(path.join(self.static, "index.css"), "body {}")
+        makedirs(self.public)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self):
+        manifest = Manifest.load(self.manifest_path)
+        copy_contents(self.static, self.public, manifest)
+        generate_pages_recursive(self.content, self.template, self.public, manifest)
+        removed = manifest.prune()
+        manifest.save(self.manifest_path)
+        return manifest, removed
+
+    def test_load_missing_manifest(self):
+        manifest = Manifest.load(path.join(self.root, "missing.json"))
+        self.assertEqual(manifest.entries, {})
+
+    def test_is_current_after_record(self):
+        source = path.join(self.content, "index.md")
+        dest = path.join(self.public, "index.html")
+        write(dest, "")
+        manifest = Manifest()
+        manifest.record(source, dest, hash_file(source), "template")
+        self.assertTrue(manifest.is_current(source, dest, hash_file(source), "template"))
+        self.assertFalse(manifest.is_current(source, dest, hash_file(source), "other"))
+
+    def test_unchanged_build_skips_everything(self):
+        self.build()
+        output = path.join(self.public, "post", "index.html")
+        with open(output, "w") as f:
+            f.write("untouched")
+        self.build()
+        with open(output) as f:
+            self.assertEqual(f.read(), "untouched")
+
+    def test_changed_source_is_rebuilt(self):
+        self.build()
+        write(path.join(self.content, "post", "index.md"), "# Changed\n\nBody")
+        self.build()
+        with open(path.join(self.public, "post", "index.html")) as f:
+            self.assertIn("<title>Changed</title>", f.read())
+
+    def test_changed_template_rebuilds_pages(self):
+        self.build()
+        write(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        with open(path.join(self.public, "index.html")) as f:
+            self.assertTrue(f.read().startswith("<h1>Home</h1>"))
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        remove(path.join(self.content, "post", "index.md"))
+        rmdir(path.join(self.content, "post"))
+        _, removed = self.build()
+        self.assertEqual(removed, [path.join(self.public, "post", "index.html")])
+        self.assertFalse(path.exists(path.join(self.public, "post")))
+
+
+if __name__ == "__main__":
+    unittest.main()
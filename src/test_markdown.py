@@ -2,7 +2,7 @@ import unittest
 
 from htmlnode import ParentNode, LeafNode
 
-from markdown import markdown_to_html_node
+from markdown import markdown_to_html_node, markdown_to_html_chunks
 
 
 class TestMarkdown(unittest.TestCase):
@@ -57,6 +57,25 @@ This is the same paragraph on a new line
         )
         self.assertEqual(actual, expected)
 
+    def test_markdown_to_html_chunks_matches_to_html(self):
+        markdown = """# Heading
+
+Paragraph with a [link](/page) and **bold** text
+
+> quoted
+> lines
+
+1. first
+2. second
+
+```
+code
+```"""
+        self.assertEqual(
+            "".join(markdown_to_html_chunks(markdown)),
+            markdown_to_html_node(markdown).to_html(),
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
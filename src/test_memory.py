@@ -0,0 +1,111 @@
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+
+from memory import (
+    BLOCK_MEMORY_FACTOR,
+    MB,
+    PAGE_BYTES,
+    PROCESS_BYTES,
+    MemoryBudget,
+    peak_rss,
+    peak_rss_summary,
+)
+
+
+# Runs tasks when their results are taken, recording the estimated cost of
+# the pages handed over but not yet collected
+class FakePool:
+    def __init__(self, budget: MemoryBudget) -> None:
+        self.budget = budget
+        self.in_flight = []
+        self.peaks = []
+
+    def apply_async(self, func, args):
+        task = args[0]
+        self.in_flight.append(task)
+        self.peaks.append(list(self.in_flight))
+        pool = self
+
+        class Result:
+            def get(self):
+                pool.in_flight.remove(task)
+                return func(task)
+
+        return Result()
+
+
+class TestMemoryBudget(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def page(self, name: str, size: int):
+        file_path = path.join(self.tmp.name, name)
+        with open(file_path, "w") as f:
+            f.write("x" * size)
+        return (file_path,)
+
+    def test_budget_is_split_between_caches_and_pages(self):
+        budget = MemoryBudget(400 * MB, 4)
+        self.assertEqual(budget.cache_bytes, 25 * MB)
+        self.assertEqual(budget.page_bytes, 300 * MB - 4 * PROCESS_BYTES)
+        page = self.page("page.md", 1000)
+        self.assertEqual(budget.page_cost(page[0]), PAGE_BYTES)
+
+    def test_page_cost_grows_with_the_largest_block(self):
+        budget = MemoryBudget(400 * MB, 4)
+        size = PAGE_BYTES // BLOCK_MEMORY_FACTOR + 1
+        single = self.page("single.md", size)
+        self.assertEqual(
+            budget.page_cost(single[0]), PAGE_BYTES + BLOCK_MEMORY_FACTOR * size
+        )
+        # The same amount of markdown in many small blocks
+        many = path.join(self.tmp.name, "many.md")
+        with open(many, "w") as f:
+            f.write(("x" * 99 + "\n\n") * (size // 100 + 1))
+        self.assertEqual(budget.page_cost(many), PAGE_BYTES + BLOCK_MEMORY_FACTOR * 99)
+
+    def test_pages_in_flight_fit_the_budget(self):
+        budget = MemoryBudget(400 * MB, 4)
+        large = (budget.page_bytes - PAGE_BYTES) // BLOCK_MEMORY_FACTOR
+        tasks = [self.page(f"small{i}.md", 1000) for i in range(4)]
+        tasks.insert(2, self.page("large.md", large))
+        pool = FakePool(budget)
+        results = list(budget.imap(pool, lambda task: task[0], tasks))
+        self.assertEqual(results, [task[0] for task in tasks])
+        for in_flight in pool.peaks:
+            cost = sum(budget.page_cost(task[0]) for task in in_flight)
+            self.assertTrue(len(in_flight) == 1 or cost <= budget.page_bytes)
+        self.assertIn([tasks[2]], pool.peaks)
+        self.assertEqual(max(len(in_flight) for in_flight in pool.peaks), 2)
+
+    def test_page_larger_than_budget_runs_alone(self):
+        budget = MemoryBudget(100 * MB, 1)
+        tasks = [
+            self.page("small.md", 10),
+            self.page("huge.md", budget.page_bytes),
+            self.page("after.md", 10),
+        ]
+        pool = FakePool(budget)
+        self.assertEqual(len(list(budget.imap(pool, lambda task: task, tasks))), 3)
+        self.assertEqual(pool.peaks, [[tasks[0]], [tasks[1]], [tasks[2]]])
+
+    def test_peak_rss(self):
+        peak = peak_rss()
+        if peak is None:
+            self.skipTest("resource module unavailable")
+        self.assertGreater(peak[0], MB)
+
+    def test_peak_rss_summary_reports_workers_of_pooled_builds(self):
+        if peak_rss() is None:
+            self.skipTest("resource module unavailable")
+        self.assertNotIn("worker", peak_rss_summary(pooled=False))
+        budget = MemoryBudget(100 * MB)
+        self.assertIn("(budget 100 MB)", peak_rss_summary(budget))
+
+
+if __name__ == "__main__":
+    unittest.main()
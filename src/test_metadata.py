@@ -0,0 +1,121 @@
+import unittest
+
+from markdown import markdown_to_document, markdown_to_html_node
+from metadata import MAX_PAGE_LINKS, MAX_PAGE_TERMS, PageMetadata
+
+
+class TestMetadata(unittest.TestCase):
+    def test_document_tree_and_metadata_from_one_pass(self):
+        markdown = (
+            "# Main **title**\n\n"
+            "Intro with a [link](/a) and ![alt text](/img.png)\n\n"
+            "## Section\n\n"
+            "* one item\n* [two](/b)"
+        )
+        root, metadata = markdown_to_document(markdown)
+        self.assertEqual(root.to_html(), markdown_to_html_node(markdown).to_html())
+        self.assertEqual(metadata.title, "Main **title**")
+        self.assertEqual(metadata.outline, [(1, "Main **title**"), (2, "Section")])
+        self.assertEqual(metadata.word_count, 11)
+        self.assertEqual(metadata.links, [("link", "/a"), ("two", "/b")])
+        self.assertEqual(metadata.images, [("alt text", "/img.png")])
+
+    def test_terms_and_summary(self):
+        markdown = (
+            "# Title\n\n"
+            "The quick, brown _fox's_ den at [home](/a) is a den\n\n"
+            "Second paragraph"
+        )
+        _, metadata = markdown_to_document(markdown)
+        self.assertEqual(
+            metadata.to_dict()["terms"],
+            "at brown den fox home is paragraph quick second the title",
+        )
+        self.assertEqual(
+            metadata.summary, "The quick, brown fox's den at home is a den"
+        )
+
+    def test_code_terms_are_the_code_not_its_entities(self):
+        for fence in ["```", "```python"]:
+            _, metadata = markdown_to_document(
+                f"# Title\n\n{fence}\nif a < b & c > d:\n```"
+            )
+            self.assertEqual(metadata.to_dict()["terms"], "if title", fence)
+            self.assertEqual(metadata.word_count, 9, fence)
+
+    def test_summary_is_truncated(self):
+        _, metadata = markdown_to_document("# Title\n\n" + "word " * 60)
+        self.assertEqual(metadata.summary, " ".join(["word"] * 50) + "...")
+
+    def test_dict_round_trip(self):
+        _, metadata = markdown_to_document("# Title\n\n[a](/a)")
+        self.assertEqual(PageMetadata.from_dict(metadata.to_dict()), metadata)
+
+    # A block's metadata with the given links and words
+    def block(self, links=(), terms=()):
+        return {
+            "heading": None,
+            "words": len(terms),
+            "links": list(links),
+            "images": [],
+            "terms": list(terms),
+            "summary": None,
+        }
+
+    def test_links_are_bounded_under_a_budget(self):
+        links = [("a", "/a")] * (MAX_PAGE_LINKS - 1)
+        extra = [("b", "/b"), ("c", "/c")]
+        unbounded = PageMetadata("Title")
+        bounded = PageMetadata("Title", bounded=True)
+        for metadata in (unbounded, bounded):
+            metadata.add_block(self.block(links))
+            metadata.add_block(self.block(extra))
+        self.assertEqual(unbounded.links, links + extra)
+        self.assertFalse(unbounded.truncated)
+        self.assertEqual(len(bounded.links), MAX_PAGE_LINKS)
+        self.assertEqual(bounded.links[-1], ("b", "/b"))
+        self.assertTrue(bounded.truncated)
+
+    def test_terms_are_bounded_under_a_budget(self):
+        words = [f"word{i}" for i in range(MAX_PAGE_TERMS)]
+        unbounded = PageMetadata("Title")
+        bounded = PageMetadata("Title", bounded=True)
+        for metadata in (unbounded, bounded):
+            metadata.add_block(self.block(terms=words))
+            metadata.add_block(self.block(terms=["word1"]))
+            self.assertFalse(metadata.truncated)
+            metadata.add_block(self.block(terms=["other"]))
+        self.assertEqual(len(unbounded.terms), MAX_PAGE_TERMS + 1)
+        self.assertFalse(unbounded.truncated)
+        self.assertEqual(len(bounded.terms), MAX_PAGE_TERMS)
+        self.assertTrue(bounded.truncated)
+
+    def test_slots(self):
+        metadata = PageMetadata("Title", word_count=450)
+        self.assertEqual(
+            metadata.slots(),
+            {"Title": "Title", "WordCount": "450", "ReadingTime": "2"},
+        )
+
+    def test_front_matter_slots(self):
+        metadata = PageMetadata(
+            "Title",
+            front_matter={
+                "author": "A & B",
+                "Title": "Other",
+                "weight": 3,
+                "draft": False,
+                "tags": ["x"],
+            },
+        )
+        slots = metadata.slots()
+        self.assertEqual(
+            (slots["author"], slots["weight"], slots["draft"]),
+            ("A &amp; B", "3", "false"),
+        )
+        self.assertEqual(slots["Title"], "Title")
+        self.assertNotIn("tags", slots)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+import patterns
+from patterns import get_pattern, register_pattern, link_regex
+
+
+class TestPatterns(unittest.TestCase):
+    def tearDown(self):
+        patterns.registry.pop("test_mention", None)
+
+    def test_grammar_patterns_are_registered(self):
+        self.assertIs(get_pattern("link"), link_regex)
+        self.assertEqual(
+            get_pattern("image").findall("![alt](/a.png)"), [("alt", "/a.png")]
+        )
+
+    def test_register_pattern_for_extensions(self):
+        mention = register_pattern("test_mention", r"@(\w+)")
+        self.assertIs(get_pattern("test_mention"), mention)
+        self.assertIs(register_pattern("test_mention", r"@(\w+)"), mention)
+        self.assertEqual(mention.findall("hi @ann and @bob"), ["ann", "bob"])
+
+    def test_register_conflicting_pattern(self):
+        register_pattern("test_mention", r"@(\w+)")
+        with self.assertRaises(ValueError):
+            register_pattern("test_mention", r"@(\d+)")
+
+    def test_get_unknown_pattern(self):
+        with self.assertRaises(ValueError):
+            get_pattern("missing")
+
+
+if __name__ == "__main__":
+    unittest.main()
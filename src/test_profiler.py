@@ -0,0 +1,54 @@
+import unittest
+
+import profiler
+from profiler import Profiler
+from markdown import markdown_to_html_chunks
+
+
+class TestProfiler(unittest.TestCase):
+    def tearDown(self):
+        profiler.disable()
+
+    def test_stage_is_noop_when_disabled(self):
+        self.assertIs(profiler.stage("anything"), profiler.null_context)
+        chunks = ["a", "b"]
+        self.assertIs(profiler.profile_chunks("serialize", chunks), chunks)
+
+    def test_nested_stages_are_exclusive(self):
+        build_profiler = Profiler(trace_memory=False)
+        with build_profiler.stage("outer"):
+            with build_profiler.stage("inner"):
+                pass
+            with build_profiler.stage("inner"):
+                pass
+        stages = build_profiler.build_stages
+        self.assertEqual(stages["outer"]["calls"], 1)
+        self.assertEqual(stages["inner"]["calls"], 2)
+        self.assertGreaterEqual(stages["outer"]["seconds"], 0)
+
+    def test_page_records_pipeline_stages(self):
+        build_profiler = Profiler()
+        profiler.enable(build_profiler)
+        with profiler.page("content/index.md"):
+            html = "".join(
+                profiler.profile_chunks(
+                    profiler.stage_serialize,
+                    markdown_to_html_chunks("# Title\n\n* one\n* [two](/two)"),
+                )
+            )
+        profiler.disable()
+        self.assertEqual(
+            html, '<div><h1>Title</h1><ul><li>one</li><li><a href="/two">two</a></li></ul></div>'
+        )
+        page = build_profiler.pages[0]
+        self.assertEqual(page["path"], "content/index.md")
+        self.assertEqual(page["stages"]["block_type"]["calls"], 2)
+        self.assertEqual(page["stages"]["inline"]["calls"], 3)
+        self.assertIn("tree_build", page["stages"])
+        self.assertIn("serialize", page["stages"])
+        self.assertGreater(page["peak_bytes"], 0)
+        self.assertEqual(build_profiler.slowest_pages(1), [page])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import json
+import unittest
+from os import path
+from tempfile import TemporaryDirectory
+
+import render_cache
+from render_cache import RenderCache, block_key
+from blocks import iter_blocks, iter_lines
+from markdown import markdown_to_html_chunks, blocks_to_html_chunks
+from metadata import PageMetadata
+
+
+class TestRenderCache(unittest.TestCase):
+    def tearDown(self):
+        render_cache.disable()
+
+    def test_get_counts_hits_and_misses(self):
+        cache = RenderCache()
+        self.assertIsNone(cache.get("key"))
+        cache.put("key", "<p>html</p>")
+        self.assertEqual(cache.get("key"), ("<p>html</p>", None))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_evicts_least_recently_used(self):
+        cache = RenderCache(max_bytes=10)
+        cache.put("a", "aaaa")
+        cache.put("b", "bbbb")
+        cache.get("a")
+        cache.put("c", "cccc")
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.size, 8)
+
+    def test_skips_entries_larger_than_limit(self):
+        cache = RenderCache(max_bytes=3)
+        cache.put("a", "aaaa")
+        self.assertEqual(len(cache.entries), 0)
+
+    def test_metadata_counts_towards_limit(self):
+        cache = RenderCache(max_bytes=2000)
+        metadata = {
+            "heading": None,
+            "links": [("a", "/a")],
+            "images": [],
+            "summary": None,
+            "words": 2,
+            "terms": {"two", "words"},
+        }
+        cache.put("a", "<p>two words</p>", metadata)
+        self.assertGreater(cache.size, len("<p>two words</p>") + 200)
+        cache.put("b", "<p>two words</p>", metadata)
+        self.assertEqual(list(cache.entries), ["b"])
+
+    def test_metadata_keeps_distinct_words(self):
+        cache = RenderCache()
+        metadata = {
+            "heading": None,
+            "links": [],
+            "images": [],
+            "summary": None,
+            "words": 3,
+            "terms": ["two", "two", "words"],
+        }
+        cache.put("a", "<p>two two words</p>", metadata)
+        self.assertEqual(cache.get("a")[1]["terms"], {"two", "words"})
+        self.assertEqual(metadata["terms"], ["two", "two", "words"])
+
+    def test_save_and_load(self):
+        with TemporaryDirectory() as root:
+            cache_path = path.join(root, "cache", "render_cache.json")
+            cache = RenderCache()
+            cache.put("a", "<p>a</p>")
+            cache.put("b", "<p>b</p>")
+            cache.save(cache_path)
+            loaded = RenderCache.load(cache_path)
+            self.assertEqual(list(loaded.entries.items()), list(cache.entries.items()))
+
+    def test_load_discards_cache_from_other_renderer(self):
+        with TemporaryDirectory() as root:
+            cache_path = path.join(root, "render_cache.json")
+            with open(cache_path, "w") as f:
+                json.dump({"fingerprint": "old", "entries": [["a", "<p>a</p>"]]}, f)
+            self.assertEqual(len(RenderCache.load(cache_path).entries), 0)
+
+    def test_cached_chunks_match_uncached(self):
+        markdown = "# Title\n\nShared **block**\n\n* list\n* items\n\nShared **block**"
+        expected = "".join(markdown_to_html_chunks(markdown))
+        cache = RenderCache()
+        render_cache.enable(cache)
+        self.assertEqual("".join(markdown_to_html_chunks(markdown)), expected)
+        self.assertEqual("".join(markdown_to_html_chunks(markdown)), expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 3))
+        self.assertEqual(
+            cache.entries[block_key("Shared **block**")][0],
+            "<p>Shared <b>block</b></p>",
+        )
+
+    def test_cached_blocks_keep_their_metadata(self):
+        markdown = "# Title\n\nA [link](/a)\n\nA [link](/a)"
+        expected = PageMetadata()
+        "".join(blocks_to_html_chunks(iter_blocks(iter_lines(markdown)), expected))
+        render_cache.enable(RenderCache())
+        for _ in range(2):
+            metadata = PageMetadata()
+            "".join(blocks_to_html_chunks(iter_blocks(iter_lines(markdown)), metadata))
+            self.assertEqual(metadata, expected)
+        self.assertEqual(expected.links, [("link", "/a"), ("link", "/a")])
+
+
+if __name__ == "__main__":
+    unittest.main()
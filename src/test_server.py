@@ -0,0 +1,267 @@
+import gzip
+import http.client
+import mmap
+import sys
+import threading
+import unittest
+from functools import partial
+from os import link, path, stat, utime
+from tempfile import TemporaryDirectory
+
+from fixtures import write
+
+# server.py lives at the repository root, beside src/
+sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), ".."))
+
+from server import (
+    CachingHTTPRequestHandler,
+    FileCache,
+    ThreadedHTTPServer,
+    accepted_encodings,
+)
+
+PAGE = "<h1>Hello</h1>" * 10
+
+
+class QuietHandler(CachingHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class TestCachingHTTPRequestHandler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+        self.page = path.join(self.root, "post", "index.html")
+        write(self.page, PAGE)
+        handler = type("Handler", (QuietHandler,), {"file_cache": FileCache()})
+        self.server = ThreadedHTTPServer(
+            ("127.0.0.1", 0), partial(handler, directory=self.root)
+        )
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, kwargs={"poll_interval": 0.01}
+        )
+        self.thread.start()
+        # Every request goes over the one keep-alive connection
+        self.connection = http.client.HTTPConnection(
+            "127.0.0.1", self.server.server_address[1], timeout=5
+        )
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        self.tmp.cleanup()
+
+    # (status, headers, body) of a request for url
+    def request(self, url: str, method="GET", **headers):
+        self.connection.request(
+            method, url, headers={k.replace("_", "-"): v for k, v in headers.items()}
+        )
+        response = self.connection.getresponse()
+        return response.status, response.headers, response.read()
+
+    def test_get(self):
+        status, headers, body = self.request("/post/")
+        self.assertEqual(status, 200)
+        self.assertEqual(body, PAGE.encode())
+        self.assertEqual(headers["Content-Type"], "text/html")
+        self.assertEqual(headers["Content-Length"], str(len(PAGE)))
+        self.assertEqual(headers["Accept-Ranges"], "bytes")
+        self.assertTrue(headers["ETag"].startswith('"'))
+
+    def test_if_none_match(self):
+        _, headers, _ = self.request("/post/")
+        status, not_modified, body = self.request(
+            "/post/", If_None_Match=f'"other", {headers["ETag"]}'
+        )
+        self.assertEqual((status, body), (304, b""))
+        self.assertEqual(not_modified["ETag"], headers["ETag"])
+        status, _, body = self.request("/post/", If_None_Match='"other"')
+        self.assertEqual((status, body), (200, PAGE.encode()))
+
+    def test_if_modified_since(self):
+        _, headers, _ = self.request("/post/")
+        status, _, body = self.request(
+            "/post/", If_Modified_Since=headers["Last-Modified"]
+        )
+        self.assertEqual((status, body), (304, b""))
+        status, _, _ = self.request(
+            "/post/", If_Modified_Since="Thu, 01 Jan 1970 00:00:00 GMT"
+        )
+        self.assertEqual(status, 200)
+        # If-None-Match takes precedence
+        status, _, _ = self.request(
+            "/post/",
+            If_None_Match='"other"',
+            If_Modified_Since=headers["Last-Modified"],
+        )
+        self.assertEqual(status, 200)
+
+    def test_ranges(self):
+        size = len(PAGE)
+        for header, content_range, body in [
+            ("bytes=0-3", f"bytes 0-3/{size}", PAGE[:4]),
+            ("bytes=-5", f"bytes {size - 5}-{size - 1}/{size}", PAGE[-5:]),
+            ("bytes=10-", f"bytes 10-{size - 1}/{size}", PAGE[10:]),
+            ("bytes=10-100000", f"bytes 10-{size - 1}/{size}", PAGE[10:]),
+        ]:
+            status, headers, received = self.request("/post/", Range=header)
+            self.assertEqual(status, 206, header)
+            self.assertEqual(headers["Content-Range"], content_range)
+            self.assertEqual(received, body.encode())
+
+    def test_unsatisfiable_ranges(self):
+        for header in [f"bytes={len(PAGE)}-", "bytes=5-2", "bytes=-0"]:
+            status, headers, body = self.request("/post/", Range=header)
+            self.assertEqual(status, 416, header)
+            self.assertEqual(headers["Content-Range"], f"bytes */{len(PAGE)}")
+            self.assertEqual(body, b"")
+
+    def test_whole_file_for_multiple_ranges_and_stale_if_range(self):
+        status, _, body = self.request("/post/", Range="bytes=0-1,4-5")
+        self.assertEqual((status, body), (200, PAGE.encode()))
+        status, _, body = self.request("/post/", Range="bytes=0-1", If_Range='"old"')
+        self.assertEqual((status, body), (200, PAGE.encode()))
+        _, headers, _ = self.request("/post/")
+        status, _, body = self.request(
+            "/post/", Range="bytes=0-1", If_Range=headers["ETag"]
+        )
+        self.assertEqual((status, body), (206, PAGE[:2].encode()))
+
+    def test_head_has_no_body(self):
+        status, headers, body = self.request("/post/", "HEAD")
+        self.assertEqual((status, body), (200, b""))
+        self.assertEqual(headers["Content-Length"], str(len(PAGE)))
+        # The connection is still usable after a body-less response
+        self.assertEqual(self.request("/post/")[2], PAGE.encode())
+
+    def test_options_preflight(self):
+        status, headers, body = self.request(
+            "/post/", "OPTIONS", Access_Control_Request_Method="GET"
+        )
+        self.assertEqual((status, body), (200, b""))
+        self.assertEqual(headers["Content-Length"], "0")
+        self.assertEqual(headers["Access-Control-Allow-Origin"], "*")
+        # The keep-alive connection is still usable
+        self.assertEqual(self.request("/post/")[2], PAGE.encode())
+
+    def test_directory_without_slash_redirects(self):
+        status, headers, _ = self.request("/post")
+        self.assertEqual(status, 301)
+        self.assertEqual(headers["Location"], "/post/")
+
+    def test_missing_file(self):
+        status, _, _ = self.request("/missing.html")
+        self.assertEqual(status, 404)
+
+    # Writes the page's gzip sibling as the build's --compress stage does,
+    # with the page's mtime, or an older one when stale
+    def write_gzip_sibling(self, stale=False):
+        write(self.page + ".gz", gzip.compress(PAGE.encode()))
+        mtime_ns = stat(self.page).st_mtime_ns
+        if stale:
+            mtime_ns -= 10**9
+        utime(self.page + ".gz", ns=(mtime_ns, mtime_ns))
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings("gzip, BR;q=0.5, deflate;q=0, *;q=0.1, x;q=bad"),
+            {"gzip": 1.0, "br": 0.5, "deflate": 0.0, "*": 0.1, "x": 0.0},
+        )
+        self.assertEqual(accepted_encodings(""), {})
+        self.assertEqual(accepted_encodings(" , gzip ;q=0.2"), {"gzip": 0.2})
+
+    def test_precompressed_sibling(self):
+        self.write_gzip_sibling()
+        for accept_encoding, encoding in [
+            ("gzip, deflate", "gzip"),
+            ("*", "gzip"),
+            ("br;q=0, *;q=0.5", "gzip"),
+            ("gzip;q=0", None),
+            ("gzip;q=0, *", None),
+            ("*;q=0", None),
+            ("identity", None),
+        ]:
+            status, headers, body = self.request(
+                "/post/", Accept_Encoding=accept_encoding
+            )
+            self.assertEqual(status, 200)
+            self.assertEqual(headers["Content-Encoding"], encoding, accept_encoding)
+            self.assertEqual(headers["Vary"], "Accept-Encoding")
+            if encoding is None:
+                self.assertEqual(body, PAGE.encode())
+            else:
+                self.assertEqual(gzip.decompress(body), PAGE.encode())
+
+    def test_precompressed_sibling_has_its_own_etag(self):
+        self.write_gzip_sibling()
+        _, plain, _ = self.request("/post/")
+        _, encoded, _ = self.request("/post/", Accept_Encoding="gzip")
+        self.assertNotEqual(plain["ETag"], encoded["ETag"])
+        status, _, _ = self.request(
+            "/post/", Accept_Encoding="gzip", If_None_Match=plain["ETag"]
+        )
+        self.assertEqual(status, 200)
+
+    def test_ranges_ignore_precompressed_sibling(self):
+        self.write_gzip_sibling()
+        status, headers, body = self.request(
+            "/post/", Accept_Encoding="gzip", Range="bytes=0-3"
+        )
+        self.assertEqual((status, body), (206, PAGE[:4].encode()))
+        self.assertIsNone(headers["Content-Encoding"])
+
+    def test_stale_precompressed_sibling_is_not_served(self):
+        self.write_gzip_sibling(stale=True)
+        _, headers, body = self.request("/post/", Accept_Encoding="gzip")
+        self.assertIsNone(headers["Content-Encoding"])
+        self.assertEqual(body, PAGE.encode())
+
+
+class TestFileCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_maps_only_larger_files_up_to_max_mapped(self):
+        cache = FileCache(map_min_file_size=8, max_mapped=2, map_files=True)
+        small = path.join(self.root, "small.html")
+        write(small, "tiny")
+        self.assertIsInstance(cache.get(small, "text/html").data, bytes)
+        files = [path.join(self.root, f"file{i}.html") for i in range(4)]
+        for file in files:
+            write(file, "larger than eight bytes")
+        for file in files[:2]:
+            self.assertIsInstance(cache.get(file, "text/html").data, mmap.mmap)
+        # Past max_mapped, files are read instead
+        self.assertIsInstance(cache.get(files[2], "text/html").data, bytes)
+        self.assertEqual(cache.mapped, 2)
+
+        # Evicting the least recently used files frees a map's slot
+        cache.max_bytes = cache.size
+        cache.get(files[3], "text/html")
+        self.assertEqual(cache.mapped, 1)
+        self.assertIsInstance(cache.get(files[0], "text/html").data, mmap.mmap)
+
+    def test_maps_only_when_asked_and_not_hard_linked(self):
+        file = path.join(self.root, "file.html")
+        write(file, "larger than eight bytes")
+        cache = FileCache(map_min_file_size=8)
+        self.assertIsInstance(cache.get(file, "text/html").data, bytes)
+
+        # A build's --copy-mode hardlink shares the file with static/, where
+        # it may be rewritten in place
+        linked = path.join(self.root, "linked.html")
+        link(file, linked)
+        cache = FileCache(map_min_file_size=8, map_files=True)
+        self.assertIsInstance(cache.get(linked, "text/html").data, bytes)
+        self.assertEqual(cache.mapped, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
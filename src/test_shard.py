@@ -0,0 +1,168 @@
+import argparse
+import json
+import unittest
+from os import path, makedirs
+from tempfile import TemporaryDirectory
+
+from fixtures import read_tree, write
+from generate_page import discover_pages, generate_pages_recursive
+from manifest import Manifest, MANIFEST_PATH
+from shard import (
+    ShardPaths,
+    build_shard,
+    merge_shards,
+    parse_shard,
+    run_local,
+    shard_of,
+    shard_pages,
+)
+
+SHARDS = 3
+
+
+class TestShard(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = path.join(self.root, "content")
+        self.static = path.join(self.root, "static")
+        self.public = path.join(self.root, "public")
+        self.shards = path.join(self.root, "shards")
+        self.template = path.join(self.root, "template.html")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write(path.join(self.content, "index.md"), "# Home\n\n[First](/page0)")
+        for i in range(12):
+            write(
+                path.join(self.content, f"page{i}", "index.md"),
+                f"---\ndate: 2024-01-{i + 1:02d}\n---\n# Page {i}\n\nText [home](/)",
+            )
+        write(path.join(self.static, "index.css"), "body {}")
+        makedirs(self.public)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build_shards(self):
+        for shard in range(SHARDS):
+            build_shard(self.content, self.template, shard, SHARDS, self.shards)
+
+    def test_shard_of_is_deterministic_and_relative(self):
+        other = path.join(self.root, "elsewhere", "content")
+        for i in range(12):
+            page = path.join("page" + str(i), "index.md")
+            shard = shard_of(path.join(self.content, page), self.content, SHARDS)
+            self.assertIn(shard, range(SHARDS))
+            self.assertEqual(shard_of(path.join(other, page), other, SHARDS), shard)
+
+    def test_shards_partition_pages(self):
+        pages = discover_pages(self.content, self.public)
+        shards = [
+            shard_pages(pages, self.content, shard, SHARDS) for shard in range(SHARDS)
+        ]
+        self.assertEqual(sorted(sum(shards, [])), sorted(pages))
+        self.assertTrue(all(shards))
+
+    def test_merge_matches_normal_build(self):
+        expected = path.join(self.root, "expected")
+        makedirs(expected)
+        expected_manifest = Manifest()
+        generate_pages_recursive(
+            self.content, self.template, expected, expected_manifest
+        )
+
+        self.build_shards()
+        manifest = Manifest()
+        stats = merge_shards(SHARDS, self.public, manifest, root=self.shards)
+        self.assertEqual((stats.copied_files, stats.skipped_files), (13, 0))
+        self.assertEqual(read_tree(self.public), read_tree(expected))
+        self.assertEqual(
+            {path.relpath(dest, self.public) for dest in manifest.entries},
+            {path.relpath(dest, expected) for dest in expected_manifest.entries},
+        )
+        page = path.join(self.public, "page3", "index.html")
+        self.assertEqual(manifest.page_metadata(page).title, "Page 3")
+        self.assertEqual(
+            manifest.page_metadata(page),
+            expected_manifest.page_metadata(path.join(expected, "page3", "index.html")),
+        )
+
+    def test_merge_skips_unchanged_outputs(self):
+        self.build_shards()
+        merge_shards(SHARDS, self.public, Manifest(), root=self.shards)
+        manifest_path = path.join(self.root, "manifest.json")
+        manifest = Manifest()
+        merge_shards(SHARDS, self.public, manifest, root=self.shards)
+        manifest.save(manifest_path)
+
+        write(path.join(self.content, "page5", "index.md"), "# Changed")
+        self.build_shards()
+        manifest = Manifest.load(manifest_path)
+        stats = merge_shards(SHARDS, self.public, manifest, root=self.shards)
+        self.assertEqual((stats.copied_files, stats.skipped_files), (1, 12))
+        with open(path.join(self.public, "page5", "index.html")) as f:
+            self.assertIn("Changed", f.read())
+
+    def test_unfinished_shard_is_not_merged(self):
+        build_shard(self.content, self.template, 0, SHARDS, self.shards)
+        with self.assertRaisesRegex(ValueError, "Shard 1 of 3 has not finished"):
+            merge_shards(SHARDS, self.public, Manifest(), root=self.shards)
+        self.assertEqual(read_tree(self.public), {})
+
+    def test_shards_of_different_trees_are_not_merged(self):
+        build_shard(self.content, self.template, 0, SHARDS, self.shards)
+        write(path.join(self.content, "late", "index.md"), "# Late")
+        for shard in range(1, SHARDS):
+            build_shard(self.content, self.template, shard, SHARDS, self.shards)
+        with self.assertRaisesRegex(ValueError, "different content trees"):
+            merge_shards(SHARDS, self.public, Manifest(), root=self.shards)
+
+    def test_output_claimed_by_two_shards_conflicts(self):
+        self.build_shards()
+        first = ShardPaths(0, SHARDS, self.shards)
+        second = ShardPaths(1, SHARDS, self.shards)
+        with open(first.manifest, encoding="utf-8") as f:
+            output, entry = sorted(json.load(f).items())[0]
+        with open(second.manifest, encoding="utf-8") as f:
+            entries = json.load(f)
+        entries[path.join(second.public, path.relpath(output, first.public))] = entry
+        with open(second.manifest, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+
+        with self.assertRaisesRegex(ValueError, "1 conflicting output") as raised:
+            merge_shards(SHARDS, self.public, Manifest(), root=self.shards)
+        self.assertIn("(shard 0)", str(raised.exception))
+        self.assertIn("(shard 1)", str(raised.exception))
+        self.assertEqual(read_tree(self.public), {})
+
+    def test_output_claimed_by_static_file_conflicts(self):
+        self.build_shards()
+        manifest = Manifest()
+        dest = path.join(self.public, "page1", "index.html")
+        write(dest, "static")
+        manifest.record(path.join(self.static, "page1", "index.html"), dest, "")
+        with self.assertRaisesRegex(ValueError, "this build"):
+            merge_shards(SHARDS, self.public, manifest, root=self.shards)
+        self.assertEqual(
+            read_tree(self.public), {path.join("page1", "index.html"): b"static"}
+        )
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ["4/4", "-1/4", "1", "a/b", "0/0"]:
+            with self.assertRaises(argparse.ArgumentTypeError):
+                parse_shard(value)
+
+    def test_worker_processes_build_and_merge(self):
+        status = run_local(2, cwd=self.root)
+        self.assertEqual(status, 0)
+        self.assertEqual(
+            read_tree(path.join(self.root, "public"))[path.join("page0", "index.html")],
+            b"<title>Page 0</title>"
+            b'<div><h1>Page 0</h1><p>Text <a href="/">home</a></p></div>',
+        )
+        manifest = Manifest.load(path.join(self.root, MANIFEST_PATH))
+        self.assertIn(path.join("public", "index.css"), manifest.entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+import json
+import unittest
+from os import path, makedirs, listdir
+from tempfile import TemporaryDirectory
+
+from fixtures import read, write
+from generate_page import generate_pages_recursive
+from manifest import Manifest
+from site_index import (
+    FEED_NAME,
+    SEARCH_INDEX_NAME,
+    SITEMAP_NAME,
+    SiteIndex,
+    write_site_index,
+)
+from metadata import PageMetadata
+
+
+class TestSiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        root = self.tmp.name
+        self.content = path.join(root, "content")
+        self.public = path.join(root, "public")
+        self.template = path.join(root, "template.html")
+        write(self.template, "{{ Content }}")
+        write(path.join(self.content, "index.md"), "# Home\n\nWelcome to the site")
+        write(
+            path.join(self.content, "post", "index.md"),
+            "# A & B\n\nThe _site_ post",
+        )
+        makedirs(self.public)
+        self.manifest = Manifest()
+        generate_pages_recursive(
+            self.content, self.template, self.public, self.manifest
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_search_index_postings_are_id_gaps(self):
+        manifest = Manifest()
+        for dir, metadata in [
+            ("", PageMetadata("Home", terms={"one", "both"})),
+            ("a", PageMetadata("A", terms={"two"})),
+            ("b", PageMetadata("B", terms={"both"})),
+        ]:
+            dest = path.join(self.public, dir, "index.html")
+            manifest.record(dir, dest, "", "", metadata.to_dict())
+        write_site_index(manifest, self.content, self.public)
+        self.assertEqual(
+            json.loads(read(path.join(self.public, SEARCH_INDEX_NAME))),
+            {
+                "version": 1,
+                "docs": [["/", "Home"], ["/a", "A"], ["/b", "B"]],
+                "terms": {"both": [0, 2], "one": [0], "two": [1]},
+            },
+        )
+
+    def test_writes_sitemap_feed_and_index(self):
+        stats = write_site_index(
+            self.manifest, self.content, self.public, "https://example.com/"
+        )
+        self.assertEqual((stats.pages, stats.written_files), (2, 3))
+        sitemap = read(path.join(self.public, SITEMAP_NAME))
+        self.assertIn("<loc>https://example.com/</loc>", sitemap)
+        self.assertIn("<loc>https://example.com/post/</loc>", sitemap)
+        feed = read(path.join(self.public, FEED_NAME))
+        self.assertIn("<title>A &amp; B</title>", feed)
+        self.assertIn("<description>The site post</description>", feed)
+        index = json.loads(read(path.join(self.public, SEARCH_INDEX_NAME)))
+        self.assertEqual(index["docs"], [["/", "Home"], ["/post", "A & B"]])
+        self.assertEqual(index["terms"]["site"], [0, 1])
+        self.assertEqual(index["terms"]["post"], [1])
+
+    def test_feed_is_ordered_by_front_matter_date(self):
+        write(
+            path.join(self.content, "post", "index.md"),
+            "---\ndate: 2024-02-03\ntags: [news]\n---\n# A & B\n\nThe _site_ post",
+        )
+        generate_pages_recursive(
+            self.content, self.template, self.public, self.manifest
+        )
+        write_site_index(self.manifest, self.content, self.public)
+        feed = read(path.join(self.public, FEED_NAME))
+        self.assertLess(
+            feed.index("<guid>http://localhost:8888/post/</guid>"),
+            feed.index("<guid>http://localhost:8888/</guid>"),
+        )
+        self.assertIn("<pubDate>Sat, 03 Feb 2024 00:00:00 +0000</pubDate>", feed)
+        self.assertIn("<category>news</category>", feed)
+        sitemap = read(path.join(self.public, SITEMAP_NAME))
+        self.assertIn("<lastmod>2024-02-03</lastmod>", sitemap)
+
+    def test_unchanged_files_are_not_rewritten(self):
+        write_site_index(self.manifest, self.content, self.public)
+        stats = write_site_index(self.manifest, self.content, self.public)
+        self.assertEqual(stats.written_files, 0)
+
+    def test_changed_files_are_replaced_not_rewritten(self):
+        write_site_index(self.manifest, self.content, self.public)
+        sitemap = path.join(self.public, SITEMAP_NAME)
+        # A reader of the old file, such as the server's cache, keeps seeing it
+        with open(sitemap, encoding="utf-8") as f:
+            write_site_index(
+                self.manifest, self.content, self.public, "https://example.com"
+            )
+            self.assertIn("http://localhost:8888/", f.read())
+        self.assertIn("https://example.com/", read(sitemap))
+        self.assertFalse([name for name in listdir(self.public) if ".tmp" in name])
+
+    def test_skipped_pages_are_indexed_from_the_manifest(self):
+        write_site_index(self.manifest, self.content, self.public)
+        manifest = Manifest(self.manifest.entries)
+        generate_pages_recursive(self.content, self.template, self.public, manifest)
+        stats = write_site_index(manifest, self.content, self.public)
+        self.assertEqual((stats.pages, stats.written_files), (2, 0))
+
+    # Returns the files written by a SiteIndex kept between builds and by a
+    # fresh one
+    def write_both(self, index: SiteIndex):
+        outputs = []
+        for site_index in (index, SiteIndex(self.public)):
+            site_index.write(self.manifest, self.content)
+            outputs.append(
+                [
+                    read(path.join(self.public, name))
+                    for name in (SITEMAP_NAME, FEED_NAME, SEARCH_INDEX_NAME)
+                ]
+            )
+        return outputs
+
+    def test_kept_index_matches_fresh_index(self):
+        index = SiteIndex(self.public)
+        index.write(self.manifest, self.content)
+        post = path.join(self.content, "post", "index.md")
+        for markdown in [
+            # Gains and loses terms
+            "---\ndate: 2024-02-03\n---\n# A & B\n\nThe other post",
+            # Loses the only page with a term
+            "# A & B\n\nThe other",
+        ]:
+            write(post, markdown)
+            generate_pages_recursive(
+                self.content, self.template, self.public, self.manifest
+            )
+            kept, fresh = self.write_both(index)
+            self.assertEqual(kept, fresh)
+        self.assertNotIn("post", json.loads(kept[2])["terms"])
+
+        # A new page renumbers the pages after it
+        write(path.join(self.content, "about", "index.md"), "# About\n\nAbout us")
+        generate_pages_recursive(
+            self.content, self.template, self.public, self.manifest
+        )
+        kept, fresh = self.write_both(index)
+        self.assertEqual(kept, fresh)
+        self.assertEqual(json.loads(kept[2])["terms"]["other"], [2])
+
+    def test_kept_index_only_reads_recorded_pages(self):
+        index = SiteIndex(self.public)
+        index.write(self.manifest, self.content)
+        home = index.pages[path.join(self.public, "index.html")]
+        generate_pages_recursive(
+            self.content, self.template, self.public, self.manifest
+        )
+        index.write(self.manifest, self.content)
+        self.assertIs(index.pages[path.join(self.public, "index.html")], home)
+
+
+if __name__ == "__main__":
+    unittest.main()
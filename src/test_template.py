@@ -0,0 +1,71 @@
+import unittest
+from os import path, utime, makedirs
+from tempfile import TemporaryDirectory
+
+from template import Template, TemplateCache, find_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_segments(self):
+        template = Template("<t>{{ Title }}</t><a>{{ Content }}</a>")
+        self.assertListEqual(
+            template.segments, ["<t>", "Title", "</t><a>", "Content", "</a>"]
+        )
+        self.assertEqual(template.slots(), {"Title", "Content"})
+
+    def test_render_named_slots(self):
+        template = Template("{{ Title }} by {{ Author }}: {{ Content }}")
+        actual = template.render(
+            {"Title": "Post", "Author": "Me", "Content": lambda: ["<p>", "hi", "</p>"]}
+        )
+        self.assertEqual(actual, "Post by Me: <p>hi</p>")
+
+    def test_render_leaves_unknown_slots(self):
+        template = Template("{{ Title }} {{ Unknown }}")
+        self.assertEqual(template.render({"Title": "Post"}), "Post {{ Unknown }}")
+
+
+class TestTemplateCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name: str, text: str, mtime: int):
+        file_path = path.join(self.root, name)
+        with open(file_path, "w") as f:
+            f.write(text)
+        utime(file_path, (mtime, mtime))
+        return file_path
+
+    def test_get_reuses_compiled_template(self):
+        cache = TemplateCache()
+        template_path = self.write("template.html", "{{ Title }}", 1)
+        self.assertIs(cache.get(template_path), cache.get(template_path))
+
+    def test_get_reparses_when_mtime_changes(self):
+        cache = TemplateCache()
+        template_path = self.write("template.html", "{{ Title }}", 1)
+        first = cache.get(template_path)
+        self.write("template.html", "<b>{{ Title }}</b>", 2)
+        second = cache.get(template_path)
+        self.assertIsNot(first, second)
+        self.assertEqual(second.render({"Title": "x"}), "<b>x</b>")
+
+    def test_find_template(self):
+        content = path.join(self.root, "content")
+        nested = path.join(content, "blog", "post")
+        makedirs(nested)
+        override = path.join(content, "blog", "template.html")
+        with open(override, "w") as f:
+            f.write("{{ Content }}")
+        page = path.join(nested, "index.md")
+        self.assertEqual(find_template(page, content, "default.html"), override)
+        other = path.join(content, "index.md")
+        self.assertEqual(find_template(other, content, "default.html"), "default.html")
+
+
+if __name__ == "__main__":
+    unittest.main()
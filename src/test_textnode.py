@@ -13,6 +13,10 @@ class TestTextNode(unittest.TestCase):
 
         self.assertEqual(node, node_2)
 
+    def test_slots(self):
+        node = TextNode("This is a text node", text_type_bold)
+        self.assertFalse(hasattr(node, "__dict__"))
+
 
 if __name__ == "__main__":
     unittest.main()
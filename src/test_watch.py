@@ -0,0 +1,147 @@
+import unittest
+from os import chdir, getcwd, path, remove
+from tempfile import TemporaryDirectory
+
+from fixtures import read, write
+from watch import InotifyWatcher, PollingWatcher, Site
+
+
+class TestSite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = path.join(self.root, "content")
+        self.static = path.join(self.root, "static")
+        self.public = path.join(self.root, "public")
+        self.template = path.join(self.root, "template.html")
+        write(self.template, "<title>{{ Title }}</title>{{ Content }}")
+        write(path.join(self.content, "index.md"), "# Home\n\nWelcome")
+        write(path.join(self.content, "post", "index.md"), "# Post\n\nBody")
+        write(path.join(self.static, "index.css"), "body {}")
+        self.site = Site(
+            self.content,
+            self.static,
+            self.template,
+            self.public,
+            path.join(self.root, ".cache", "manifest.json"),
+            graph_path=path.join(self.root, ".cache", "build_graph.json"),
+            front_matter_path=path.join(self.root, ".cache", "front_matter.json"),
+        )
+        self.site.build()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_rebuilds_only_changed_page(self):
+        page = path.join(self.content, "post", "index.md")
+        write(page, "# Edited\n\nBody")
+        self.assertEqual(self.site.rebuild({page}), (1, 0))
+        self.assertIn("<title>Edited</title>", read(path.join(self.public, "post", "index.html")))
+
+    def test_page_turned_draft_is_removed(self):
+        page = path.join(self.content, "post", "index.md")
+        write(page, "---\ndraft: true\n---\n# Post\n\nBody")
+        self.assertEqual(self.site.rebuild({page}), (0, 0))
+        self.assertFalse(path.exists(path.join(self.public, "post", "index.html")))
+        self.assertEqual(self.site.front_matter.drafts(), [path.normpath(page)])
+
+    def test_copies_changed_asset(self):
+        asset = path.join(self.static, "images", "logo.svg")
+        write(asset, "<svg/>")
+        self.assertEqual(self.site.rebuild({asset}), (0, 1))
+        self.assertEqual(read(path.join(self.public, "images", "logo.svg")), "<svg/>")
+
+    def test_removed_page_deletes_output(self):
+        page = path.join(self.content, "post", "index.md")
+        remove(page)
+        self.site.rebuild({page})
+        self.assertFalse(path.exists(path.join(self.public, "post", "index.html")))
+
+    def test_new_directory_renders_its_pages(self):
+        write(path.join(self.content, "new", "deep", "index.md"), "# New\n\nPage")
+        new_dir = path.join(self.content, "new")
+        self.assertEqual(self.site.rebuild({new_dir}), (1, 0))
+
+    def test_template_change_renders_everything(self):
+        write(self.template, "<h1>{{ Title }}</h1>")
+        self.assertEqual(self.site.rebuild({self.template}), (2, 0))
+        self.assertEqual(read(path.join(self.public, "index.html")), "<h1>Home</h1>")
+
+    def test_template_change_skips_pages_with_own_template(self):
+        write(path.join(self.content, "post", "template.html"), "<p>{{ Title }}</p>")
+        self.site.rebuild({path.join(self.content, "post", "template.html")})
+        write(self.template, "<h1>{{ Title }}</h1>")
+        self.assertEqual(self.site.rebuild({self.template}), (1, 0))
+        self.assertEqual(read(path.join(self.public, "post", "index.html")), "<p>Post</p>")
+
+
+class TestWatchers(unittest.TestCase):
+    def setUp(self):
+        self.tmp = TemporaryDirectory()
+        self.root = self.tmp.name
+        self.content = path.join(self.root, "content")
+        self.template = path.join(self.root, "template.html")
+        write(path.join(self.content, "index.md"), "# Home")
+        write(self.template, "{{ Content }}")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def check_watcher(self, watcher):
+        page = path.join(self.content, "blog", "index.md")
+        write(page, "# Blog")
+        changes = set()
+        for _ in range(5):
+            changes |= watcher.wait(0.2)
+        # A new directory may be reported instead of files written into it
+        # before its watch was added
+        self.assertTrue(page in changes or path.dirname(page) in changes)
+
+        write(self.template, "<b>{{ Content }}</b>")
+        write(path.join(self.root, "unrelated.txt"), "ignored")
+        changes = watcher.wait(1)
+        self.assertEqual(changes, {self.template})
+
+    # Watches the site the way the watch command does, by paths relative to
+    # the current directory
+    def check_watcher_from_cwd(self, create_watcher):
+        cwd = getcwd()
+        chdir(self.root)
+        try:
+            watcher = create_watcher(["content"], ["template.html"])
+            try:
+                write("unrelated.txt", "ignored")
+                self.assertEqual(watcher.wait(0.5), set())
+                write("template.html", "<b>{{ Content }}</b>")
+                self.assertEqual(watcher.wait(1), {"template.html"})
+            finally:
+                watcher.close()
+        finally:
+            chdir(cwd)
+
+    def test_polling_watcher(self):
+        self.check_watcher(PollingWatcher([self.content], [self.template], 0.05))
+
+    def test_inotify_watcher(self):
+        try:
+            watcher = InotifyWatcher([self.content], [self.template])
+        except OSError:
+            self.skipTest("inotify is unavailable")
+        try:
+            self.check_watcher(watcher)
+        finally:
+            watcher.close()
+
+    def test_watchers_from_cwd(self):
+        self.check_watcher_from_cwd(
+            lambda roots, files: PollingWatcher(roots, files, 0.05)
+        )
+        try:
+            InotifyWatcher([], []).close()
+        except OSError:
+            self.skipTest("inotify is unavailable")
+        self.check_watcher_from_cwd(InotifyWatcher)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -7,6 +7,7 @@ text_type_image = "image"
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
 
     def __init__(self, text: str, text_type: str, url="") -> None:
         self.text = text
@@ -0,0 +1,392 @@
+import argparse
+import ctypes
+import ctypes.util
+import gc
+import os
+import select
+import struct
+from os import path
+from pathlib import Path
+from time import monotonic, perf_counter, sleep
+
+from copy_contents import copy_contents
+from generate_page import discover_pages, generate_pages, generate_pages_recursive
+from manifest import Manifest, MANIFEST_PATH
+from build_graph import BuildGraph, BUILD_GRAPH_PATH
+from front_matter import FrontMatterIndex, FRONT_MATTER_PATH
+from link_check import check_links
+from site_index import SiteIndex, SITE_URL
+from template import TEMPLATE_NAME
+import render_cache
+from render_cache import RenderCache
+
+DEBOUNCE_SECONDS = 0.1
+POLL_INTERVAL = 0.5
+
+# sys/inotify.h
+IN_MODIFY = 0x2
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+EVENT_HEADER = struct.Struct("iIII")
+
+# Reported instead of individual paths when the kernel dropped events
+OVERFLOW = "<overflow>"
+
+
+# Watches directory trees (roots) and individual files for changes using
+# inotify. wait() returns the set of changed paths.
+class InotifyWatcher:
+    def __init__(self, roots: list, files: list) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is unavailable")
+        self.fd = self.libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs = {}
+        self.files = {path.normpath(file) for file in files}
+        for root in roots:
+            self.add_tree(root)
+        for file in files:
+            self.add_dir(path.dirname(file) or ".", False)
+
+    def __repr__(self) -> str:
+        return f"InotifyWatcher({len(self.dirs)} directories)"
+
+    def add_dir(self, dir: str, recursive: bool):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(dir), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"Cannot watch {dir}")
+        # The same directory can be watched both for a tree and for a file
+        previous = self.dirs.get(wd)
+        self.dirs[wd] = (path.normpath(dir), recursive or bool(previous and previous[1]))
+
+    def add_tree(self, root: str):
+        for dir, _, _ in os.walk(root):
+            self.add_dir(dir, True)
+
+    def wait(self, timeout=None):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 1 << 16)
+        changes = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                changes.add(OVERFLOW)
+                continue
+            if wd not in self.dirs:
+                continue
+            dir, recursive = self.dirs[wd]
+            if mask & IN_IGNORED:
+                del self.dirs[wd]
+                continue
+            # Joined onto "." for files beside the site, which are watched as
+            # "template.html" rather than "./template.html"
+            changed = path.normpath(path.join(dir, name)) if name else dir
+            if not recursive and changed not in self.files:
+                continue
+            if recursive and mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(changed)
+            changes.add(changed)
+        return changes
+
+    def close(self):
+        os.close(self.fd)
+
+
+# Fallback for platforms without inotify that rescans size and mtime of every
+# watched file each interval
+class PollingWatcher:
+    def __init__(self, roots: list, files: list, interval=POLL_INTERVAL) -> None:
+        self.roots = roots
+        self.files = files
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def __repr__(self) -> str:
+        return f"PollingWatcher({len(self.snapshot)} files)"
+
+    def scan(self):
+        snapshot = {}
+        files = list(self.files)
+        for root in self.roots:
+            for dir, _, names in os.walk(root):
+                files.extend(path.join(dir, name) for name in names)
+        for file in files:
+            try:
+                stats = os.stat(file)
+            except FileNotFoundError:
+                continue
+            snapshot[path.normpath(file)] = (stats.st_mtime_ns, stats.st_size)
+        return snapshot
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            interval = self.interval
+            if deadline is not None:
+                interval = max(0, min(interval, deadline - monotonic()))
+            sleep(interval)
+            current = self.scan()
+            changes = {
+                file
+                for file in current.keys() | self.snapshot.keys()
+                if current.get(file) != self.snapshot.get(file)
+            }
+            self.snapshot = current
+            if changes or (deadline is not None and monotonic() >= deadline):
+                return changes
+
+    def close(self):
+        pass
+
+
+def create_watcher(roots: list, files: list, poll=False):
+    if not poll:
+        try:
+            return InotifyWatcher(roots, files)
+        except OSError as e:
+            print(f"inotify unavailable ({e}), polling every {POLL_INTERVAL}s")
+    return PollingWatcher(roots, files)
+
+
+def is_within(file: str, dir: str):
+    return file == dir or file.startswith(dir + path.sep)
+
+
+# The paths making up a site and the manifest tracking what was built from
+# them
+class Site:
+    def __init__(
+        self,
+        content_dir="content",
+        static_dir="static",
+        template_path="template.html",
+        public_dir="public",
+        manifest_path=MANIFEST_PATH,
+        jobs=1,
+        graph_path=BUILD_GRAPH_PATH,
+        site_url=SITE_URL,
+        front_matter_path=FRONT_MATTER_PATH,
+    ) -> None:
+        self.content_dir = path.normpath(content_dir)
+        self.static_dir = path.normpath(static_dir)
+        self.template_path = path.normpath(template_path)
+        self.public_dir = path.normpath(public_dir)
+        self.manifest_path = manifest_path
+        self.jobs = jobs
+        self.manifest = Manifest.load(manifest_path)
+        self.graph_path = graph_path
+        self.graph = BuildGraph.load(graph_path)
+        self.site_index = SiteIndex(self.public_dir, site_url)
+        self.front_matter_path = front_matter_path
+        self.front_matter = FrontMatterIndex.load(front_matter_path)
+
+    def __repr__(self) -> str:
+        return f"Site({self.content_dir}, {self.static_dir}, {self.template_path})"
+
+    def dest_path(self, source: str, source_dir: str):
+        return path.join(self.public_dir, path.relpath(source, source_dir))
+
+    # An incremental build of everything, used on start-up and whenever the
+    # set of changes is unknown
+    def build(self):
+        if not path.exists(self.public_dir):
+            os.makedirs(self.public_dir)
+            self.manifest = Manifest()
+            self.graph = BuildGraph()
+            self.front_matter = FrontMatterIndex()
+        stats = copy_contents(self.static_dir, self.public_dir, self.manifest)
+        pages = generate_pages_recursive(
+            self.content_dir,
+            self.template_path,
+            self.public_dir,
+            self.manifest,
+            self.jobs,
+            self.graph,
+            self.front_matter,
+        )
+        self.write_site_index()
+        self.manifest.prune()
+        self.graph.prune()
+        self.front_matter.prune()
+        self.save()
+        return pages, stats.copied_files
+
+    # Checks the links of every page, or with changes only of the pages the
+    # build graph reports as affected by them
+    def check_links(self, changes=None):
+        sources = None
+        if changes is not None and OVERFLOW not in changes:
+            sources = self.graph.affected(changes, self.content_dir, self.static_dir)
+        return check_links(self.manifest, self.public_dir, sources)
+
+    # Only pages rendered since the last write are read back from the
+    # manifest into the index
+    def write_site_index(self):
+        return self.site_index.write(self.manifest, self.content_dir)
+
+    def save(self):
+        self.manifest.save(self.manifest_path)
+        self.graph.save(self.graph_path)
+        self.front_matter.save(self.front_matter_path)
+
+    # Rebuilds only what the changed paths affect and returns the number of
+    # pages generated and static files copied. The caller saves the state
+    # once the rebuilt pages are reported.
+    def rebuild(self, changes: set):
+        if OVERFLOW in changes or not self.graph.pages:
+            return self.build()
+        pages = {}
+        copied = 0
+        if self.template_path in changes:
+            # Only the pages the build graph has rendered with the template
+            for page in self.graph.pages_using(self.template_path):
+                pages[page] = self.dest_path(page, self.content_dir)
+        for changed in sorted(changes):
+            if is_within(changed, self.content_dir):
+                self.collect_pages(changed, pages)
+            elif is_within(changed, self.static_dir):
+                copied += self.sync_static(changed)
+        generated = generate_pages(
+            sorted(pages.items()),
+            self.content_dir,
+            self.template_path,
+            self.manifest,
+            self.jobs,
+            self.graph,
+            self.front_matter,
+        )
+        self.write_site_index()
+        return generated, copied
+
+    def collect_pages(self, changed: str, pages: dict):
+        if path.basename(changed) == TEMPLATE_NAME:
+            # Pages below a directory template are re-rendered whether it was
+            # edited, added or removed
+            changed = path.dirname(changed)
+        if path.isdir(changed):
+            dest = self.dest_path(changed, self.content_dir)
+            pages.update(discover_pages(changed, dest))
+        elif path.isfile(changed):
+            if Path(changed).suffix == ".md":
+                pages[changed] = self.dest_path(changed, self.content_dir)
+        else:
+            for removed in self.manifest.remove_source(changed):
+                print(f"Removed {removed}")
+            self.graph.remove_source(changed)
+            self.front_matter.remove_source(changed)
+
+    def sync_static(self, changed: str):
+        if not path.exists(changed):
+            for removed in self.manifest.remove_source(changed):
+                print(f"Removed {removed}")
+            return 0
+        dest = self.dest_path(changed, self.static_dir)
+        if path.isdir(changed):
+            os.makedirs(dest, exist_ok=True)
+        else:
+            os.makedirs(path.dirname(dest), exist_ok=True)
+        return copy_contents(changed, dest, self.manifest).copied_files
+
+
+def watch(site: Site, watcher, debounce=DEBOUNCE_SECONDS):
+    print(f"Watching {site.content_dir}, {site.static_dir} and {site.template_path}")
+    while True:
+        changes = watcher.wait()
+        if not changes:
+            # Only unwatched files beside a watched one changed
+            continue
+        # Editors and checkouts touch many files at once, so wait for a quiet
+        # period before rebuilding
+        while True:
+            more = watcher.wait(debounce)
+            if not more:
+                break
+            changes |= more
+        start = perf_counter()
+        try:
+            pages, copied = site.rebuild(changes)
+        except Exception as e:
+            print(f"Rebuild failed: {e}")
+            continue
+        elapsed = (perf_counter() - start) * 1000
+        print(f"Rebuilt {pages} page(s), copied {copied} file(s) in {elapsed:.0f} ms")
+        report_links(site.check_links(changes))
+        # Saving the manifest of a large site takes longer than rebuilding a
+        # page, so it happens after the rebuild is reported
+        site.save()
+
+
+def report_links(report):
+    for broken in report.broken:
+        print(broken)
+    if report.broken:
+        print(report)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rebuild the site whenever content, static or the template change"
+    )
+    parser.add_argument(
+        "--poll", action="store_true", help="Poll for changes instead of inotify"
+    )
+    parser.add_argument(
+        "--debounce",
+        type=int,
+        default=int(DEBOUNCE_SECONDS * 1000),
+        help="Quiet period in ms to wait for before rebuilding",
+    )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of processes used to render pages (0 uses every core)",
+    )
+    parser.add_argument(
+        "--site-url",
+        default=SITE_URL,
+        help="Absolute URL the site is published at, used in the sitemap and feed",
+    )
+    args = parser.parse_args()
+
+    render_cache.enable(RenderCache())
+    site = Site(jobs=args.jobs, site_url=args.site_url)
+    pages, copied = site.build()
+    print(f"Built {pages} page(s), copied {copied} file(s)")
+    report_links(site.check_links())
+    # Everything loaded by the first build lives until exit, so the garbage
+    # collector stops scanning it on every full collection
+    gc.freeze()
+    watcher = create_watcher(
+        [site.content_dir, site.static_dir], [site.template_path], args.poll
+    )
+    try:
+        watch(site, watcher, args.debounce / 1000)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()
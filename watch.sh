@@ -0,0 +1 @@
+python src/watch.py "$@"